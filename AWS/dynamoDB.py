@@ -5,6 +5,7 @@ load_dotenv()
 import boto3
 from boto3.dynamodb.conditions import Attr
 from boto3.dynamodb.conditions import Key
+from utilidades_dynamo import cargar_tabla, cargar_archivo, escanear_paralelo, consultar, obtener_lote
 
 ## CONEXION Y CREDENCIALES AWS
 session = boto3.session.Session(
@@ -124,100 +125,36 @@ dynamodb_resource = session.resource('dynamodb')
 
 ## INSERTAR REGISTRO ALUMNOS
 tabla = dynamodb_resource.Table('alumno')
-tabla.put_item(
-    Item={
-        'id_alumno':1,
-        'fecha_conexion':'2025-11-28T17:00:00'
-    }
-)
-tabla.put_item(
-    Item={
-        'id_alumno':2,
-        'fecha_conexion':'2025-01-18T12:00:00'
-    }
-)
-tabla.put_item(
-    Item={
-        'id_alumno':3,
-        'fecha_conexion':'2025-09-20T11:00:00'
-    }
-)
+cargar_tabla(tabla, [
+    {'id_alumno':1, 'fecha_conexion':'2025-11-28T17:00:00'},
+    {'id_alumno':2, 'fecha_conexion':'2025-01-18T12:00:00'},
+    {'id_alumno':3, 'fecha_conexion':'2025-09-20T11:00:00'},
+])
 ## INSERTAR REGISTRO PROFESORES
 tabla = dynamodb_resource.Table('profesor')
-tabla.put_item(
-    Item={
-        'id_profesor':1,
-        'fecha_conexion':'2025-11-28T17:00:00',
-        'duracion_sesion':3000
-    }
-)
-tabla.put_item(
-    Item={
-        'id_profesor':2,
-        'fecha_conexion':'2025-01-18T12:00:00',
-        'duracion_sesion':1000
-    }
-)
-tabla.put_item(
-    Item={
-        'id_profesor':3,
-        'fecha_conexion':'2025-09-20T11:00:00',
-        'duracion_sesion':6000
-    }
-)
+cargar_tabla(tabla, [
+    {'id_profesor':1, 'fecha_conexion':'2025-11-28T17:00:00', 'duracion_sesion':3000},
+    {'id_profesor':2, 'fecha_conexion':'2025-01-18T12:00:00', 'duracion_sesion':1000},
+    {'id_profesor':3, 'fecha_conexion':'2025-09-20T11:00:00', 'duracion_sesion':6000},
+])
 ## INSERTAR REGISTRO LOG_REGISTRO
 tabla = dynamodb_resource.Table('log_registro')
-tabla.put_item(
-    Item={
-        'id_registro':1,
-        'fecha_registro':'2025-11-28T17:00:00',
-        'tipo_usuario':'profesor'
-    }
-)
-tabla.put_item(
-    Item={
-        'id_registro':2,
-        'fecha_registro':'2025-01-18T12:00:00',
-        'tipo_usuario':'alumno'
-    }
-)
-tabla.put_item(
-    Item={
-        'id_registro':3,
-        'fecha_registro':'2025-09-20T11:00:00',
-        'tipo_usuario':'alumno'
-    }
-)
+cargar_tabla(tabla, [
+    {'id_registro':1, 'fecha_registro':'2025-11-28T17:00:00', 'tipo_usuario':'profesor'},
+    {'id_registro':2, 'fecha_registro':'2025-01-18T12:00:00', 'tipo_usuario':'alumno'},
+    {'id_registro':3, 'fecha_registro':'2025-09-20T11:00:00', 'tipo_usuario':'alumno'},
+])
+## CARGA MASIVA DESDE ARCHIVO (CSV O JSON LINES)
+## cargar_archivo(dynamodb_resource.Table('alumno'), 'alumnos.csv', hilos=4)
 
 
-## OBTENER REGISTRO DE TABLA ALUMNO
-tabla = dynamodb_resource.Table('alumno')
-
-response = tabla.get_item(
-    Key={
-        'id_alumno':1,
-        'fecha_conexion':'2025-11-28T17:00:00'
-    }
-)
-print(response.get('Item'))
-## OBTENER REGISTRO DE TABLA PROFESOR
-tabla = dynamodb_resource.Table('profesor')
-response = tabla.get_item(
-    Key={
-        'id_profesor':2,
-        'fecha_conexion':'2025-01-18T12:00:00'
-    }
-)
-print(response.get('Item'))
-## OBTENER REGISTRO DE TABLA LOG_REGISTRO
-tabla = dynamodb_resource.Table('log_registro')
-response = tabla.get_item(
-    Key={
-        'id_registro':3,
-        'fecha_registro':'2025-09-20T11:00:00'
-    }
-)
-print(response.get('Item'))
+## OBTENER REGISTROS DE LAS TABLAS ALUMNO, PROFESOR Y LOG_REGISTRO (UNA SOLA LLAMADA)
+for item in obtener_lote(dynamodb_resource, [
+    ('alumno', {'id_alumno':1, 'fecha_conexion':'2025-11-28T17:00:00'}),
+    ('profesor', {'id_profesor':2, 'fecha_conexion':'2025-01-18T12:00:00'}),
+    ('log_registro', {'id_registro':3, 'fecha_registro':'2025-09-20T11:00:00'}),
+]):
+    print(item)
 
 
 ## ACTUALIZAR UN REGISTRO DE ALUMNO
@@ -292,51 +229,31 @@ tabla.delete_item(
 print("Eliminado con exito")
 ## OBTENER TODOS LOS REGISTROS TABLA ALUMNO
 tabla = dynamodb_resource.Table('alumno')
-response = tabla.scan()
-items = response['Items']
-for item in items:
+for item in escanear_paralelo(tabla):
     print(item)
 ## OBTENER TODOS LOS REGISTROS TABLA PROFESOR
 tabla = dynamodb_resource.Table('profesor')
-response = tabla.scan()
-items = response['Items']
-for item in items:
+for item in escanear_paralelo(tabla):
     print(item)
 ## OBTENER TODOS LOS REGISTROS TABLA LOG_REGISTRO
 tabla = dynamodb_resource.Table('log_registro')
-response = tabla.scan()
-items = response['Items']
-for item in items:
+for item in escanear_paralelo(tabla):
     print(item)
 
 
 ## FILTRADO EN TABLA ALUMNO
 tabla = dynamodb_resource.Table('alumno')
-response = tabla.scan(
-    FilterExpression=Attr('id_alumno').gt(2)
-)
-items = response['Items']
-for item in items:
+for item in consultar(tabla, Attr('id_alumno').gt(2)):
     print(item)
 
 ## FILTRADO EN TABLA PROFESOR (INDICE_LOCAL)
 tabla = dynamodb_resource.Table('profesor')
-response = tabla.scan(
-    IndexName='duracionSesionIndex',
-    FilterExpression=Attr('id_profesor').eq(3)
-)
-items = response['Items']
-for item in items:
+for item in consultar(tabla, Attr('id_profesor').eq(3)):
     print(item)
 
 ## FILTRADO EN TABLA PROFESOR (INDICE_GLOBAL)
 tabla = dynamodb_resource.Table('log_registro')
-response = tabla.scan(
-    IndexName='fechaRegistroIndex',
-    FilterExpression=Attr('fecha_registro').eq('2025-01-18T12:00:00')
-)
-items = response['Items']
-for item in items:
+for item in consultar(tabla, Attr('fecha_registro').eq('2025-01-18T12:00:00')):
     print(item)
 
 ## ELIMINACION CONDICIONAL EN TABLA ALUMNO
@@ -375,31 +292,17 @@ print("Eliminado con exito")
 
 ## FILTRADO CON VARIOS FILTROS EN TABLA ALUMNO
 tabla = dynamodb_resource.Table('alumno')
-response = tabla.scan(
-    FilterExpression=Attr('id_alumno').gt(2) & Attr('fecha_conexion').eq('2025-09-20T11:00:00')
-)
-items = response['Items']
-for item in items:
+for item in consultar(tabla, Attr('id_alumno').gt(2) & Attr('fecha_conexion').eq('2025-09-20T11:00:00')):
     print(item)
 
 ## FILTRADO CON VARIOS FILTROS EN TABLA PROFESOR (INDICE_LOCAL)
 tabla = dynamodb_resource.Table('profesor')
-response = tabla.scan(
-    IndexName='duracionSesionIndex',
-    FilterExpression=Attr('id_profesor').eq(3) & Attr('duracion_sesion').gt(5000)
-)
-items = response['Items']
-for item in items:
+for item in consultar(tabla, Attr('id_profesor').eq(3) & Attr('duracion_sesion').gt(5000)):
     print(item)
 
 ## FILTRADO CON VARIOS FILTROS EN TABLA PROFESOR (INDICE_GLOBAL)
 tabla = dynamodb_resource.Table('log_registro')
-response = tabla.scan(
-    IndexName='fechaRegistroIndex',
-    FilterExpression=Attr('fecha_registro').eq('2025-11-28T17:00:00') & Attr('tipo_usuario').eq('profesor')
-)
-items = response['Items']
-for item in items:
+for item in consultar(tabla, Attr('fecha_registro').eq('2025-11-28T17:00:00') & Attr('tipo_usuario').eq('profesor')):
     print(item)
 
 
@@ -6,6 +6,7 @@ from boto3.dynamodb.conditions import Attr
 from dotenv import load_dotenv
 load_dotenv()
 import decimal
+from utilidades_dynamo import consultar
 
 ## FUNCION PARA LA SERIALIZACION DE DECIMALES DE DYNAMO A JSON
 def decimal_default(obj):
@@ -45,26 +46,15 @@ dynamodb_resource = session.resource('dynamodb')
 
 ## CONSULTA FILTRADA A TABLA ALUMNO
 tabla = dynamodb_resource.Table('alumno')
-response = tabla.scan(
-    FilterExpression=Attr('id_alumno').gt(2) & Attr('fecha_conexion').eq('2025-09-20T11:00:00')
-)
-alumno = response['Items']
+alumno = list(consultar(tabla, Attr('id_alumno').gt(2) & Attr('fecha_conexion').eq('2025-09-20T11:00:00')))
 
 ## FILTRADO CON VARIOS FILTROS EN TABLA PROFESOR (INDICE_LOCAL)
 tabla = dynamodb_resource.Table('profesor')
-response = tabla.scan(
-    IndexName='duracionSesionIndex',
-    FilterExpression=Attr('id_profesor').eq(3) & Attr('duracion_sesion').gt(5000)
-)
-profesor = response['Items']
+profesor = list(consultar(tabla, Attr('id_profesor').eq(3) & Attr('duracion_sesion').gt(5000)))
 
 ## FILTRADO CON VARIOS FILTROS EN TABLA PROFESOR (INDICE_GLOBAL)
 tabla = dynamodb_resource.Table('log_registro')
-response = tabla.scan(
-    IndexName='fechaRegistroIndex',
-    FilterExpression=Attr('fecha_registro').eq('2025-11-28T17:00:00') & Attr('tipo_usuario').eq('profesor')
-)
-log_registro = response['Items']
+log_registro = list(consultar(tabla, Attr('fecha_registro').eq('2025-11-28T17:00:00') & Attr('tipo_usuario').eq('profesor')))
 
 
 ## GENERAR ESTRUCTURA JSON
@@ -0,0 +1,65 @@
+import threading
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from utilidades_dynamo import cargar_tabla
+
+
+@pytest.fixture
+def tabla():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        yield dynamodb.create_table(
+            TableName="alumno",
+            KeySchema=[{"AttributeName": "id_alumno", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id_alumno", "AttributeType": "N"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+
+
+def cargar_en_hilo(*args, **kwargs):
+    """Ejecuta cargar_tabla con un tiempo maximo para que un bloqueo haga fallar la prueba"""
+    salida = {}
+
+    def ejecutar():
+        try:
+            salida["resultado"] = cargar_tabla(*args, **kwargs)
+        except BaseException as e:
+            salida["error"] = e
+
+    hilo = threading.Thread(target=ejecutar, daemon=True)
+    hilo.start()
+    hilo.join(timeout=30)
+    assert not hilo.is_alive(), "cargar_tabla se ha quedado bloqueada"
+    return salida
+
+
+def test_carga_todos_los_registros(tabla):
+    salida = cargar_en_hilo(tabla, ({"id_alumno": i} for i in range(120)), hilos=3, wcu=None)
+    assert salida["resultado"]["items"] == 120
+    assert tabla.scan(Select="COUNT")["Count"] == 120
+
+
+def test_error_del_productor_se_relanza_sin_bloquear(tabla):
+    def registros():
+        for i in range(300):
+            yield {"id_alumno": i}
+        raise ValueError("CSV corrupto")
+
+    salida = cargar_en_hilo(tabla, registros(), hilos=2, wcu=None)
+    assert isinstance(salida["error"], ValueError)
+
+
+def test_registro_sin_clave_se_relanza(tabla):
+    salida = cargar_en_hilo(tabla, [{"id_alumno": 1}, {"nombre": "sin clave"}], hilos=2, wcu=None)
+    assert isinstance(salida["error"], KeyError)
+
+
+def test_error_de_un_lote_llega_al_llamador(tabla):
+    # Un atributo de la clave con el tipo equivocado: DynamoDB rechaza el lote
+    registros = [{"id_alumno": i} for i in range(500)] + [{"id_alumno": "texto"}]
+    salida = cargar_en_hilo(tabla, registros, hilos=2, wcu=None)
+    assert isinstance(salida["error"], ClientError)
@@ -0,0 +1,113 @@
+import boto3
+import pytest
+from boto3.dynamodb.conditions import Attr
+from moto import mock_aws
+
+from utilidades_dynamo import consultar, planificar_consulta
+
+
+@pytest.fixture
+def tabla():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        tabla = dynamodb.create_table(
+            TableName="profesor",
+            AttributeDefinitions=[
+                {"AttributeName": "id_profesor", "AttributeType": "N"},
+                {"AttributeName": "fecha_conexion", "AttributeType": "S"},
+                {"AttributeName": "duracion_sesion", "AttributeType": "N"},
+            ],
+            KeySchema=[
+                {"AttributeName": "id_profesor", "KeyType": "HASH"},
+                {"AttributeName": "fecha_conexion", "KeyType": "RANGE"},
+            ],
+            LocalSecondaryIndexes=[{
+                "IndexName": "duracionSesionIndex",
+                "KeySchema": [
+                    {"AttributeName": "id_profesor", "KeyType": "HASH"},
+                    {"AttributeName": "duracion_sesion", "KeyType": "RANGE"},
+                ],
+                "Projection": {"ProjectionType": "ALL"},
+            }],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        for dia, duracion in enumerate([1000, 2000, 3000, 6000], start=1):
+            tabla.put_item(Item={"id_profesor": 1, "fecha_conexion": f"2025-01-0{dia}",
+                                 "duracion_sesion": duracion})
+        yield tabla
+
+
+def test_limites_inclusivos_se_unen_en_between(tabla):
+    condicion = Attr("id_profesor").eq(1) & Attr("duracion_sesion").gte(1000) & Attr("duracion_sesion").lte(3000)
+    plan = planificar_consulta(tabla, condicion)
+
+    assert plan["operacion"] == "query"
+    assert plan["index_name"] == "duracionSesionIndex"
+    assert plan["filtro"] is None
+    assert plan["excluir"] == []
+    assert "BETWEEN" in plan["descripcion"]
+    assert sorted(i["duracion_sesion"] for i in consultar(tabla, condicion)) == [1000, 2000, 3000]
+
+
+def test_limites_estrictos_se_descartan_al_leer(tabla):
+    condicion = Attr("id_profesor").eq(1) & Attr("duracion_sesion").gt(1000) & Attr("duracion_sesion").lt(6000)
+    plan = planificar_consulta(tabla, condicion)
+
+    assert plan["filtro"] is None
+    assert plan["excluir"] == [("duracion_sesion", 1000), ("duracion_sesion", 6000)]
+    items = list(consultar(tabla, condicion, proyeccion=["fecha_conexion"]))
+    assert sorted(i["fecha_conexion"] for i in items) == ["2025-01-02", "2025-01-03"]
+    assert all(set(i) == {"fecha_conexion"} for i in items)
+
+
+def test_terminos_de_la_clave_que_no_se_unen_pasan_al_siguiente_indice(tabla):
+    condicion = (Attr("id_profesor").eq(1) & Attr("fecha_conexion").begins_with("2025")
+                 & Attr("fecha_conexion").gt("2025-01-02"))
+    plan = planificar_consulta(tabla, condicion)
+
+    # En la tabla base no cabe en la clave (y no puede ir en el filtro): se usa el LSI
+    assert plan["index_name"] == "duracionSesionIndex"
+    assert plan["filtro"] is not None
+    assert sorted(i["fecha_conexion"] for i in consultar(tabla, condicion)) == ["2025-01-03", "2025-01-04"]
+
+
+def test_sin_indice_valido_se_escanea(tabla):
+    condicion = Attr("id_profesor").eq(1) & Attr("id_profesor").gt(0)
+    assert planificar_consulta(tabla, condicion)["operacion"] == "scan"
+
+    condicion = Attr("id_profesor").eq(1) & Attr("duracion_sesion").ne(2000)
+    plan = planificar_consulta(tabla, condicion, index_name="duracionSesionIndex")
+    assert plan["operacion"] == "scan"
+    assert len(list(consultar(tabla, condicion, index_name="duracionSesionIndex"))) == 3
+
+
+def test_tabla_recreada_con_otro_indice_no_usa_el_esquema_anterior(tabla):
+    condicion = Attr("id_profesor").eq(1) & Attr("duracion_sesion").gt(1000)
+    assert planificar_consulta(tabla, condicion)["index_name"] == "duracionSesionIndex"
+
+    tabla.delete()
+    dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+    nueva = dynamodb.create_table(
+        TableName="profesor",
+        KeySchema=[{"AttributeName": "id_profesor", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id_profesor", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    plan = planificar_consulta(dynamodb.Table("profesor"), condicion)
+
+    assert not nueva.local_secondary_indexes
+    assert plan["index_name"] is None
+    assert plan["filtro"] is not None
+
+
+def test_misma_tabla_en_otra_region(tabla):
+    otra = boto3.resource("dynamodb", region_name="eu-west-1").create_table(
+        TableName="profesor",
+        KeySchema=[{"AttributeName": "id_profesor", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id_profesor", "AttributeType": "N"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    condicion = Attr("id_profesor").eq(1) & Attr("duracion_sesion").gt(1000)
+
+    assert planificar_consulta(tabla, condicion)["index_name"] == "duracionSesionIndex"
+    assert planificar_consulta(otra, condicion)["index_name"] is None
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import boto3
+import pytest
+from boto3.dynamodb.conditions import Attr
+from moto import mock_aws
+
+from utilidades_dynamo import escanear_paralelo
+
+
+@pytest.fixture
+def tabla():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        tabla = dynamodb.create_table(
+            TableName="alumno",
+            KeySchema=[{"AttributeName": "id_alumno", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id_alumno", "AttributeType": "N"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        with tabla.batch_writer() as escritor:
+            for i in range(300):
+                escritor.put_item(Item={"id_alumno": i, "curso": i % 3})
+        yield tabla
+
+
+def hilos_de_escaneo():
+    return [h for h in threading.enumerate() if "escanear_segmento" in h.name]
+
+
+def test_varias_paginas_y_segmentos_devuelven_cada_item_una_vez(tabla):
+    consumo = {}
+    ids = [item["id_alumno"] for item in escanear_paralelo(tabla, segmentos=4, tam_pagina=7, consumo=consumo)]
+
+    assert sorted(ids) == list(range(300))
+    assert consumo["rcu"] > 0
+
+
+def test_filtro_y_proyeccion(tabla):
+    items = list(escanear_paralelo(tabla, segmentos=3, tam_pagina=20, proyeccion=["id_alumno"],
+                                   filtro=Attr("curso").eq(0)))
+
+    assert sorted(i["id_alumno"] for i in items) == list(range(0, 300, 3))
+    assert all(set(i) == {"id_alumno"} for i in items)
+
+
+def test_dejar_de_iterar_termina_los_hilos(tabla):
+    generador = escanear_paralelo(tabla, segmentos=4, tam_pagina=5)
+    primeros = [next(generador) for _ in range(3)]
+    # 60 paginas y una cola de 16: los hilos siguen esperando a poner las suyas
+    assert hilos_de_escaneo()
+    generador.close()
+
+    limite = time.time() + 10
+    while hilos_de_escaneo() and time.time() < limite:
+        time.sleep(0.05)
+    assert len(primeros) == 3
+    assert hilos_de_escaneo() == []
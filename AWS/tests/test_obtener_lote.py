@@ -0,0 +1,91 @@
+import random
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from utilidades_dynamo import obtener_lote
+
+
+@pytest.fixture
+def dynamodb():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+        alumno = dynamodb.create_table(
+            TableName="alumno",
+            KeySchema=[{"AttributeName": "id_alumno", "KeyType": "HASH"},
+                       {"AttributeName": "fecha_conexion", "KeyType": "RANGE"}],
+            AttributeDefinitions=[{"AttributeName": "id_alumno", "AttributeType": "N"},
+                                  {"AttributeName": "fecha_conexion", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        profesor = dynamodb.create_table(
+            TableName="profesor",
+            KeySchema=[{"AttributeName": "id_profesor", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "id_profesor", "AttributeType": "N"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        with alumno.batch_writer() as escritor:
+            for i in range(150):
+                escritor.put_item(Item={"id_alumno": i, "fecha_conexion": "2025-01-01", "nombre": f"a{i}"})
+        with profesor.batch_writer() as escritor:
+            for i in range(80):
+                escritor.put_item(Item={"id_profesor": i, "nombre": f"p{i}"})
+        yield dynamodb
+
+
+def test_mas_de_100_claves_en_varias_tablas_mantienen_el_orden(dynamodb):
+    alumno = dynamodb.Table("alumno")
+    claves = [("alumno", {"id_alumno": i, "fecha_conexion": "2025-01-01"}) for i in range(160)]
+    claves += [(alumno, {"id_alumno": 3, "fecha_conexion": "2025-01-01"})]  # Table de boto3
+    claves += [("profesor", {"id_profesor": i}) for i in range(90)]
+    claves += [("alumno", {"fecha_conexion": "2025-01-01", "id_alumno": 7})] * 3  # Repetidas, otro orden
+    random.Random(1).shuffle(claves)
+
+    items = list(obtener_lote(dynamodb, claves, hilos=2))
+
+    assert len(items) == len(claves)
+    for (tabla, clave), item in zip(claves, items):
+        if "id_alumno" in clave:
+            esperado = f"a{clave['id_alumno']}" if clave["id_alumno"] < 150 else None
+        else:
+            esperado = f"p{clave['id_profesor']}" if clave["id_profesor"] < 80 else None
+        assert (item or {}).get("nombre") == esperado
+
+
+def test_bloques_de_100_claves_unicas(dynamodb, monkeypatch):
+    cliente = dynamodb.meta.client
+    original = cliente.batch_get_item
+    tamanos = []
+
+    def contar(**params):
+        tamanos.append(sum(len(p["Keys"]) for p in params["RequestItems"].values()))
+        return original(**params)
+
+    monkeypatch.setattr(cliente, "batch_get_item", contar)
+    claves = [("profesor", {"id_profesor": i % 120}) for i in range(360)]
+
+    items = list(obtener_lote(dynamodb, claves))
+
+    assert max(tamanos) <= 100
+    assert [i and i["id_profesor"] for i in items] == [i % 120 if i % 120 < 80 else None for i in range(360)]
+
+
+def test_reintenta_las_claves_no_procesadas(dynamodb, monkeypatch):
+    cliente = dynamodb.meta.client
+    original = cliente.batch_get_item
+    llamadas = []
+
+    def a_medias(**params):
+        llamadas.append(params)
+        if len(llamadas) == 1:
+            # Primera respuesta: DynamoDB devuelve todas las claves sin procesar
+            return {"Responses": {}, "UnprocessedKeys": params["RequestItems"]}
+        return original(**params)
+
+    monkeypatch.setattr(cliente, "batch_get_item", a_medias)
+    items = list(obtener_lote(dynamodb, [("profesor", {"id_profesor": 1}), ("profesor", {"id_profesor": 2})],
+                              espera_base=0.001))
+
+    assert [i["nombre"] for i in items] == ["p1", "p2"]
+    assert len(llamadas) == 2
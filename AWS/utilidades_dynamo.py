@@ -0,0 +1,607 @@
+import csv
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import decimal
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.dynamodb.conditions import And, AttributeBase, Key
+from boto3.dynamodb.conditions import (
+    BeginsWith, Between, Equals, GreaterThan, GreaterThanEquals, LessThan, LessThanEquals,
+)
+
+## NUMEROS EN LOS CSV (DYNAMO NECESITA DECIMAL, NO FLOAT)
+PATRON_NUMERO = re.compile(r"-?\d+(\.\d+)?")
+
+
+## LEER REGISTROS DE UN CSV O JSON LINES SIN CARGAR EL ARCHIVO EN MEMORIA
+def leer_registros(ruta, formato=None, tipos=None, encoding="utf-8"):
+    """
+    Devuelve los registros del archivo uno a uno (generador de dict).
+
+    - formato: 'csv' o 'jsonl' (por defecto segun la extension)
+    - tipos: {columna: 'N' o 'S'} para los CSV. Sin tipos, los valores
+      con forma de numero se convierten a Decimal
+    """
+    formato = formato or ("jsonl" if ruta.endswith((".jsonl", ".json")) else "csv")
+    with open(ruta, "r", encoding=encoding, newline="") as f:
+        if formato == "jsonl":
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea, parse_float=decimal.Decimal, parse_int=decimal.Decimal)
+            return
+
+        for fila in csv.DictReader(f):
+            registro = {}
+            for columna, valor in fila.items():
+                if valor is None or valor == "":
+                    continue
+                tipo = (tipos or {}).get(columna)
+                if tipo == "N" or (tipo is None and PATRON_NUMERO.fullmatch(valor)):
+                    registro[columna] = decimal.Decimal(valor)
+                else:
+                    registro[columna] = valor
+            yield registro
+
+
+## LIMITADOR DE CAPACIDAD (TOKEN BUCKET)
+class LimitadorCapacidad:
+    """
+    Reparte las unidades de capacidad por segundo entre todos los hilos.
+    Se consume una estimacion antes de cada peticion y se corrige con
+    la capacidad que DynamoDB dice haber consumido.
+    """
+
+    def __init__(self, por_segundo):
+        self.por_segundo = por_segundo
+        self.disponibles = por_segundo
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consumir(self, unidades):
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                self.disponibles = min(
+                    self.por_segundo,
+                    self.disponibles + (ahora - self.ultimo) * self.por_segundo,
+                )
+                self.ultimo = ahora
+                if self.disponibles > 0:
+                    # Puede quedar en negativo: los siguientes esperan a devolver la deuda
+                    self.disponibles -= unidades
+                    return
+                espera = -self.disponibles / self.por_segundo
+            time.sleep(max(espera, 0.01))
+
+    def ajustar(self, unidades):
+        with self.lock:
+            self.disponibles -= unidades
+
+
+## CAPACIDAD DE ESCRITURA PROVISIONADA DE LA TABLA
+def obtener_wcu(tabla):
+    """
+    WCU provisionadas de la tabla (None si es bajo demanda)
+    """
+    capacidad = tabla.provisioned_throughput or {}
+    return capacidad.get("WriteCapacityUnits") or None
+
+
+## CARGA MASIVA EN UNA TABLA
+def cargar_tabla(tabla, registros, hilos=4, wcu="tabla", max_reintentos=8, espera_base=0.1):
+    """
+    Inserta los registros en lotes de 25 (batch_write_item) con varios hilos.
+
+    - tabla: Table de boto3 (dynamodb_resource.Table('alumno'))
+    - registros: iterable de dict (por ejemplo leer_registros('alumnos.csv'))
+    - hilos: lotes enviados a la vez
+    - wcu: unidades de escritura por segundo a no superar. 'tabla' usa las
+      provisionadas en la tabla y None desactiva el limite
+    - max_reintentos: reintentos de los UnprocessedItems con espera exponencial
+
+    Si falla la lectura de los registros o el envio de un lote, la carga se
+    detiene, se espera a los hilos y se relanza la excepcion (los items ya
+    escritos se quedan en la tabla).
+
+    Devuelve un dict con items, errores, segundos, items_por_segundo y wcu_consumidas
+    """
+    if wcu == "tabla":
+        wcu = obtener_wcu(tabla)
+    limitador = LimitadorCapacidad(wcu) if wcu else None
+    cliente = tabla.meta.client
+    claves = [clave["AttributeName"] for clave in tabla.key_schema]
+
+    resultado = {"items": 0, "errores": 0, "wcu_consumidas": 0.0}
+    lock = threading.Lock()
+    lotes = queue.Queue(maxsize=hilos * 2)
+    parar = threading.Event()
+    fallos = []
+    FIN = object()
+
+    def enviar_lote(lote):
+        pendientes = [{"PutRequest": {"Item": item}} for item in lote]
+        intento = 0
+        while pendientes:
+            # Estimacion: 1 WCU por item (items de hasta 1 KB)
+            estimado = len(pendientes)
+            if limitador:
+                limitador.consumir(estimado)
+            try:
+                response = cliente.batch_write_item(
+                    RequestItems={tabla.name: pendientes},
+                    ReturnConsumedCapacity="TOTAL",
+                )
+            except cliente.exceptions.ProvisionedThroughputExceededException:
+                response = {"UnprocessedItems": {tabla.name: pendientes}}
+
+            consumido = sum(c.get("CapacityUnits", 0) for c in response.get("ConsumedCapacity", []))
+            if limitador:
+                limitador.ajustar(consumido - estimado)
+            no_procesados = response.get("UnprocessedItems", {}).get(tabla.name, [])
+            with lock:
+                resultado["wcu_consumidas"] += consumido
+                resultado["items"] += len(pendientes) - len(no_procesados)
+
+            pendientes = no_procesados
+            if pendientes:
+                intento += 1
+                if intento > max_reintentos:
+                    with lock:
+                        resultado["errores"] += len(pendientes)
+                    print(f"Error: {len(pendientes)} items sin procesar tras {max_reintentos} reintentos")
+                    return
+                time.sleep(random.uniform(0, espera_base * (2 ** intento)))
+
+    def trabajador():
+        while True:
+            lote = lotes.get()
+            if lote is FIN:
+                return
+            # Tras un fallo se sigue vaciando la cola para que el productor no se bloquee
+            if parar.is_set():
+                continue
+            try:
+                enviar_lote(lote)
+            except Exception as e:
+                with lock:
+                    resultado["errores"] += len(lote)
+                    fallos.append(e)
+                parar.set()
+                print(f"Error al escribir un lote: {e}")
+
+    inicio = time.time()
+    error = None
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        for _ in range(hilos):
+            executor.submit(trabajador)
+
+        try:
+            # Un lote no puede repetir clave: si se repite, gana el ultimo registro
+            lote = {}
+            for registro in registros:
+                if parar.is_set():
+                    break
+                lote[tuple(registro[c] for c in claves)] = registro
+                if len(lote) == 25:
+                    lotes.put(list(lote.values()))
+                    lote = {}
+            if lote and not parar.is_set():
+                lotes.put(list(lote.values()))
+        except BaseException as e:
+            error = e
+            parar.set()
+            print(f"Error al leer los registros: {e}")
+        finally:
+            # Cada hilo recibe siempre su FIN, falle o no el productor
+            for _ in range(hilos):
+                lotes.put(FIN)
+
+    if error is None and fallos:
+        error = fallos[0]
+
+    resultado["segundos"] = round(time.time() - inicio, 2)
+    resultado["items_por_segundo"] = round(resultado["items"] / max(resultado["segundos"], 1e-6), 1)
+    print(f"Cargados {resultado['items']} items en {tabla.name} en {resultado['segundos']} s "
+          f"({resultado['items_por_segundo']} items/s, {resultado['wcu_consumidas']:.1f} WCU consumidas, "
+          f"{resultado['errores']} errores)")
+    if error is not None:
+        raise error
+    return resultado
+
+
+## CARGA MASIVA DESDE UN ARCHIVO CSV O JSON LINES
+def cargar_archivo(tabla, ruta, formato=None, tipos=None, **opciones):
+    """
+    Atajo de cargar_tabla(tabla, leer_registros(ruta)). Acepta las mismas opciones
+    """
+    if not os.path.exists(ruta):
+        print(f"Error: no existe el archivo {ruta}")
+        return None
+    return cargar_tabla(tabla, leer_registros(ruta, formato, tipos), **opciones)
+
+
+## ESCANEO PARALELO POR SEGMENTOS (TABLA O INDICE)
+def escanear_paralelo(tabla, segmentos=4, index_name=None, proyeccion=None, filtro=None, tam_pagina=None,
+                      consumo=None):
+    """
+    Recorre toda la tabla (o el indice) repartida en Segment/TotalSegments,
+    un hilo por segmento, siguiendo LastEvaluatedKey en cada uno.
+    Los items se devuelven segun van llegando (generador).
+
+    - index_name: 'duracionSesionIndex', 'fechaRegistroIndex', ...
+    - proyeccion: lista de atributos a devolver (o ProjectionExpression en texto)
+    - filtro: FilterExpression (por ejemplo Attr('id_alumno').gt(2))
+    - tam_pagina: Limit de cada peticion
+    - consumo: dict donde se acumulan las RCU consumidas en 'rcu'
+    """
+    cliente = tabla.meta.client
+    parametros = {"TableName": tabla.name, "TotalSegments": segmentos}
+    if index_name:
+        parametros["IndexName"] = index_name
+    if filtro is not None:
+        parametros["FilterExpression"] = filtro
+    if tam_pagina:
+        parametros["Limit"] = tam_pagina
+    if consumo is not None:
+        consumo.setdefault("rcu", 0.0)
+        parametros["ReturnConsumedCapacity"] = "TOTAL"
+    if isinstance(proyeccion, str):
+        parametros["ProjectionExpression"] = proyeccion
+    elif proyeccion:
+        # Nombres con alias para no chocar con palabras reservadas
+        nombres = {f"#p{i}": atributo for i, atributo in enumerate(proyeccion)}
+        parametros["ProjectionExpression"] = ", ".join(nombres)
+        parametros["ExpressionAttributeNames"] = nombres
+
+    cola = queue.Queue(maxsize=segmentos * 4)
+    parar = threading.Event()
+    lock = threading.Lock()
+    FIN = object()
+
+    def poner(elemento):
+        while not parar.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def escanear_segmento(segmento):
+        try:
+            argumentos = dict(parametros, Segment=segmento)
+            while not parar.is_set():
+                response = cliente.scan(**argumentos)
+                if consumo is not None:
+                    with lock:
+                        consumo["rcu"] += response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+                if response["Items"]:
+                    poner(response["Items"])
+                if "LastEvaluatedKey" not in response:
+                    break
+                argumentos["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+        except Exception as e:
+            poner(e)
+        finally:
+            poner(FIN)
+
+    hilos = [threading.Thread(target=escanear_segmento, args=(segmento,), daemon=True)
+             for segmento in range(segmentos)]
+    for hilo in hilos:
+        hilo.start()
+
+    try:
+        terminados = 0
+        while terminados < segmentos:
+            elemento = cola.get()
+            if elemento is FIN:
+                terminados += 1
+            elif isinstance(elemento, Exception):
+                raise elemento
+            else:
+                yield from elemento
+    finally:
+        # Si se deja de iterar antes de acabar, los hilos paran en la siguiente pagina
+        parar.set()
+
+
+## CONDICIONES QUE PUEDEN IR EN UNA KeyConditionExpression (CLASE -> METODO DE Key)
+CONDICIONES_CLAVE = {
+    Equals: "eq",
+    LessThan: "lt",
+    LessThanEquals: "lte",
+    GreaterThan: "gt",
+    GreaterThanEquals: "gte",
+    Between: "between",
+    BeginsWith: "begins_with",
+}
+
+## INDICES DE LA TABLA: TABLA BASE, LSI Y GSI
+def obtener_indices(tabla):
+    """
+    Lista de dict con index_name (None para la tabla base), tipo, hash,
+    range y atributos proyectados (None si la proyeccion es ALL).
+
+    Sale de los datos que boto3 guarda en el propio Table (un describe_table
+    por objeto Table): una tabla recreada o de otra region/cuenta con el
+    mismo nombre es otro Table y no hereda un esquema antiguo
+    """
+
+    def describir(index_name, tipo, key_schema, proyeccion):
+        claves = {c["KeyType"]: c["AttributeName"] for c in key_schema}
+        atributos = None
+        if proyeccion.get("ProjectionType") != "ALL":
+            atributos = set(claves.values()) | set(proyeccion.get("NonKeyAttributes", []))
+            atributos |= {c["AttributeName"] for c in tabla.key_schema}
+        return {"index_name": index_name, "tipo": tipo, "hash": claves.get("HASH"),
+                "range": claves.get("RANGE"), "atributos": atributos}
+
+    indices = [describir(None, "tabla", tabla.key_schema, {"ProjectionType": "ALL"})]
+    for lsi in tabla.local_secondary_indexes or []:
+        indices.append(describir(lsi["IndexName"], "LSI", lsi["KeySchema"], lsi["Projection"]))
+    for gsi in tabla.global_secondary_indexes or []:
+        indices.append(describir(gsi["IndexName"], "GSI", gsi["KeySchema"], gsi["Projection"]))
+    return indices
+
+
+## SEPARAR UNA CONDICION EN SUS TERMINOS UNIDOS POR AND
+def separar_condiciones(condicion):
+    if condicion is None:
+        return []
+    if isinstance(condicion, And):
+        izquierda, derecha = condicion.get_expression()["values"]
+        return separar_condiciones(izquierda) + separar_condiciones(derecha)
+    return [condicion]
+
+
+## UNIR TERMINOS CON AND (None SI NO HAY NINGUNO)
+def unir_condiciones(terminos):
+    condicion = None
+    for termino in terminos:
+        condicion = termino if condicion is None else condicion & termino
+    return condicion
+
+
+## ATRIBUTOS QUE APARECEN EN UNA CONDICION
+def atributos_condicion(condicion):
+    atributos = set()
+    for valor in condicion.get_expression()["values"]:
+        if isinstance(valor, AttributeBase):
+            atributos.add(valor.name)
+        elif hasattr(valor, "get_expression"):
+            atributos |= atributos_condicion(valor)
+    return atributos
+
+
+## TERMINO SIMPLE SOBRE UN ATRIBUTO (atributo OPERADOR valores) QUE PUEDE IR EN LA CLAVE
+def es_termino_clave(termino, atributo):
+    if type(termino) not in CONDICIONES_CLAVE:
+        return False
+    valores = termino.get_expression()["values"]
+    return isinstance(valores[0], AttributeBase) and valores[0].name == atributo \
+        and not any(isinstance(v, AttributeBase) for v in valores[1:])
+
+
+## CONDICION DE CLAVE DE ORDENACION A PARTIR DE LOS TERMINOS SOBRE ESE ATRIBUTO
+def condicion_ordenacion(terminos, atributo):
+    """
+    Une los terminos en una sola condicion de Key (la KeyConditionExpression
+    admite una por atributo). Un limite inferior y otro superior pasan a
+    between; between es inclusivo, asi que los limites estrictos (gt, lt)
+    se devuelven en excluir para descartarlos despues de leer.
+
+    Devuelve (condicion, excluir) o None si los terminos no se pueden unir
+    """
+    if not all(es_termino_clave(t, atributo) for t in terminos):
+        return None
+    if len(terminos) == 1:
+        valores = terminos[0].get_expression()["values"]
+        return getattr(Key(atributo), CONDICIONES_CLAVE[type(terminos[0])])(*valores[1:]), []
+    if len(terminos) != 2:
+        return None
+
+    inferior = [t for t in terminos if type(t) in (GreaterThan, GreaterThanEquals)]
+    superior = [t for t in terminos if type(t) in (LessThan, LessThanEquals)]
+    if len(inferior) != 1 or len(superior) != 1:
+        return None
+    desde = inferior[0].get_expression()["values"][1]
+    hasta = superior[0].get_expression()["values"][1]
+    excluir = [(atributo, desde)] if type(inferior[0]) is GreaterThan else []
+    excluir += [(atributo, hasta)] if type(superior[0]) is LessThan else []
+    return Key(atributo).between(desde, hasta), excluir
+
+
+## ELEGIR ENTRE QUERY (SOBRE EL MEJOR INDICE) O SCAN
+def planificar_consulta(tabla, condicion, index_name=None, proyeccion=None):
+    """
+    Devuelve el plan para resolver la condicion:
+    {'operacion': 'query' o 'scan', 'index_name', 'key_condition', 'filtro', 'descripcion'}
+
+    Se usa query cuando hay una igualdad sobre la clave de particion de la
+    tabla o de algun indice; el resto de terminos quedan como filtro.
+    Entre varios candidatos gana el que tambien usa la clave de ordenacion.
+
+    DynamoDB no admite las claves del indice en la FilterExpression de una
+    query: si la condicion tiene sobre ellas terminos que no caben en la
+    KeyConditionExpression, ese indice se descarta (siguiente candidato o scan).
+
+    - index_name: limitar el plan a ese indice
+    - proyeccion: atributos que se van a pedir (para descartar indices que no los proyectan)
+
+    El plan incluye tambien 'excluir': (atributo, valor) de los limites
+    estrictos que consultar descarta al leer (ver condicion_ordenacion)
+    """
+    terminos = separar_condiciones(condicion)
+    necesarios = set(proyeccion or []).union(*(atributos_condicion(t) for t in terminos))
+
+    mejor = None
+    for indice in obtener_indices(tabla):
+        if index_name and indice["index_name"] != index_name:
+            continue
+        # Sin proyeccion ALL el indice no devuelve (ni filtra por) todos los atributos
+        if indice["atributos"] is not None and (not proyeccion or not necesarios <= indice["atributos"]):
+            continue
+        terminos_hash = [t for t in terminos if indice["hash"] in atributos_condicion(t)]
+        if len(terminos_hash) != 1 or type(terminos_hash[0]) is not Equals \
+                or not es_termino_clave(terminos_hash[0], indice["hash"]):
+            continue
+        terminos_range = [t for t in terminos if indice["range"] in atributos_condicion(t)]
+        ordenacion = condicion_ordenacion(terminos_range, indice["range"]) if terminos_range else (None, [])
+        if ordenacion is None:
+            continue
+
+        # Primero los que usan tambien la clave de ordenacion; despues tabla, LSI y GSI
+        puntuacion = (bool(terminos_range), {"tabla": 2, "LSI": 1, "GSI": 0}[indice["tipo"]])
+        if mejor is None or puntuacion > mejor[0]:
+            mejor = (puntuacion, indice, terminos_hash + terminos_range, ordenacion)
+
+    if mejor is None:
+        return {"operacion": "scan", "index_name": index_name, "key_condition": None,
+                "filtro": unir_condiciones(terminos), "excluir": [],
+                "descripcion": f"scan de {tabla.name}" + (f" en {index_name}" if index_name else "")}
+
+    _, indice, usados, (condicion_range, excluir) = mejor
+    valor_hash = usados[0].get_expression()["values"][1]
+    key_condition = Key(indice["hash"]).eq(valor_hash)
+    claves = f"{indice['hash']} ="
+    if condicion_range is not None:
+        key_condition = key_condition & condicion_range
+        claves += f", {indice['range']} {condicion_range.expression_operator}"
+    filtro = unir_condiciones([t for t in terminos if all(t is not u for u in usados)])
+
+    return {"operacion": "query", "index_name": indice["index_name"], "key_condition": key_condition,
+            "filtro": filtro, "excluir": excluir,
+            "descripcion": f"query de {tabla.name} en {indice['index_name'] or 'tabla base'} ({claves})"
+            + (" + filtro" if filtro is not None else "")}
+
+
+## CONSULTA CON PLAN AUTOMATICO (QUERY SI SE PUEDE, SCAN SI NO)
+def consultar(tabla, condicion=None, index_name=None, proyeccion=None, segmentos=4):
+    """
+    Devuelve los items que cumplen la condicion (generador), con query sobre
+    el mejor indice si la condicion lo permite y escanear_paralelo si no.
+    Al terminar muestra el plan elegido y las RCU consumidas.
+
+    - condicion: condicion de boto3 (Attr('id_profesor').eq(3) & Attr('duracion_sesion').gt(5000))
+    - index_name: limitar el plan a ese indice
+    - proyeccion: lista de atributos a devolver
+    - segmentos: hilos del scan cuando no se puede usar query
+    """
+    plan = planificar_consulta(tabla, condicion, index_name, proyeccion)
+    consumo = {"rcu": 0.0}
+    devueltos = 0
+    try:
+        if plan["operacion"] == "scan":
+            for item in escanear_paralelo(tabla, segmentos, plan["index_name"], proyeccion,
+                                          plan["filtro"], consumo=consumo):
+                devueltos += 1
+                yield item
+            return
+
+        parametros = {"TableName": tabla.name, "KeyConditionExpression": plan["key_condition"],
+                      "ReturnConsumedCapacity": "TOTAL"}
+        if plan["index_name"]:
+            parametros["IndexName"] = plan["index_name"]
+        if plan["filtro"] is not None:
+            parametros["FilterExpression"] = plan["filtro"]
+        # Los limites estrictos se comprueban aqui: se pide tambien ese atributo si hace falta
+        anadidos = []
+        if proyeccion:
+            anadidos = [a for a in dict.fromkeys(a for a, _ in plan["excluir"]) if a not in proyeccion]
+            nombres = {f"#p{i}": atributo for i, atributo in enumerate(list(proyeccion) + anadidos)}
+            parametros["ProjectionExpression"] = ", ".join(nombres)
+            parametros["ExpressionAttributeNames"] = nombres
+
+        while True:
+            response = tabla.meta.client.query(**parametros)
+            consumo["rcu"] += response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+            for item in response["Items"]:
+                if any(item.get(atributo) == valor for atributo, valor in plan["excluir"]):
+                    continue
+                for atributo in anadidos:
+                    item.pop(atributo, None)
+                devueltos += 1
+                yield item
+            if "LastEvaluatedKey" not in response:
+                break
+            parametros["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    finally:
+        print(f"Plan: {plan['descripcion']} -> {devueltos} items, {consumo['rcu']:.1f} RCU consumidas")
+
+
+## LECTURA MASIVA CON batch_get_item (VARIAS TABLAS, ORDEN DE LA PETICION)
+def obtener_lote(dynamodb_resource, claves, hilos=4, max_reintentos=8, espera_base=0.1):
+    """
+    Devuelve los items de las claves pedidas en el mismo orden (generador),
+    None para las claves que no existen.
+
+    - claves: iterable de (tabla, clave), con tabla el nombre o el Table de boto3:
+      [('alumno', {'id_alumno': 1, 'fecha_conexion': '...'}), ('profesor', {...})]
+    - hilos: bloques de 100 claves leidos a la vez
+    - max_reintentos: reintentos de las UnprocessedKeys con espera exponencial
+    """
+    cliente = dynamodb_resource.meta.client
+
+    def normalizar(tabla, clave, atributos):
+        return (tabla, tuple((atributo, clave[atributo]) for atributo in atributos))
+
+    def leer_bloque(unicas):
+        # unicas: {clave normalizada: (tabla, clave)}, como mucho 100
+        atributos = {}
+        pendientes = {}
+        for tabla, clave in unicas.values():
+            atributos.setdefault(tabla, sorted(clave))
+            pendientes.setdefault(tabla, {"Keys": []})["Keys"].append(clave)
+
+        encontrados = {}
+        intento = 0
+        while pendientes:
+            try:
+                response = cliente.batch_get_item(RequestItems=pendientes)
+            except cliente.exceptions.ProvisionedThroughputExceededException:
+                response = {"UnprocessedKeys": pendientes}
+            for tabla, items in response.get("Responses", {}).items():
+                for item in items:
+                    encontrados[normalizar(tabla, item, atributos[tabla])] = item
+
+            pendientes = response.get("UnprocessedKeys") or {}
+            if pendientes:
+                intento += 1
+                if intento > max_reintentos:
+                    total = sum(len(p["Keys"]) for p in pendientes.values())
+                    raise RuntimeError(f"{total} claves sin procesar tras {max_reintentos} reintentos")
+                time.sleep(random.uniform(0, espera_base * (2 ** intento)))
+        return encontrados
+
+    def bloques():
+        # Cada bloque: lista de claves en orden de la peticion + claves sin repetir
+        orden, unicas = [], {}
+        for tabla, clave in claves:
+            tabla = getattr(tabla, "name", tabla)
+            normalizada = normalizar(tabla, clave, sorted(clave))
+            if normalizada not in unicas and len(unicas) == 100:
+                yield orden, unicas
+                orden, unicas = [], {}
+            unicas[normalizada] = (tabla, clave)
+            orden.append(normalizada)
+        if orden:
+            yield orden, unicas
+
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        en_vuelo = []
+        for orden, unicas in bloques():
+            en_vuelo.append((orden, executor.submit(leer_bloque, unicas)))
+            # Se mantienen unos pocos bloques por delante y se devuelven en orden
+            while len(en_vuelo) > hilos * 2:
+                orden_listo, futuro = en_vuelo.pop(0)
+                encontrados = futuro.result()
+                for normalizada in orden_listo:
+                    yield encontrados.get(normalizada)
+        for orden_listo, futuro in en_vuelo:
+            encontrados = futuro.result()
+            for normalizada in orden_listo:
+                yield encontrados.get(normalizada)
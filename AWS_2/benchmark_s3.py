@@ -0,0 +1,256 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# tarea.py está junto a este script: se puede lanzar desde cualquier directorio
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tarea import StorageManager, percentil
+
+# ==================== BENCHMARK DE CLASES DE ALMACENAMIENTO S3 ====================
+#
+# Mide latencias (p50/p90/p99) y throughput de put, get, list y delete para
+# cada storage class y nivel de concurrencia a través de StorageManager.
+#
+# Ejemplos:
+#   python benchmark_s3.py --moto
+#   python benchmark_s3.py --endpoint-url http://localhost:9000 --tamanos 1KB,1MB --num-objetos 200
+#   python benchmark_s3.py --moto --baseline resultados_anteriores.json --tolerancia 0.25
+
+STORAGE_CLASSES = ["STANDARD", "STANDARD_IA", "INTELLIGENT_TIERING", "GLACIER", "DEEP_ARCHIVE"]
+
+# Clases de archivo: sus objetos no se pueden leer sin restaurarlos antes
+CLASES_ARCHIVO = ("GLACIER", "DEEP_ARCHIVE")
+
+UNIDADES = {"B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parsear_tamano(texto):
+    """
+    Convierte "1KB", "4MB", "512" en bytes
+    """
+    texto = texto.strip().upper()
+    for unidad in ("GB", "MB", "KB", "B"):
+        if texto.endswith(unidad):
+            return int(float(texto[:-len(unidad)]) * UNIDADES[unidad])
+    return int(texto)
+
+
+def medir(operacion, argumentos, concurrencia):
+    """
+    Ejecuta operacion(*args) para cada elemento de argumentos con un pool
+    de hilos y mide la latencia de cada llamada.
+
+    Retorna: (latencias en segundos, errores, tiempo total)
+    """
+    def cronometrar(args):
+        inicio = time.perf_counter()
+        ok = operacion(*args)
+        return time.perf_counter() - inicio, ok is not False and ok is not None
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+        medidas = list(executor.map(cronometrar, argumentos))
+    total = time.perf_counter() - inicio
+
+    latencias = [latencia for latencia, ok in medidas if ok]
+    errores = sum(1 for _, ok in medidas if not ok)
+    return latencias, errores, total
+
+
+def resumir(storage_class, tamano, concurrencia, operacion, latencias, errores, total, bytes_op):
+    """
+    Construye el registro de resultados de una operación
+    """
+    num_ok = len(latencias)
+    return {
+        "storage_class": storage_class,
+        "tamano_bytes": tamano,
+        "concurrencia": concurrencia,
+        "operacion": operacion,
+        "operaciones": num_ok + errores,
+        "errores": errores,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 3) if latencias else None,
+        "p90_ms": round(percentil(latencias, 90) * 1000, 3) if latencias else None,
+        "p99_ms": round(percentil(latencias, 99) * 1000, 3) if latencias else None,
+        "max_ms": round(max(latencias) * 1000, 3) if latencias else None,
+        "media_ms": round(statistics.mean(latencias) * 1000, 3) if latencias else None,
+        "total_s": round(total, 4),
+        "ops_por_segundo": round(num_ok / total, 2) if total else None,
+        "mb_por_segundo": round(num_ok * bytes_op / total / 1024 / 1024, 3) if total and bytes_op else None,
+    }
+
+
+def ejecutar_benchmark(manager, bucket_name, storage_classes, tamanos, concurrencias, num_objetos):
+    """
+    Recorre todas las combinaciones de storage class, tamaño y concurrencia
+
+    Retorna: Lista de registros de resultados
+    """
+    resultados = []
+    for storage_class in storage_classes:
+        for tamano in tamanos:
+            payload = os.urandom(tamano)
+            for concurrencia in concurrencias:
+                prefijo = f"bench/{storage_class}/{tamano}/{concurrencia}/"
+                claves = [f"{prefijo}obj_{i:06d}" for i in range(num_objetos)]
+                print(f"[BENCH] {storage_class} {tamano} bytes x{num_objetos}, concurrencia {concurrencia}",
+                      file=sys.stderr)
+
+                # Los métodos de StorageManager imprimen cada operación: se silencian
+                with contextlib.redirect_stdout(io.StringIO()):
+                    latencias, errores, total = medir(
+                        lambda clave: manager.subir_contenido_s3_con_storage_class(
+                            bucket_name, payload, clave, storage_class=storage_class,
+                            content_type="application/octet-stream",
+                        ),
+                        [(clave,) for clave in claves],
+                        concurrencia,
+                    )
+                    resultados.append(resumir(storage_class, tamano, concurrencia, "put",
+                                              latencias, errores, total, tamano))
+
+                    if storage_class not in CLASES_ARCHIVO:
+                        latencias, errores, total = medir(
+                            lambda clave: manager.obtener_contenido_s3(bucket_name, clave),
+                            [(clave,) for clave in claves],
+                            concurrencia,
+                        )
+                        resultados.append(resumir(storage_class, tamano, concurrencia, "get",
+                                                  latencias, errores, total, tamano))
+
+                    latencias, errores, total = medir(
+                        lambda prefix: sum(1 for _ in manager.iterar_objetos_s3(bucket_name, prefix)),
+                        [(prefijo,)],
+                        1,
+                    )
+                    resultados.append(resumir(storage_class, tamano, concurrencia, "list",
+                                              latencias, errores, total, 0))
+
+                    latencias, errores, total = medir(
+                        lambda clave: manager.eliminar_objeto_s3(bucket_name, clave),
+                        [(clave,) for clave in claves],
+                        concurrencia,
+                    )
+                    resultados.append(resumir(storage_class, tamano, concurrencia, "delete",
+                                              latencias, errores, total, 0))
+    return resultados
+
+
+def comparar_con_baseline(resultados, baseline_path, tolerancia):
+    """
+    Compara el p50 de cada operación con un archivo de resultados anterior
+
+    Retorna: Lista de regresiones (texto)
+    """
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["resultados"]
+
+    def clave(r):
+        return (r["storage_class"], r["tamano_bytes"], r["concurrencia"], r["operacion"])
+
+    anteriores = {clave(r): r for r in baseline}
+    regresiones = []
+    for r in resultados:
+        anterior = anteriores.get(clave(r))
+        if not anterior or not anterior["p50_ms"] or not r["p50_ms"]:
+            continue
+        if r["p50_ms"] > anterior["p50_ms"] * (1 + tolerancia):
+            regresiones.append(
+                f"{clave(r)}: p50 {anterior['p50_ms']} ms -> {r['p50_ms']} ms"
+            )
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de StorageManager por storage class")
+    parser.add_argument("--storage-classes", default=",".join(STORAGE_CLASSES),
+                        help="Clases separadas por comas")
+    parser.add_argument("--tamanos", default="1KB,64KB,1MB",
+                        help="Tamaños de objeto separados por comas (B, KB, MB, GB)")
+    parser.add_argument("--concurrencias", default="1,8",
+                        help="Niveles de concurrencia separados por comas")
+    parser.add_argument("--num-objetos", type=int, default=50,
+                        help="Objetos por combinación")
+    parser.add_argument("--endpoint-url", default=None,
+                        help="Endpoint S3 local (ej: MinIO en http://localhost:9000)")
+    parser.add_argument("--moto", action="store_true",
+                        help="Ejecutar contra el S3 simulado en memoria de moto")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--salida", default="resultados_benchmark_s3.json",
+                        help="Archivo JSON de resultados")
+    parser.add_argument("--baseline", default=None,
+                        help="Resultados anteriores con los que comparar el p50")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="Empeoramiento permitido del p50 respecto al baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    if not args.moto and not args.endpoint_url:
+        parser.error("Usa --moto o --endpoint-url para no ejecutar contra S3 real")
+
+    storage_classes = [c.strip() for c in args.storage_classes.split(",") if c.strip()]
+    tamanos = [parsear_tamano(t) for t in args.tamanos.split(",") if t.strip()]
+    concurrencias = [int(c) for c in args.concurrencias.split(",") if c.strip()]
+
+    simulador = contextlib.nullcontext()
+    if args.moto:
+        try:
+            from moto import mock_aws
+        except ImportError:
+            parser.error("moto no está instalado (pip install moto)")
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        simulador = mock_aws()
+
+    with simulador:
+        manager = StorageManager(region=args.region, endpoint_url=args.endpoint_url)
+        bucket_name = f"benchmark-s3-{int(time.time())}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            creado = manager.crear_bucket_s3(bucket_name)
+        if not creado:
+            print(f"✗ No se pudo crear el bucket {bucket_name}")
+            sys.exit(1)
+
+        try:
+            resultados = ejecutar_benchmark(
+                manager, bucket_name, storage_classes, tamanos, concurrencias, args.num_objetos
+            )
+        finally:
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager.eliminar_bucket_s3(bucket_name)
+
+    with open(args.salida, "w") as f:
+        json.dump({
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "endpoint": "moto" if args.moto else args.endpoint_url,
+            "num_objetos": args.num_objetos,
+            "resultados": resultados,
+        }, f, indent=2)
+
+    print(f"{'CLASE':<20} {'TAMAÑO':>10} {'CONC':>5} {'OP':<7} {'p50 ms':>9} {'p90 ms':>9} "
+          f"{'p99 ms':>9} {'ops/s':>9} {'MB/s':>8} {'ERR':>4}")
+    for r in resultados:
+        print(f"{r['storage_class']:<20} {r['tamano_bytes']:>10} {r['concurrencia']:>5} "
+              f"{r['operacion']:<7} {r['p50_ms'] or '-':>9} {r['p90_ms'] or '-':>9} "
+              f"{r['p99_ms'] or '-':>9} {r['ops_por_segundo'] or '-':>9} "
+              f"{r['mb_por_segundo'] or '-':>8} {r['errores']:>4}")
+    print(f"\n✓ Resultados guardados en {args.salida}")
+
+    if args.baseline:
+        regresiones = comparar_con_baseline(resultados, args.baseline, args.tolerancia)
+        if regresiones:
+            print(f"\n✗ {len(regresiones)} regresiones respecto a {args.baseline}:")
+            for regresion in regresiones:
+                print(f"  {regresion}")
+            sys.exit(1)
+        print(f"✓ Sin regresiones respecto a {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
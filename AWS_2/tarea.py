@@ -1,8 +1,40 @@
 import boto3
 import time
+import asyncio
+import functools
+import itertools
+from botocore.config import Config
+from botocore.exceptions import (
+    ClientError, ConnectionClosedError, IncompleteReadError, ReadTimeoutError, ResponseStreamingError,
+)
 import os
 import json
+import random
+import hashlib
+import codecs
+import csv
+import datetime
+import decimal
+import re
+import zlib
+import bz2
+import mmap
+import threading
+import tempfile
+from contextlib import contextmanager
+import queue
+import uuid
+import shlex
+import posixpath
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+import paramiko
+
+try:
+    import zstandard  # Opcional: compresión zstd (pip install zstandard)
+except ImportError:
+    zstandard = None
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -14,6 +46,14 @@ class ConfigManager:
     """
     Clase para gestionar la configuración persistente entre ejecuciones.
     Guarda y carga los IDs de recursos en un archivo JSON.
+
+    La configuración se mantiene en memoria para todo el proceso y solo se
+    vuelve a leer del disco si el archivo cambia (mtime). Las escrituras son
+    atómicas (archivo temporal + rename), se protegen con un bloqueo de
+    archivo frente a otros procesos y solo aplican las claves modificadas.
+    Dentro de "with ConfigManager.lote():" las escrituras se agrupan en una;
+    el lote es de cada hilo, así que no retrasa ni adelanta las escrituras
+    de otros hilos.
     """
     
     CONFIG_FILE = "aws_config.json"
@@ -31,97 +71,1673 @@ class ConfigManager:
         "mount_target_id": None,
         "s3_bucket": None
     }
+
+    # Estado en memoria compartido por todo el proceso
+    cache = None
+    cache_firma = None
+    pendientes = {}  # {id de hilo: claves cambiadas y aún no guardadas}
+    locales = threading.local()  # nivel_lote de cada hilo
+    lock = threading.RLock()
+
+    @staticmethod
+    def claves_pendientes():
+        """
+        Claves cambiadas por el hilo actual que aún no se han guardado
+        """
+        return ConfigManager.pendientes.setdefault(threading.get_ident(), set())
+
+    @staticmethod
+    def firma_archivo():
+        """
+        Devuelve (mtime, tamaño) del archivo o None si no existe
+        """
+        try:
+            stat = os.stat(ConfigManager.CONFIG_FILE)
+            return (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    @contextmanager
+    def bloqueo_archivo():
+        """
+        Bloqueo exclusivo entre procesos sobre "<CONFIG_FILE>.lock"
+        """
+        with open(f"{ConfigManager.CONFIG_FILE}.lock", "a+") as lock_file:
+            if os.name == "nt":
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def leer_archivo():
+        with open(ConfigManager.CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def cargar_config():
+        """
+        Carga la configuración desde el archivo JSON.
+        Si no existe, crea uno nuevo con valores por defecto.
+        Solo lee el disco la primera vez o si el archivo ha cambiado.
+        """
+        with ConfigManager.lock:
+            firma = ConfigManager.firma_archivo()
+            if ConfigManager.cache is not None and firma == ConfigManager.cache_firma:
+                return dict(ConfigManager.cache)
+
+            if firma is None:
+                print(f"ℹ Archivo de configuración no encontrado, creando nuevo...")
+                ConfigManager.guardar_config(ConfigManager.DEFAULT_CONFIG)
+                return dict(ConfigManager.cache)
+
+            try:
+                config = ConfigManager.leer_archivo()
+                print(f"✓ Configuración cargada desde {ConfigManager.CONFIG_FILE}")
+            except Exception as e:
+                print(f"⚠ Error al cargar configuración: {str(e)}")
+                config = ConfigManager.DEFAULT_CONFIG.copy()
+
+            # Los cambios aún no guardados de este proceso tienen prioridad
+            if ConfigManager.cache is not None:
+                for key in set().union(*ConfigManager.pendientes.values()):
+                    config[key] = ConfigManager.cache.get(key)
+            ConfigManager.cache = config
+            ConfigManager.cache_firma = firma
+            return dict(config)
+    
+    @staticmethod
+    def guardar_config(config):
+        """
+        Guarda la configuración completa en el archivo JSON.
+        """
+        with ConfigManager.lock:
+            ConfigManager.cache = dict(config)
+            ConfigManager.escribir(reemplazar_todo=True)
+
+    @staticmethod
+    def escribir(reemplazar_todo=False):
+        """
+        Escribe en disco los cambios pendientes del hilo actual de forma atómica.
+        Si otro proceso modificó el archivo, se combinan sus valores con las
+        claves cambiadas. Los cambios de otros hilos que estén dentro de un
+        lote se quedan en memoria hasta que termine su lote.
+        """
+        with ConfigManager.lock:
+            propias = ConfigManager.pendientes.pop(threading.get_ident(), set())
+            if reemplazar_todo:
+                ConfigManager.pendientes = {}  # La configuración completa sustituye a todo
+            ajenas = set().union(*ConfigManager.pendientes.values())
+            try:
+                with ConfigManager.bloqueo_archivo():
+                    if reemplazar_todo or ConfigManager.firma_archivo() is None:
+                        config = {k: v for k, v in ConfigManager.cache.items() if k not in ajenas}
+                    else:
+                        try:
+                            config = ConfigManager.leer_archivo()
+                        except Exception:
+                            config = {k: v for k, v in ConfigManager.cache.items() if k not in ajenas}
+                        for key in propias:
+                            config[key] = ConfigManager.cache.get(key)
+
+                    directorio = os.path.dirname(os.path.abspath(ConfigManager.CONFIG_FILE))
+                    fd, tmp_path = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+                    try:
+                        with os.fdopen(fd, 'w') as f:
+                            json.dump(config, f, indent=4)
+                            f.flush()
+                            os.fsync(f.fileno())
+                        os.replace(tmp_path, ConfigManager.CONFIG_FILE)
+                    except Exception:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+
+                    nueva = dict(config)
+                    for key in ajenas:
+                        if key in ConfigManager.cache:
+                            nueva[key] = ConfigManager.cache[key]
+                    ConfigManager.cache = nueva
+                    ConfigManager.cache_firma = ConfigManager.firma_archivo()
+                print(f"✓ Configuración guardada en {ConfigManager.CONFIG_FILE}")
+            except Exception as e:
+                ConfigManager.claves_pendientes().update(propias)
+                print(f"✗ Error al guardar configuración: {str(e)}")
+
+    @staticmethod
+    @contextmanager
+    def lote():
+        """
+        Agrupa varias actualizaciones en una sola escritura al salir del bloque.
+
+        Uso:
+            with ConfigManager.lote():
+                ConfigManager.actualizar("sg_id", sg_id)
+                ConfigManager.actualizar("subnet_id", subnet_id)
+        """
+        locales = ConfigManager.locales
+        locales.nivel_lote = getattr(locales, "nivel_lote", 0) + 1
+        try:
+            yield
+        finally:
+            locales.nivel_lote -= 1
+            with ConfigManager.lock:
+                if locales.nivel_lote == 0 and ConfigManager.pendientes.get(threading.get_ident()):
+                    ConfigManager.escribir()
+    
+    @staticmethod
+    def actualizar(key, value):
+        """
+        Actualiza un valor específico en la configuración.
+        """
+        with ConfigManager.lock:
+            ConfigManager.cargar_config()
+            if ConfigManager.cache.get(key) == value and key in ConfigManager.cache:
+                return
+            ConfigManager.cache[key] = value
+            ConfigManager.claves_pendientes().add(key)
+            if getattr(ConfigManager.locales, "nivel_lote", 0) == 0:
+                ConfigManager.escribir()
+    
+    @staticmethod
+    def obtener(key, default=None):
+        """
+        Obtiene un valor específico de la configuración.
+        """
+        with ConfigManager.lock:
+            ConfigManager.cargar_config()
+            return ConfigManager.cache.get(key, default)
     
     @staticmethod
-    def cargar_config():
+    def mostrar():
+        """
+        Muestra toda la configuración actual.
+        """
+        config = ConfigManager.cargar_config()
+        print("\n" + "=" * 80)
+        print("CONFIGURACIÓN ACTUAL (aws_config.json)")
+        print("=" * 80)
+        for key, value in config.items():
+            if value:
+                print(f"  {key}: {value}")
+            else:
+                print(f"  {key}: (no configurado)")
+        print("=" * 80)
+    
+    @staticmethod
+    def limpiar():
+        """
+        Limpia toda la configuración (la resetea a valores por defecto).
+        """
+        ConfigManager.guardar_config(ConfigManager.DEFAULT_CONFIG.copy())
+        print("✓ Configuración limpiada")
+
+# ==================== UTILIDADES DE TRANSFERENCIA ====================
+
+# Limites de S3 para subidas multipart
+MULTIPART_TAMANO_MINIMO = 5 * 1024 * 1024
+MULTIPART_MAX_PARTES = 10000
+
+# upload_file de boto3 (TransferConfig por defecto) usa multipart a partir de 8 MB
+TRANSFER_CHUNK_DEFECTO = 8 * 1024 * 1024
+
+
+class RangoIncompletoError(Exception):
+    """
+    El cuerpo de una descarga terminó antes de los bytes pedidos
+    """
+
+
+# Cortes al leer el cuerpo de una respuesta que ya llegó: botocore no los ve
+ERRORES_DE_LECTURA = (
+    ReadTimeoutError, ConnectionClosedError, ResponseStreamingError, IncompleteReadError, RangoIncompletoError,
+)
+
+
+def es_error_transitorio(error):
+    """
+    Indica si reintentar_con_backoff debe repetir la operación: solo los
+    cortes al leer el cuerpo de una respuesta (ERRORES_DE_LECTURA).
+
+    Los errores de las llamadas a la API (throttling, 5xx, fallos de
+    conexión) ya los reintenta botocore con la configuración de
+    AWSClientRegistry, así que aquí no se repiten: cada llamada tiene una
+    única capa de reintentos. Los errores de la petición (parámetros no
+    válidos, permisos...) y los del disco local no se reintentan nunca.
+    """
+    return isinstance(error, ERRORES_DE_LECTURA)
+
+
+def reintentar_con_backoff(funcion, max_reintentos=3, espera_base=0.5, espera_maxima=20,
+                           reintentable=es_error_transitorio):
+    """
+    Ejecuta una función reintentando con espera exponencial y jitter.
+
+    Parámetros:
+        - funcion: Función sin argumentos a ejecutar
+        - max_reintentos (int): Reintentos después del primer intento
+        - espera_base (float): Espera inicial en segundos
+        - espera_maxima (float): Espera máxima entre intentos
+        - reintentable: Función que recibe la excepción y dice si se reintenta
+
+    Retorna: El resultado de la función (relanza la excepción si no se puede
+             reintentar o si todos los intentos fallan)
+    """
+    intento = 0
+    while True:
+        try:
+            return funcion()
+        except Exception as e:
+            if intento >= max_reintentos or not reintentable(e):
+                raise
+            espera = min(espera_maxima, espera_base * (2 ** intento))
+            time.sleep(random.uniform(0, espera))
+            intento += 1
+
+
+def calcular_tamano_parte(tamano_archivo, part_size):
+    """
+    Ajusta el tamaño de parte a los límites de S3 (mínimo 5 MB, máximo 10000 partes)
+    """
+    part_size = max(part_size, MULTIPART_TAMANO_MINIMO)
+    while tamano_archivo > part_size * MULTIPART_MAX_PARTES:
+        part_size *= 2
+    return part_size
+
+
+def calcular_etag_local(file_path, part_size=None, bloque=8 * 1024 * 1024):
+    """
+    Calcula el ETag que S3 asignaría a un archivo local.
+
+    Parámetros:
+        - file_path (str): Ruta del archivo
+        - part_size (int): Tamaño de parte si se subió en multipart (None = subida simple)
+
+    Retorna: ETag sin comillas ("md5" o "md5-N" para multipart)
+    """
+    if not part_size:
+        md5 = hashlib.md5()
+        with open(file_path, "rb") as f:
+            for datos in iter(lambda: f.read(bloque), b""):
+                md5.update(datos)
+        return md5.hexdigest()
+
+    digests = []
+    with open(file_path, "rb") as f:
+        while True:
+            md5 = hashlib.md5()
+            leidos = 0
+            while leidos < part_size:
+                datos = f.read(min(bloque, part_size - leidos))
+                if not datos:
+                    break
+                md5.update(datos)
+                leidos += len(datos)
+            if not leidos:
+                break
+            digests.append(md5.digest())
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+
+def part_size_desde_etag(tamano_archivo, etag, part_sizes_probables=()):
+    """
+    Deduce el tamaño de parte con el que se subió un objeto multipart a
+    partir del número de partes de su ETag ("md5-N").
+
+    Parámetros:
+        - tamano_archivo (int): Tamaño del objeto en bytes
+        - etag (str): ETag remoto sin comillas
+        - part_sizes_probables: Tamaños a probar primero
+
+    Retorna: Tamaño de parte en bytes (None si el ETag no es multipart)
+    """
+    if "-" not in etag:
+        return None
+    num_partes = int(etag.rsplit("-", 1)[1])
+    for part_size in part_sizes_probables:
+        if -(-tamano_archivo // part_size) == num_partes:
+            return part_size
+    # Tamaños no habituales: la parte mínima que da N partes, redondeada a MB
+    mb = 1024 * 1024
+    return -(-tamano_archivo // num_partes // mb) * mb
+
+
+def separar_lineas(bloques, encoding="utf-8", conservar_saltos=False):
+    """
+    Convierte un iterable de bloques de bytes en líneas de texto.
+    Usa un decoder incremental para que los caracteres multibyte partidos
+    entre dos bloques se recompongan correctamente.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    pendiente = ""
+
+    def separar(texto):
+        nonlocal pendiente
+        partes = (pendiente + texto).split("\n")
+        pendiente = partes.pop()
+        for parte in partes:
+            yield parte + "\n" if conservar_saltos else parte.rstrip("\r")
+
+    for bloque in bloques:
+        yield from separar(decoder.decode(bloque))
+
+    yield from separar(decoder.decode(b"", final=True))
+    if pendiente:
+        yield pendiente if conservar_saltos else pendiente.rstrip("\r")
+
+
+# Campo del CSV de resultados de Athena: entre comillas (con "" como escape) o vacío sin comillas
+CAMPO_CSV_ATHENA = re.compile(r'"((?:[^"]|"")*)"|([^,]*)')
+
+
+def filas_csv_athena(lineas):
+    """
+    Lee el CSV de resultados de Athena a partir de sus líneas (con el salto).
+
+    Athena escribe todos los valores entre comillas y los NULL como un campo
+    vacío sin comillas. csv.reader no distingue "" de NULL, así que aquí los
+    NULL se devuelven como None y las cadenas vacías como "", igual que en
+    get_query_results. Los valores entre comillas pueden ocupar varias líneas.
+
+    Retorna: Generador de listas de valores (texto o None)
+    """
+    pendiente = ""
+    for linea in lineas:
+        pendiente += linea
+        if pendiente.count('"') % 2:
+            continue  # Hay un salto de línea dentro de un valor
+        registro = pendiente.rstrip("\r\n")
+        pendiente = ""
+        if not registro:
+            continue
+
+        valores = []
+        posicion = 0
+        while True:
+            campo = CAMPO_CSV_ATHENA.match(registro, posicion)
+            if campo.group(1) is not None:
+                valores.append(campo.group(1).replace('""', '"'))
+            else:
+                valores.append(campo.group(2) or None)
+            posicion = campo.end()
+            if posicion >= len(registro):
+                break
+            posicion += 1  # Saltar la coma
+            if posicion == len(registro):
+                valores.append(None)  # Coma final: último campo NULL
+                break
+        yield valores
+
+
+# Conversión de los tipos de Athena (ResultSetMetadata) a tipos de Python
+CONVERSORES_ATHENA = {
+    "boolean": lambda v: v.lower() == "true",
+    "tinyint": int,
+    "smallint": int,
+    "integer": int,
+    "int": int,
+    "bigint": int,
+    "float": float,
+    "real": float,
+    "double": float,
+    "decimal": decimal.Decimal,
+    "date": datetime.date.fromisoformat,
+    "timestamp": lambda v: datetime.datetime.fromisoformat(v.replace(" UTC", "")),
+}
+
+
+def convertir_valor_athena(valor, tipo):
+    """
+    Convierte un valor de texto devuelto por Athena según el tipo de su columna.
+    Los valores vacíos de columnas no textuales se devuelven como None.
+    """
+    if valor is None:
+        return None
+    conversor = CONVERSORES_ATHENA.get(tipo)
+    if conversor is None:
+        return valor
+    if valor == "":
+        return None
+    try:
+        return conversor(valor)
+    except ValueError:
+        return valor
+
+
+# Tipos del catálogo (Hive) con otro nombre en el SQL de Athena
+TIPOS_SQL_ATHENA = {"string": "varchar", "int": "integer", "float": "real"}
+
+
+def literal_athena(valor, tipo):
+    """
+    Literal SQL de Athena para un valor en texto (tal como lo devuelve
+    Athena) de una columna del tipo indicado: 'texto' para las columnas de
+    texto y CAST('valor' AS tipo) para el resto, de modo que la comparación
+    se hace con el tipo de la columna (fechas, booleanos, decimales...)
+    """
+    texto = "'" + str(valor).replace("'", "''") + "'"
+    tipo = (tipo or "string").lower()
+    base = tipo.split("(")[0]
+    if base in ("string", "varchar", "char"):
+        return texto
+    return f"CAST({texto} AS {TIPOS_SQL_ATHENA.get(base, base)}{tipo[len(base):]})"
+
+
+# Registro compacto de un objeto listado en S3 (size=None indica un prefijo/carpeta)
+ObjetoS3 = namedtuple("ObjetoS3", ["key", "size", "last_modified", "storage_class", "etag"])
+
+# Versión de un objeto en un bucket versionado (size=None indica un delete marker)
+VersionS3 = namedtuple("VersionS3", ["key", "version_id", "last_modified", "size", "is_latest", "etag"])
+
+
+class ProgresoTransferencia:
+    """
+    Acumula los bytes transferidos por varios hilos y notifica un callback
+    con (bytes_transferidos, bytes_totales, throughput en bytes/s).
+    """
+
+    def __init__(self, total, callback=None, transferidos=0):
+        self.total = total
+        self.callback = callback
+        self.transferidos = transferidos
+        self.inicio = time.time()
+        self.bytes_sesion = 0
+        self.lock = threading.Lock()
+
+    def sumar(self, num_bytes):
+        with self.lock:
+            self.transferidos += num_bytes
+            self.bytes_sesion += num_bytes
+            transcurrido = max(time.time() - self.inicio, 1e-6)
+            throughput = self.bytes_sesion / transcurrido
+            transferidos = self.transferidos
+        if self.callback:
+            self.callback(transferidos, self.total, throughput)
+        return throughput
+
+
+# ==================== CÓDECS DE COMPRESIÓN ====================
+
+# Valores de Content-Encoding soportados ("zstd" requiere el paquete zstandard)
+CODECS_COMPRESION = ("gzip", "zstd")
+
+
+def resolver_codec(codec):
+    """
+    Devuelve el códec utilizable: zstd pasa a gzip si zstandard no está instalado
+    """
+    if codec == "zstd" and zstandard is None:
+        print("⚠ zstandard no está instalado (pip install zstandard), se usa gzip")
+        return "gzip"
+    if codec not in CODECS_COMPRESION:
+        raise ValueError(f"Códec no soportado: {codec}")
+    return codec
+
+
+def comprimir(datos, codec, nivel=None):
+    """
+    Comprime bytes con gzip o zstd
+    """
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=nivel or 3).compress(datos)
+    compresor = zlib.compressobj(nivel or 6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compresor.compress(datos) + compresor.flush()
+
+
+def descomprimir_bloques(bloques, codec):
+    """
+    Descomprime de forma incremental un iterable de bloques de bytes.
+    Los códecs desconocidos (o sin compresión) se devuelven tal cual.
+    """
+    if codec == "gzip":
+        descompresor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif codec == "bzip2":
+        descompresor = bz2.BZ2Decompressor()
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("El objeto está comprimido con zstd: pip install zstandard")
+        descompresor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        yield from bloques
+        return
+
+    for bloque in bloques:
+        datos = descompresor.decompress(bloque)
+        if datos:
+            yield datos
+    if codec == "gzip":
+        resto = descompresor.flush()
+        if resto:
+            yield resto
+
+
+# ==================== FILTROS PARA S3 SELECT ====================
+
+# Content-Encoding del objeto -> CompressionType de S3 Select (zstd solo en local)
+COMPRESION_S3_SELECT = {"gzip": "GZIP", "x-gzip": "GZIP", "bzip2": "BZIP2", "x-bzip2": "BZIP2", "zstd": "ZSTD"}
+
+OPERADORES_S3_SELECT = {
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<>": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "LIKE": lambda a, patron: re.fullmatch(
+        "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in patron),
+        str(a), re.DOTALL,
+    ) is not None,
+    "IN": lambda a, valores: a in valores,
+}
+
+
+def es_numerico(valor):
+    return isinstance(valor, (int, float, decimal.Decimal)) and not isinstance(valor, bool)
+
+
+def literal_s3_select(valor):
+    """
+    Convierte un valor de Python en un literal SQL de S3 Select
+    """
+    if es_numerico(valor):
+        return str(valor)
+    return "'" + str(valor).replace("'", "''") + "'"
+
+
+def construir_sql_s3_select(columnas=None, filtro=None, limite=None, campos_texto=True):
+    """
+    Construye la consulta SQL de S3 Select a partir de una proyección y un filtro.
+
+    Parámetros:
+        - columnas (list): Columnas a devolver (None = todas)
+        - filtro (list): Condiciones (columna, operador, valor) unidas con AND.
+            Operadores: =, !=, <>, <, <=, >, >=, LIKE, IN (valor = lista)
+        - limite (int): Número máximo de filas
+        - campos_texto (bool): Los campos son texto (CSV): las comparaciones
+            con números se hacen con CAST
+
+    Retorna: Consulta SQL (str)
+    """
+    def referencia(columna):
+        return 's."' + columna.replace('"', '""') + '"'
+
+    proyeccion = ", ".join(referencia(c) for c in columnas) if columnas else "*"
+    condiciones = []
+    for columna, operador, valor in filtro or ():
+        operador = operador.upper()
+        if operador not in OPERADORES_S3_SELECT:
+            raise ValueError(f"Operador no soportado en S3 Select: {operador}")
+
+        valores = list(valor) if operador == "IN" else [valor]
+        expresion = referencia(columna)
+        if campos_texto and all(es_numerico(v) for v in valores):
+            expresion = f"CAST({expresion} AS FLOAT)"
+
+        if operador == "IN":
+            condiciones.append(f"{expresion} IN ({', '.join(literal_s3_select(v) for v in valores)})")
+        else:
+            condiciones.append(f"{expresion} {operador} {literal_s3_select(valor)}")
+
+    sql = f"SELECT {proyeccion} FROM S3Object s"
+    if condiciones:
+        sql += " WHERE " + " AND ".join(condiciones)
+    if limite:
+        sql += f" LIMIT {int(limite)}"
+    return sql
+
+
+def cumple_filtro(fila, filtro):
+    """
+    Evalúa en local las mismas condiciones que construir_sql_s3_select.
+    Los valores de texto se convierten a número cuando se comparan con números.
+    """
+    for columna, operador, valor in filtro or ():
+        actual = fila.get(columna)
+        if actual is None:
+            return False
+        operador = operador.upper()
+
+        if operador == "IN":
+            valores = list(valor)
+            if valores and all(es_numerico(v) for v in valores):
+                valores = [float(v) for v in valores]
+                try:
+                    actual = float(actual)
+                except (TypeError, ValueError):
+                    return False
+        else:
+            valores = valor
+            if es_numerico(valor):
+                valores = float(valor)
+                try:
+                    actual = float(actual)
+                except (TypeError, ValueError):
+                    return False
+
+        if not OPERADORES_S3_SELECT[operador](actual, valores):
+            return False
+    return True
+
+# ==================== EJECUTOR DE CONSULTAS ATHENA ====================
+
+ESTADOS_FINALES_ATHENA = ("SUCCEEDED", "FAILED", "CANCELLED")
+
+
+def esperar_query_athena(athena_client, query_id, timeout=300, espera_inicial=0.5,
+                         espera_maxima=10):
+    """
+    Espera a que termine una query de Athena consultando su estado con
+    espera exponencial y jitter. Si se supera el timeout la query se cancela.
+
+    Retorna: Diccionario con query_id, estado, motivo, bytes_escaneados,
+             tiempo_ejecucion_ms y tiempo_total_s
+    """
+    inicio = time.time()
+    espera = espera_inicial
+    while True:
+        ejecucion = athena_client.get_query_execution(QueryExecutionId=query_id)["QueryExecution"]
+        estado = ejecucion["Status"]["State"]
+        if estado in ESTADOS_FINALES_ATHENA:
+            break
+        if time.time() - inicio > timeout:
+            athena_client.stop_query_execution(QueryExecutionId=query_id)
+            estado = "TIMEOUT"
+            break
+        time.sleep(random.uniform(espera / 2, espera))
+        espera = min(espera * 2, espera_maxima)
+
+    estadisticas = ejecucion.get("Statistics", {})
+    return {
+        "query_id": query_id,
+        "estado": estado,
+        "motivo": ejecucion["Status"].get("StateChangeReason"),
+        "bytes_escaneados": estadisticas.get("DataScannedInBytes", 0),
+        "tiempo_ejecucion_ms": estadisticas.get("EngineExecutionTimeInMillis", 0),
+        "tiempo_total_s": round(time.time() - inicio, 3),
+    }
+
+
+class AthenaExecutor:
+    """
+    Ejecuta varias queries de Athena a la vez con un límite de concurrencia.
+    Cada query enviada devuelve un Future cuyo resultado es el diccionario
+    de esperar_query_athena (estado, bytes escaneados, tiempos).
+
+    Uso:
+        with AthenaExecutor(manager.athena_client, max_concurrentes=5) as executor:
+            futuros = [executor.enviar(sql, "mi_db", "s3://bucket/athena-results/") for sql in sqls]
+            resultados = [f.result() for f in futuros]
+    """
+
+    def __init__(self, athena_client, max_concurrentes=5, timeout=300,
+                 espera_inicial=0.5, espera_maxima=10):
+        self.athena_client = athena_client
+        self.timeout = timeout
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrentes)
+
+    def enviar(self, sql, database_name, output_location, **extra):
+        """
+        Envía una query y devuelve un Future. Los parámetros extra se pasan
+        tal cual a start_query_execution.
+        """
+        return self.pool.submit(self.ejecutar, sql, database_name, output_location, extra)
+
+    def ejecutar(self, sql, database_name, output_location, extra=None):
+        params = {
+            "QueryString": sql,
+            "ResultConfiguration": {"OutputLocation": output_location},
+        }
+        if database_name:
+            params["QueryExecutionContext"] = {"Database": database_name}
+        # Token fijo: si botocore repite el envío (throttling, 5xx o timeout)
+        # y el primero sí llegó a Athena, el reintento devuelve esa misma query
+        # en vez de lanzar otra
+        params["ClientRequestToken"] = str(uuid.uuid4())
+        params.update(extra or {})
+
+        response = self.athena_client.start_query_execution(**params)
+        resultado = esperar_query_athena(
+            self.athena_client,
+            response["QueryExecutionId"],
+            timeout=self.timeout,
+            espera_inicial=self.espera_inicial,
+            espera_maxima=self.espera_maxima,
+        )
+        resultado["sql"] = sql
+        return resultado
+
+    def cerrar(self):
+        self.pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+# Funciones de Athena (Trino) que devuelven algo distinto en cada ejecución
+FUNCIONES_NO_DETERMINISTAS = re.compile(
+    r"\b(?:(?:now|rand|random|uuid|shuffle)\s*\(|"
+    r"(?:current_date|current_time|current_timestamp|current_timezone|localtime|localtimestamp)\b)",
+    re.I,
+)
+
+
+def a_json_athena(valor):
+    """
+    Serializa los tipos de CONVERSORES_ATHENA que JSON no admite
+    """
+    if isinstance(valor, decimal.Decimal):
+        return {"decimal": str(valor)}
+    if isinstance(valor, datetime.datetime):
+        return {"timestamp": valor.isoformat()}
+    if isinstance(valor, datetime.date):
+        return {"date": valor.isoformat()}
+    raise TypeError(f"Tipo no serializable en la caché: {type(valor).__name__}")
+
+
+def desde_json_athena(objeto):
+    """
+    Inverso de a_json_athena (object_hook de json.loads)
+    """
+    if len(objeto) == 1:
+        tipo, valor = next(iter(objeto.items()))
+        if tipo == "decimal":
+            return decimal.Decimal(valor)
+        if tipo == "timestamp":
+            return datetime.datetime.fromisoformat(valor)
+        if tipo == "date":
+            return datetime.date.fromisoformat(valor)
+    return objeto
+
+
+class AthenaResultCache:
+    """
+    Caché local de resultados de Athena.
+
+    La clave combina la SQL normalizada con una huella del estado de las
+    tablas consultadas en el catálogo de Glue (esquema, fecha de
+    modificación y particiones), así que cualquier cambio en la definición
+    de las tablas invalida la entrada. Los archivos que cambian sin tocar el
+    catálogo solo se detectan con huella_objetos=True (ver huella_tablas_athena). Las queries con funciones
+    no deterministas (now(), rand()...) solo se guardan con un TTL. Los
+    resultados se guardan por columnas en JSON comprimido (nunca con pickle:
+    el directorio puede ser escribible por otros), y se expulsan los menos
+    usados cuando se supera el tamaño máximo.
+    """
+
+    def __init__(self, directorio=".athena_cache", max_mb=256):
+        self.directorio = directorio
+        self.max_bytes = max_mb * 1024 * 1024
+        self.indice_path = os.path.join(directorio, "indice.json")
+        self.lock = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+        self.indice = {}
+        if os.path.exists(self.indice_path):
+            try:
+                with open(self.indice_path, "r") as f:
+                    self.indice = json.load(f)
+            except Exception:
+                self.indice = {}
+
+    @staticmethod
+    def normalizar_sql(sql):
+        """
+        Quita comentarios, espacios sobrantes y el ';' final, y pasa a
+        minúsculas todo lo que no está entre comillas.
+        """
+        sql = re.sub(r"--[^\n]*", " ", sql)
+        sql = re.sub(r"/\*.*?\*/", " ", sql, flags=re.S)
+        partes = re.split(r"('(?:[^']|'')*')", sql)
+        normalizado = []
+        for i, parte in enumerate(partes):
+            if i % 2:
+                normalizado.append(parte)  # Literal: se respeta tal cual
+            else:
+                normalizado.append(re.sub(r"\s+", " ", parte).lower())
+        return "".join(normalizado).strip().rstrip(";").strip()
+
+    @staticmethod
+    def es_determinista(sql):
+        """
+        False si la SQL usa funciones cuyo resultado cambia entre ejecuciones
+        (now(), current_date, rand()...). Los literales no cuentan.
+        """
+        sin_literales = re.sub(r"'(?:[^']|'')*'", "''", sql)
+        return not FUNCIONES_NO_DETERMINISTAS.search(sin_literales)
+
+    def calcular_clave(self, sql, database_name, huella):
+        texto = f"{database_name}\n{self.normalizar_sql(sql)}\n{huella}"
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.json.z")
+
+    def obtener(self, clave, ttl=None):
+        """
+        Retorna {"columnas": [...], "filas": [...]} o None si no está en caché
+        (o si la entrada tiene más de ttl segundos)
+        """
+        with self.lock:
+            entrada = self.indice.get(clave)
+            caducada = ttl is not None and entrada and time.time() - entrada.get("creado", 0) > ttl
+            if not entrada or caducada or not os.path.exists(self.ruta(clave)):
+                self.indice.pop(clave, None)
+                return None
+            with open(self.ruta(clave), "rb") as f:
+                datos = json.loads(zlib.decompress(f.read()), object_hook=desde_json_athena)
+            self.indice[clave]["ultimo_acceso"] = time.time()
+            self.guardar_indice()
+
+        return {"columnas": datos["columnas"], "filas": list(zip(*datos["valores"]))}
+
+    def guardar(self, clave, columnas, filas):
+        """
+        Guarda un resultado (almacenado por columnas) y aplica la expulsión LRU
+        """
+        # Una lista por columna, en el orden de columnas
+        valores = [[] for _ in columnas]
+        for fila in filas:
+            for lista, valor in zip(valores, fila):
+                lista.append(valor)
+        datos = zlib.compress(
+            json.dumps({"columnas": columnas, "valores": valores}, default=a_json_athena).encode("utf-8")
+        )
+        if len(datos) > self.max_bytes:
+            return False
+
+        with self.lock:
+            tmp_path = f"{self.ruta(clave)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(datos)
+            os.replace(tmp_path, self.ruta(clave))
+            ahora = time.time()
+            self.indice[clave] = {"tamano": len(datos), "ultimo_acceso": ahora, "creado": ahora}
+
+            # Expulsar las entradas menos usadas hasta caber en el límite
+            total = sum(entrada["tamano"] for entrada in self.indice.values())
+            for vieja in sorted(self.indice, key=lambda c: self.indice[c]["ultimo_acceso"]):
+                if total <= self.max_bytes:
+                    break
+                total -= self.indice.pop(vieja)["tamano"]
+                if os.path.exists(self.ruta(vieja)):
+                    os.remove(self.ruta(vieja))
+            self.guardar_indice()
+        return True
+
+    def guardar_indice(self):
+        tmp_path = f"{self.indice_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.indice, f)
+        os.replace(tmp_path, self.indice_path)
+
+# ==================== INSTRUMENTACIÓN DE LLAMADAS AWS ====================
+
+def tamano_cuerpo(cuerpo):
+    """
+    Bytes que ocupa el cuerpo de una petición de botocore (0 si no se puede saber)
+    """
+    if cuerpo is None or isinstance(cuerpo, dict):
+        return 0
+    if isinstance(cuerpo, (bytes, bytearray)):
+        return len(cuerpo)
+    if isinstance(cuerpo, str):
+        return len(cuerpo.encode("utf-8"))
+    try:
+        posicion = cuerpo.tell()
+        cuerpo.seek(0, os.SEEK_END)
+        fin = cuerpo.tell()
+        cuerpo.seek(posicion)
+        return fin - posicion
+    except Exception:
+        return 0
+
+
+def percentil(valores, p):
+    """
+    Percentil p (0-100) por interpolación lineal
+    """
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+class SinkMetricas:
+    """
+    Destino de las métricas. registrar() recibe cada llamada según termina
+    y exportar() el resumen acumulado; las subclases implementan lo que necesiten.
+    """
+
+    def registrar(self, llamada):
+        pass
+
+    def exportar(self, series):
+        pass
+
+    def cerrar(self):
+        pass
+
+
+class SinkJSONLines(SinkMetricas):
+    """
+    Escribe una línea JSON por llamada a la API
+    """
+
+    def __init__(self, ruta="metricas_aws.jsonl"):
+        self.ruta = ruta
+        self.archivo = open(ruta, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def registrar(self, llamada):
+        linea = json.dumps(llamada)
+        with self.lock:
+            self.archivo.write(linea + "\n")
+
+    def exportar(self, series):
+        with self.lock:
+            self.archivo.flush()
+
+    def cerrar(self):
+        with self.lock:
+            self.archivo.close()
+
+
+class SinkPrometheus(SinkMetricas):
+    """
+    Expone las métricas en formato de texto de Prometheus.
+    Con puerto se sirven en http://<direccion>:<puerto>/metrics desde un hilo aparte.
+    Por defecto solo se escucha en local; para que otra máquina las recoja
+    hay que indicar la dirección de forma explícita (ej: "0.0.0.0").
+    """
+
+    def __init__(self, puerto=None, direccion="127.0.0.1"):
+        self.servidor = None
+        if puerto:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            sink = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    cuerpo = sink.texto().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(cuerpo)))
+                    self.end_headers()
+                    self.wfile.write(cuerpo)
+
+                def log_message(self, *args):
+                    pass
+
+            self.servidor = ThreadingHTTPServer((direccion, puerto), Handler)
+            threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+            print(f"✓ Métricas Prometheus en http://{direccion}:{puerto}/metrics")
+
+    def texto(self):
+        lineas = [
+            "# HELP aws_llamada_segundos Latencia de las llamadas a la API de AWS",
+            "# TYPE aws_llamada_segundos histogram",
+        ]
+        contadores = {
+            "aws_llamada_errores_total": "errores",
+            "aws_llamada_reintentos_total": "reintentos",
+            "aws_bytes_enviados_total": "bytes_enviados",
+            "aws_bytes_recibidos_total": "bytes_recibidos",
+        }
+        series = MetricasAWS.resumen()
+        for serie in series:
+            etiquetas = f'servicio="{serie["servicio"]}",operacion="{serie["operacion"]}"'
+            acumulado = 0
+            for limite, cuenta in zip(MetricasAWS.BUCKETS, serie["buckets"]):
+                acumulado += cuenta
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                lineas.append(f'aws_llamada_segundos_bucket{{{etiquetas},le="{le}"}} {acumulado}')
+            lineas.append(f"aws_llamada_segundos_sum{{{etiquetas}}} {serie['latencia_total_s']}")
+            lineas.append(f"aws_llamada_segundos_count{{{etiquetas}}} {serie['llamadas']}")
+        for metrica, campo in contadores.items():
+            lineas.append(f"# TYPE {metrica} counter")
+            for serie in series:
+                etiquetas = f'servicio="{serie["servicio"]}",operacion="{serie["operacion"]}"'
+                lineas.append(f"{metrica}{{{etiquetas}}} {serie[campo]}")
+        return "\n".join(lineas) + "\n"
+
+    def cerrar(self):
+        if self.servidor:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+
+
+class SinkResumen(SinkMetricas):
+    """
+    Imprime una tabla resumen por servicio y operación al exportar.
+    p50 y p95 se calculan con las latencias medidas (ver MetricasAWS.MAX_MUESTRAS).
+    """
+
+    def exportar(self, series):
+        print("\n[MÉTRICAS] Llamadas a AWS")
+        print(f"  {'SERVICIO':<10} {'OPERACIÓN':<32} {'LLAMADAS':>8} {'ERR':>4} {'REINT':>5} "
+              f"{'MEDIA ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'ENVIADO':>10} {'RECIBIDO':>10}")
+        for serie in sorted(series, key=lambda s: -s["latencia_total_s"]):
+            media = serie["latencia_total_s"] / serie["llamadas"] * 1000 if serie["llamadas"] else 0
+            print(f"  {serie['servicio']:<10} {serie['operacion']:<32} {serie['llamadas']:>8} "
+                  f"{serie['errores']:>4} {serie['reintentos']:>5} {media:>9.1f} "
+                  f"{serie['p50_ms'] if serie['p50_ms'] is not None else '-':>8} "
+                  f"{serie['p95_ms'] if serie['p95_ms'] is not None else '-':>8} "
+                  f"{serie['bytes_enviados']:>10} {serie['bytes_recibidos']:>10}")
+
+
+class MetricasAWS:
+    """
+    Métricas de todas las llamadas a la API de AWS hechas con los clientes
+    de AWSClientRegistry: histograma de latencia, errores, reintentos y
+    bytes enviados/recibidos por servicio y operación.
+
+    Se basa en los eventos de botocore (before-call, after-call y
+    after-call-error), que solo se registran en los clientes mientras las
+    métricas están activas: desactivadas no añaden ningún coste.
+
+    NOTA: En las descargas en streaming (get_object) la latencia medida es
+          la de la respuesta, no la de leer el cuerpo completo.
+    """
+
+    # Límites superiores de los buckets del histograma (segundos)
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+    # Latencias guardadas por serie para los percentiles (muestreo uniforme
+    # por reservorio a partir de este número de llamadas)
+    MAX_MUESTRAS = 10000
+
+    activo = False
+    sinks = []
+    series = {}
+    lock = threading.Lock()
+
+    @staticmethod
+    def activar(*sinks):
+        """
+        Activa las métricas con los destinos indicados (defecto: SinkResumen).
+        Los clientes se vuelven a crear para registrar los eventos.
+        """
+        MetricasAWS.sinks = list(sinks) or [SinkResumen()]
+        MetricasAWS.activo = True
+        AWSClientRegistry.configurar()
+
+    @staticmethod
+    def activar_desde_entorno(variable="AWS_METRICAS"):
+        """
+        Activa las métricas según una variable de entorno (o del .env), ej:
+            AWS_METRICAS=stdout,jsonl=metricas.jsonl,prometheus=9108
+        """
+        valor = os.getenv(variable, "").strip()
+        if not valor:
+            return
+        sinks = []
+        for destino in valor.split(","):
+            tipo, _, argumento = destino.strip().partition("=")
+            if tipo == "stdout":
+                sinks.append(SinkResumen())
+            elif tipo == "jsonl":
+                sinks.append(SinkJSONLines(argumento or "metricas_aws.jsonl"))
+            elif tipo == "prometheus":
+                # prometheus=9108 escucha en local; prometheus=0.0.0.0:9108 en todas las interfaces
+                direccion, _, puerto = argumento.rpartition(":")
+                sinks.append(SinkPrometheus(int(puerto) if puerto else None, direccion or "127.0.0.1"))
+            else:
+                print(f"⚠ Destino de métricas desconocido: {tipo}")
+        MetricasAWS.activar(*sinks)
+
+    @staticmethod
+    def desactivar():
+        """
+        Exporta, cierra los destinos y quita los eventos de los clientes
+        """
+        if not MetricasAWS.activo:
+            return
+        MetricasAWS.exportar()
+        for sink in MetricasAWS.sinks:
+            sink.cerrar()
+        MetricasAWS.sinks = []
+        MetricasAWS.activo = False
+        AWSClientRegistry.configurar()
+
+    @staticmethod
+    def reiniciar():
+        with MetricasAWS.lock:
+            MetricasAWS.series = {}
+
+    @staticmethod
+    def instrumentar(cliente):
+        eventos = cliente.meta.events
+        eventos.register("before-call", MetricasAWS.antes_llamada, unique_id="metricas-antes")
+        eventos.register("after-call", MetricasAWS.despues_llamada, unique_id="metricas-despues")
+        eventos.register("after-call-error", MetricasAWS.error_llamada, unique_id="metricas-error")
+
+    @staticmethod
+    def antes_llamada(params=None, context=None, **kwargs):
+        context["metricas_inicio"] = time.perf_counter()
+        context["metricas_bytes_enviados"] = tamano_cuerpo((params or {}).get("body"))
+
+    @staticmethod
+    def despues_llamada(http_response=None, parsed=None, model=None, context=None,
+                        event_name=None, **kwargs):
+        parsed = parsed or {}
+        metadata = parsed.get("ResponseMetadata", {})
+        longitud = metadata.get("HTTPHeaders", {}).get("content-length")
+        if longitud is None and http_response is not None and not model.has_streaming_output:
+            # Sin Content-Length (respuesta chunked): el cuerpo ya está leído
+            longitud = len(http_response.content or b"")
+
+        # Los errores HTTP (ClientError) también pasan por after-call
+        error = None
+        if metadata.get("HTTPStatusCode", 200) >= 400:
+            error = parsed.get("Error", {}).get("Code") or str(metadata["HTTPStatusCode"])
+
+        MetricasAWS.registrar(
+            event_name, context,
+            bytes_recibidos=int(longitud or 0),
+            reintentos=metadata.get("RetryAttempts", 0),
+            error=error,
+        )
+
+    @staticmethod
+    def error_llamada(exception=None, context=None, event_name=None, **kwargs):
+        # Errores sin respuesta HTTP (conexión, timeouts) tras agotar los reintentos
+        metadata = getattr(exception, "response", {}).get("ResponseMetadata", {})
+        codigo = getattr(exception, "response", {}).get("Error", {}).get("Code")
+        MetricasAWS.registrar(
+            event_name, context,
+            reintentos=metadata.get("RetryAttempts", 0),
+            error=codigo or type(exception).__name__,
+        )
+
+    @staticmethod
+    def registrar(event_name, context, bytes_recibidos=0, reintentos=0, error=None):
+        inicio = context.get("metricas_inicio")
+        if inicio is None:
+            return
+        latencia = time.perf_counter() - inicio
+        _, servicio, operacion = event_name.split(".", 2)
+        bytes_enviados = context.get("metricas_bytes_enviados", 0)
+
+        with MetricasAWS.lock:
+            serie = MetricasAWS.series.get((servicio, operacion))
+            if serie is None:
+                serie = MetricasAWS.series[(servicio, operacion)] = {
+                    "llamadas": 0, "errores": 0, "reintentos": 0,
+                    "bytes_enviados": 0, "bytes_recibidos": 0, "latencia_total_s": 0.0,
+                    "buckets": [0] * len(MetricasAWS.BUCKETS), "muestras": [],
+                }
+            serie["llamadas"] += 1
+            serie["errores"] += 1 if error else 0
+            serie["reintentos"] += reintentos
+            serie["bytes_enviados"] += bytes_enviados
+            serie["bytes_recibidos"] += bytes_recibidos
+            serie["latencia_total_s"] += latencia
+            for i, limite in enumerate(MetricasAWS.BUCKETS):
+                if latencia <= limite:
+                    serie["buckets"][i] += 1
+                    break
+            if len(serie["muestras"]) < MetricasAWS.MAX_MUESTRAS:
+                serie["muestras"].append(latencia)
+            else:
+                posicion = random.randrange(serie["llamadas"])
+                if posicion < MetricasAWS.MAX_MUESTRAS:
+                    serie["muestras"][posicion] = latencia
+
+        llamada = {
+            "timestamp": time.time(),
+            "servicio": servicio,
+            "operacion": operacion,
+            "latencia_ms": round(latencia * 1000, 3),
+            "reintentos": reintentos,
+            "bytes_enviados": bytes_enviados,
+            "bytes_recibidos": bytes_recibidos,
+            "error": error,
+        }
+        for sink in MetricasAWS.sinks:
+            sink.registrar(llamada)
+
+    @staticmethod
+    def percentil(muestras, p):
+        """
+        Percentil p (ms) de las latencias medidas
+        """
+        valor = percentil(muestras, p)
+        return None if valor is None else round(valor * 1000, 1)
+
+    @staticmethod
+    def resumen():
         """
-        Carga la configuración desde el archivo JSON.
-        Si no existe, crea uno nuevo con valores por defecto.
+        Retorna: Lista de series (dict) por servicio y operación
         """
-        if os.path.exists(ConfigManager.CONFIG_FILE):
-            try:
-                with open(ConfigManager.CONFIG_FILE, 'r') as f:
-                    config = json.load(f)
-                    print(f"✓ Configuración cargada desde {ConfigManager.CONFIG_FILE}")
-                    return config
-            except Exception as e:
-                print(f"⚠ Error al cargar configuración: {str(e)}")
-                return ConfigManager.DEFAULT_CONFIG.copy()
-        else:
-            print(f"ℹ Archivo de configuración no encontrado, creando nuevo...")
-            ConfigManager.guardar_config(ConfigManager.DEFAULT_CONFIG)
-            return ConfigManager.DEFAULT_CONFIG.copy()
-    
+        with MetricasAWS.lock:
+            series = [
+                dict(serie, servicio=servicio, operacion=operacion, buckets=list(serie["buckets"]),
+                     muestras=list(serie["muestras"]))
+                for (servicio, operacion), serie in MetricasAWS.series.items()
+            ]
+        for serie in series:
+            muestras = serie.pop("muestras")
+            serie["p50_ms"] = MetricasAWS.percentil(muestras, 50)
+            serie["p95_ms"] = MetricasAWS.percentil(muestras, 95)
+        return series
+
     @staticmethod
-    def guardar_config(config):
+    def exportar():
         """
-        Guarda la configuración en el archivo JSON.
+        Envía el resumen acumulado a todos los destinos
         """
-        try:
-            with open(ConfigManager.CONFIG_FILE, 'w') as f:
-                json.dump(config, f, indent=4)
-            print(f"✓ Configuración guardada en {ConfigManager.CONFIG_FILE}")
-        except Exception as e:
-            print(f"✗ Error al guardar configuración: {str(e)}")
-    
+        if not MetricasAWS.activo:
+            return
+        series = MetricasAWS.resumen()
+        for sink in MetricasAWS.sinks:
+            sink.exportar(series)
+
+
+# ==================== REGISTRO DE CLIENTES AWS ====================
+
+class AWSClientRegistry:
+    """
+    Registro de clientes boto3 compartido por todos los StorageManager.
+
+    Los clientes se crean la primera vez que se usan y se reutilizan después
+    (son thread-safe), así que un programa que solo usa S3 no paga la
+    creación de EC2, EFS o Athena y los hilos comparten el pool de
+    conexiones. Los resources de boto3 no son thread-safe: se guarda uno por
+    hilo. El pool, los reintentos y los timeouts se configuran en un único
+    sitio con AWSClientRegistry.configurar(). Los reintentos de botocore son
+    la única capa de reintentos de las llamadas a la API (reintentar_con_backoff
+    solo repite las lecturas del cuerpo que se cortan). Con MetricasAWS
+    activo, cada cliente nuevo se instrumenta al crearlo.
+    """
+
+    opciones = {
+        "max_pool_connections": 50,
+        "retry_mode": "adaptive",
+        "max_attempts": 5,
+        "connect_timeout": 10,
+        "read_timeout": 60,
+    }
+    clientes = {}
+    locales = threading.local()
+    lock = threading.Lock()
+    session = None
+
     @staticmethod
-    def actualizar(key, value):
+    def configurar(**opciones):
         """
-        Actualiza un valor específico en la configuración.
+        Cambia la configuración de conexión de los clientes.
+
+        Parámetros (todos opcionales):
+            - max_pool_connections (int): Conexiones HTTP por cliente
+            - retry_mode (str): 'legacy', 'standard' o 'adaptive'
+            - max_attempts (int): Intentos totales por llamada
+            - connect_timeout, read_timeout (int): Timeouts en segundos
+
+        Los clientes ya creados se descartan para aplicar la nueva configuración.
         """
-        config = ConfigManager.cargar_config()
-        config[key] = value
-        ConfigManager.guardar_config(config)
-    
+        with AWSClientRegistry.lock:
+            AWSClientRegistry.opciones.update(opciones)
+            AWSClientRegistry.clientes = {}
+            AWSClientRegistry.locales = threading.local()
+
     @staticmethod
-    def obtener(key, default=None):
+    def config_botocore():
+        opciones = AWSClientRegistry.opciones
+        return Config(
+            max_pool_connections=opciones["max_pool_connections"],
+            retries={"mode": opciones["retry_mode"], "max_attempts": opciones["max_attempts"]},
+            connect_timeout=opciones["connect_timeout"],
+            read_timeout=opciones["read_timeout"],
+        )
+
+    @staticmethod
+    def obtener_session():
+        if AWSClientRegistry.session is None:
+            AWSClientRegistry.session = boto3.session.Session()
+        return AWSClientRegistry.session
+
+    @staticmethod
+    def cliente(servicio, region, endpoint_url=None):
         """
-        Obtiene un valor específico de la configuración.
+        Retorna el cliente compartido de un servicio (lo crea si no existe)
         """
-        config = ConfigManager.cargar_config()
-        return config.get(key, default)
-    
+        clave = (servicio, region, endpoint_url)
+        cliente = AWSClientRegistry.clientes.get(clave)
+        if cliente is None:
+            with AWSClientRegistry.lock:
+                cliente = AWSClientRegistry.clientes.get(clave)
+                if cliente is None:
+                    cliente = AWSClientRegistry.obtener_session().client(
+                        servicio,
+                        region_name=region,
+                        endpoint_url=endpoint_url,
+                        config=AWSClientRegistry.config_botocore(),
+                    )
+                    if MetricasAWS.activo:
+                        MetricasAWS.instrumentar(cliente)
+                    AWSClientRegistry.clientes[clave] = cliente
+        return cliente
+
     @staticmethod
-    def mostrar():
+    def recurso(servicio, region, endpoint_url=None):
         """
-        Muestra toda la configuración actual.
+        Retorna el resource de un servicio para el hilo actual
         """
-        config = ConfigManager.cargar_config()
-        print("\n" + "=" * 80)
-        print("CONFIGURACIÓN ACTUAL (aws_config.json)")
-        print("=" * 80)
-        for key, value in config.items():
-            if value:
-                print(f"  {key}: {value}")
+        recursos = getattr(AWSClientRegistry.locales, "recursos", None)
+        if recursos is None:
+            recursos = AWSClientRegistry.locales.recursos = {}
+        clave = (servicio, region, endpoint_url)
+        if clave not in recursos:
+            with AWSClientRegistry.lock:
+                recurso = AWSClientRegistry.obtener_session().resource(
+                    servicio,
+                    region_name=region,
+                    endpoint_url=endpoint_url,
+                    config=AWSClientRegistry.config_botocore(),
+                )
+            if MetricasAWS.activo:
+                MetricasAWS.instrumentar(recurso.meta.client)
+            recursos[clave] = recurso
+        return recursos[clave]
+
+
+class ClienteAWS:
+    """
+    Atributo de StorageManager que obtiene el cliente/resource del registro
+    al primer acceso. Se puede sustituir por instancia (ej: en pruebas).
+    """
+
+    def __init__(self, servicio, tipo="client"):
+        self.servicio = servicio
+        self.tipo = tipo
+
+    def __set_name__(self, owner, nombre):
+        self.nombre = nombre
+
+    def __get__(self, instancia, owner=None):
+        if instancia is None:
+            return self
+        if self.nombre in instancia.__dict__:
+            return instancia.__dict__[self.nombre]
+        endpoint_url = instancia.endpoints.get(self.servicio)
+        if self.tipo == "resource":
+            return AWSClientRegistry.recurso(self.servicio, instancia.region, endpoint_url)
+        return AWSClientRegistry.cliente(self.servicio, instancia.region, endpoint_url)
+
+    def __set__(self, instancia, valor):
+        instancia.__dict__[self.nombre] = valor
+
+# ==================== TRANSFERENCIA SFTP A EC2 ====================
+
+# Tamaño máximo de cada petición de escritura SFTP de paramiko
+TAM_BLOQUE_SFTP = 32 * 1024
+
+
+def claves_host_consola(texto):
+    """
+    Claves de host SSH que cloud-init escribe en la salida de consola de EC2
+    (bloque "BEGIN SSH HOST KEY KEYS").
+
+    Retorna: Conjunto de (tipo, clave en base64)
+    """
+    claves = set()
+    bloque = re.search(r"-----BEGIN SSH HOST KEY KEYS-----(.*?)-----END SSH HOST KEY KEYS-----",
+                       texto or "", flags=re.S)
+    for linea in (bloque.group(1).splitlines() if bloque else []):
+        partes = linea.split()
+        if len(partes) >= 2:
+            claves.add((partes[0], partes[1]))
+    return claves
+
+
+class PoliticaClaveConsola(paramiko.MissingHostKeyPolicy):
+    """
+    Acepta un host que no está en known_hosts solo si su clave coincide con
+    una de las publicadas en la salida de consola de la instancia
+    """
+
+    def __init__(self, ec2_client, instance_id):
+        self.ec2_client = ec2_client
+        self.instance_id = instance_id
+
+    def missing_host_key(self, client, hostname, key):
+        salida = self.ec2_client.get_console_output(InstanceId=self.instance_id, Latest=True).get("Output")
+        claves = claves_host_consola(salida)
+        if not claves:
+            raise paramiko.SSHException(
+                f"La consola de {self.instance_id} no publica claves de host (aún): no se puede "
+                "verificar el host. Añádelo a known_hosts o usa verificar_host=False bajo tu responsabilidad"
+            )
+        if (key.get_name(), key.get_base64()) not in claves:
+            raise paramiko.SSHException(
+                f"La clave de host de {hostname} no coincide con la de la consola de {self.instance_id}"
+            )
+        client.get_host_keys().add(hostname, key.get_name(), key)
+
+
+class PoolSSH:
+    """
+    Conexiones SSH reutilizables, una por instancia EC2 (y modo de compresión).
+
+    El handshake y la autenticación se hacen una sola vez por instancia;
+    después se abren sobre la misma conexión tantos canales SFTP o comandos
+    como haga falta. La IP pública y la key pair se obtienen de
+    describe_instances y la clave privada se busca en <directorio_claves>/<key_name>.pem.
+
+    La clave de host se verifica siempre: vale la de known_hosts o, si el
+    host no está, la que la instancia publica en su salida de consola.
+    verificar_host=False acepta cualquier clave (expuesto a MITM).
+    """
+
+    def __init__(self, ec2_client, usuario="ec2-user", directorio_claves=".", puerto=22,
+                 timeout=15, verificar_host=True):
+        self.ec2_client = ec2_client
+        self.usuario = usuario
+        self.directorio_claves = directorio_claves
+        self.puerto = puerto
+        self.timeout = timeout
+        self.verificar_host = verificar_host
+        self.conexiones = {}
+        self.locks_conexion = {}
+        self.lock = threading.Lock()
+
+    def resolver_instancia(self, instance_id):
+        """
+        Retorna: (host, key_name) de la instancia
+        """
+        response = self.ec2_client.describe_instances(InstanceIds=[instance_id])
+        instancia = response["Reservations"][0]["Instances"][0]
+        host = (instancia.get("PublicIpAddress") or instancia.get("PublicDnsName")
+                or instancia.get("PrivateIpAddress"))
+        if not host:
+            raise RuntimeError(f"La instancia {instance_id} no tiene dirección accesible")
+        return host, instancia.get("KeyName")
+
+    def conectada(self, clave):
+        cliente = self.conexiones.get(clave)
+        if cliente is not None and cliente.get_transport() and cliente.get_transport().is_active():
+            return cliente
+        return None
+
+    def conexion(self, instance_id, compresion=False):
+        """
+        Retorna la conexión (paramiko.SSHClient) de la instancia, abriéndola si no existe
+        """
+        clave = (instance_id, compresion)
+        with self.lock:
+            cliente = self.conectada(clave)
+            if cliente is not None:
+                return cliente
+            lock_clave = self.locks_conexion.setdefault(clave, threading.Lock())
+
+        # Un lock por instancia: las conexiones a instancias distintas se abren a la vez
+        with lock_clave:
+            with self.lock:
+                cliente = self.conectada(clave)
+            if cliente is not None:
+                return cliente
+
+            host, key_name = self.resolver_instancia(instance_id)
+            cliente = paramiko.SSHClient()
+            if self.verificar_host:
+                cliente.load_system_host_keys()
+                cliente.set_missing_host_key_policy(PoliticaClaveConsola(self.ec2_client, instance_id))
             else:
-                print(f"  {key}: (no configurado)")
-        print("=" * 80)
-    
-    @staticmethod
-    def limpiar():
+                print(f"⚠ [SSH] {instance_id}: clave de host sin verificar (verificar_host=False)")
+                cliente.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+            print(f"[SSH] Conectando a {instance_id} ({self.usuario}@{host})...")
+            cliente.connect(
+                host,
+                port=self.puerto,
+                username=self.usuario,
+                key_filename=os.path.join(self.directorio_claves, f"{key_name}.pem") if key_name else None,
+                timeout=self.timeout,
+                compress=compresion,  # Compresión zlib del tráfico SSH
+                allow_agent=False,
+                look_for_keys=not key_name,
+            )
+            cliente.get_transport().set_keepalive(30)
+            with self.lock:
+                self.conexiones[clave] = cliente
+            return cliente
+
+    def ejecutar(self, instance_id, comando, compresion=False):
         """
-        Limpia toda la configuración (la resetea a valores por defecto).
+        Ejecuta un comando remoto sobre la conexión compartida
+
+        Retorna: (código de salida, stdout, stderr)
         """
-        ConfigManager.guardar_config(ConfigManager.DEFAULT_CONFIG.copy())
-        print("✓ Configuración limpiada")
+        cliente = self.conexion(instance_id, compresion)
+        _, stdout, stderr = cliente.exec_command(comando, timeout=self.timeout * 20)
+        salida = stdout.read().decode("utf-8", errors="replace")
+        errores = stderr.read().decode("utf-8", errors="replace")
+        return stdout.channel.recv_exit_status(), salida, errores
+
+    def cerrar(self):
+        with self.lock:
+            for cliente in self.conexiones.values():
+                cliente.close()
+            self.conexiones = {}
 
 # ==================== GESTOR DE ALMACENAMIENTO ====================
 
 class StorageManager:
-    def __init__(self, region="us-east-1"):
+    # Clientes de AWS: se crean al primer uso y se comparten (AWSClientRegistry)
+    ec2_client = ClienteAWS("ec2")
+    ec2_resource = ClienteAWS("ec2", "resource")
+    efs_client = ClienteAWS("efs")
+    s3_client = ClienteAWS("s3")
+    s3_resource = ClienteAWS("s3", "resource")
+    athena_client = ClienteAWS("athena")
+    glue_client = ClienteAWS("glue")
+
+    def __init__(self, region="us-east-1", endpoint_url=None):
         """
-        Inicializa los clientes de AWS
+        Inicializa el gestor. Los clientes de AWS no se crean aquí sino
+        la primera vez que se usan.
 
         Args:
-            region (str): Región de AWS donde crear los recursos (opcional, por defecto us-west-2)
+            region (str): Región de AWS donde crear los recursos (opcional, por defecto us-east-1)
+            endpoint_url (str o dict): Endpoint alternativo. Un texto solo se
+                aplica a S3 (ej: MinIO en local); con un diccionario
+                {servicio: url} se indica por servicio ({"s3": ..., "athena": ...}).
+                Los servicios sin endpoint usan el de AWS.
         """
         self.region = region
-        self.ec2_client = boto3.client("ec2", region_name=region)
-        self.ec2_resource = boto3.resource("ec2", region_name=region)
-        self.efs_client = boto3.client("efs", region_name=region)
-        self.s3_client = boto3.client("s3", region_name=region)
-        self.s3_resource = boto3.resource("s3", region_name=region)
-        self.athena_client = boto3.client("athena", region_name=region)
+        if isinstance(endpoint_url, dict):
+            self.endpoints = dict(endpoint_url)
+        else:
+            self.endpoints = {"s3": endpoint_url} if endpoint_url else {}
+        self.cache_athena = None
+        self.compresion_prefijos = {}
+        self.pool_ssh = None
+
+    def configurar_compresion(self, prefijo, codec="gzip", umbral_bytes=1024, nivel=None):
+        """
+        CONFIGURAR COMPRESIÓN AUTOMÁTICA PARA UN PREFIJO
+
+        El contenido subido con subir_contenido_s3 (o con storage class) bajo
+        el prefijo se comprime si alcanza el umbral, y se guarda con
+        Content-Encoding y metadatos del códec. obtener_contenido_s3 e
+        iterar_contenido_s3 lo descomprimen al leer. Si varias reglas
+        coinciden se aplica la del prefijo más largo.
+
+        Parámetros OBLIGATORIOS:
+            - prefijo (str): Prefijo de las claves (ej: "ventas/", "" = todo el bucket)
+
+        Parámetros OPCIONALES:
+            - codec (str): 'gzip', 'zstd' (requiere zstandard) o None para quitar la regla
+            - umbral_bytes (int): Tamaño mínimo para comprimir (los objetos pequeños apenas ganan)
+            - nivel (int): Nivel de compresión (defecto: 6 en gzip, 3 en zstd)
+
+        NOTA: Las descargas a archivo y las lecturas por rangos devuelven los bytes comprimidos
+        """
+        if codec in (None, "none"):
+            self.compresion_prefijos.pop(prefijo, None)
+            print(f"✓ Compresión desactivada para '{prefijo}'")
+            return
+
+        codec = resolver_codec(codec)
+        self.compresion_prefijos[prefijo] = {
+            "codec": codec,
+            "umbral_bytes": umbral_bytes,
+            "nivel": nivel,
+        }
+        print(f"✓ Compresión {codec} para '{prefijo}' (desde {umbral_bytes} bytes)")
+
+    def preparar_contenido_s3(self, contenido, s3_key, compresion=None):
+        """
+        Convierte el contenido a bytes y lo comprime según la regla del prefijo.
+
+        Parámetros:
+            - contenido (str o bytes): Contenido a subir
+            - s3_key (str): Ruta en S3
+            - compresion (str): None = según el prefijo, 'gzip'/'zstd' = forzar, 'none' = sin comprimir
+
+        Retorna: (cuerpo en bytes, argumentos extra para put_object)
+        """
+        if isinstance(contenido, str):
+            contenido = contenido.encode("utf-8")
+
+        if compresion is None:
+            reglas = [prefijo for prefijo in self.compresion_prefijos if s3_key.startswith(prefijo)]
+            if not reglas:
+                return contenido, {}
+            regla = self.compresion_prefijos[max(reglas, key=len)]
+            if len(contenido) < regla["umbral_bytes"]:
+                return contenido, {}
+            codec, nivel = regla["codec"], regla["nivel"]
+        elif compresion == "none":
+            return contenido, {}
+        else:
+            codec, nivel = resolver_codec(compresion), None
+
+        cuerpo = comprimir(contenido, codec, nivel)
+        print(f"  Compresión: {codec} ({len(contenido)} -> {len(cuerpo)} bytes)")
+        return cuerpo, {
+            "ContentEncoding": codec,
+            "Metadata": {"compresion": codec, "tamano-original": str(len(contenido))},
+        }
 
     def crear_bucket_s3(self, bucket_name, acl="private", encryption=False):
         """
@@ -215,7 +1831,8 @@ class StorageManager:
             print(f"✗ Error al crear carpeta: {str(e)}")
             return False
 
-    def subir_archivo_s3(self, bucket_name, file_path, s3_key):
+    def subir_archivo_s3(self, bucket_name, file_path, s3_key, multipart=False,
+                         part_size_mb=8, max_workers=8, callback=None):
         """
         SUBIR ARCHIVO A S3
 
@@ -225,12 +1842,22 @@ class StorageManager:
             - s3_key (str): Ruta en S3 (ej: "datos/archivo.csv")
 
         Parámetros OPCIONALES:
-            - ExtraArgs: Metadatos, ACL, etc.
-            - Callback: Función para monitorear progreso
+            - multipart (bool): Usar la subida multipart en paralelo (ver subir_archivo_s3_multipart)
+            - part_size_mb (int): Tamaño de cada parte en MB (modo multipart)
+            - max_workers (int): Partes subidas en paralelo (modo multipart)
+            - callback: Función callback(bytes_subidos, bytes_totales, bytes_por_segundo)
 
         Almacena: Archivos en el bucket S3
         Casos de uso: Subir datos, imágenes, backups, etc.
         """
+        if multipart:
+            return self.subir_archivo_s3_multipart(
+                bucket_name, file_path, s3_key,
+                part_size_mb=part_size_mb,
+                max_workers=max_workers,
+                callback=callback,
+            )
+
         try:
             print(f"\n[S3] Subiendo archivo a S3...")
             print(f"  Bucket: {bucket_name}")
@@ -256,7 +1883,8 @@ class StorageManager:
             print(f"✗ Error al subir archivo: {str(e)}")
             return False
 
-    def subir_contenido_s3(self, bucket_name, contenido, s3_key, content_type="text/plain"):
+    def subir_contenido_s3(self, bucket_name, contenido, s3_key, content_type="text/plain",
+                           compresion=None):
         """
         SUBIR CONTENIDO DIRECTO A S3 (sin archivo local)
 
@@ -266,6 +1894,9 @@ class StorageManager:
             - s3_key (str): Ruta en S3 (ej: "datos/archivo.csv")
             - content_type (str): Tipo MIME (text/plain, text/csv, application/json, etc.)
 
+        Parámetros OPCIONALES:
+            - compresion (str): 'gzip', 'zstd' o 'none' (defecto: según configurar_compresion)
+
         Almacena: Contenido directo en S3 sin necesidad de archivo local
         Casos de uso: Crear archivos dinámicamente, datos generados
         """
@@ -275,16 +1906,16 @@ class StorageManager:
             print(f"  Ruta en S3: {s3_key}")
             print(f"  Tipo: {content_type}")
 
-            # Convertir contenido a bytes si es string
-            if isinstance(contenido, str):
-                contenido = contenido.encode("utf-8")
+            # Convertir a bytes y comprimir si el prefijo lo tiene configurado
+            cuerpo, extra = self.preparar_contenido_s3(contenido, s3_key, compresion)
 
             # Subir contenido
             self.s3_client.put_object(
                 Bucket=bucket_name,
                 Key=s3_key,  # OBLIGATORIO: Ruta del objeto
-                Body=contenido,  # OBLIGATORIO: Contenido
+                Body=cuerpo,  # OBLIGATORIO: Contenido
                 ContentType=content_type,  # OPCIONAL: Tipo MIME
+                **extra,  # OPCIONAL: Content-Encoding y metadatos del códec
             )
 
             print(f"✓ Contenido subido exitosamente")
@@ -295,7 +1926,8 @@ class StorageManager:
             return False
 
     def subir_contenido_s3_con_storage_class(self, bucket_name, contenido, s3_key, 
-                                         storage_class="STANDARD", content_type="text/plain"):
+                                         storage_class="STANDARD", content_type="text/plain",
+                                         compresion=None):
         """
         SUBIR CONTENIDO A S3 CON STORAGE CLASS ESPECÍFICA
         
@@ -310,6 +1942,9 @@ class StorageManager:
                 - 'GLACIER': Archivo a largo plazo (muy barato, recuperación en horas)
                 - 'DEEP_ARCHIVE': Compliance/Backup (baratísimo, recuperación en 12+ horas)
                 - 'ONEZONE_IA': Una sola zona (más barato que STANDARD_IA)
+
+        Parámetros OPCIONALES:
+            - compresion (str): 'gzip', 'zstd' o 'none' (defecto: según configurar_compresion)
         
         Almacena: Contenido con clase de almacenamiento específica
         Casos de uso: Optimizar costos según patrón de acceso
@@ -320,15 +1955,15 @@ class StorageManager:
             print(f"  Ruta: {s3_key}")
             print(f"  Storage Class: {storage_class}")
             
-            if isinstance(contenido, str):
-                contenido = contenido.encode("utf-8")
+            cuerpo, extra = self.preparar_contenido_s3(contenido, s3_key, compresion)
             
             self.s3_client.put_object(
                 Bucket=bucket_name,
                 Key=s3_key,
-                Body=contenido,
+                Body=cuerpo,
                 ContentType=content_type,
-                StorageClass=storage_class  # CLAVE: Define la clase de almacenamiento
+                StorageClass=storage_class,  # CLAVE: Define la clase de almacenamiento
+                **extra
             )
             
             print(f"✓ Contenido subido exitosamente con {storage_class}")
@@ -339,7 +1974,8 @@ class StorageManager:
             return False
 
     def subir_archivo_s3_con_storage_class(self, bucket_name, file_path, s3_key, 
-                                        storage_class="STANDARD"):
+                                        storage_class="STANDARD", multipart=False,
+                                        part_size_mb=8, max_workers=8, callback=None):
         """
         SUBIR ARCHIVO A S3 CON STORAGE CLASS ESPECÍFICA
         
@@ -348,9 +1984,21 @@ class StorageManager:
             - file_path (str): Ruta local del archivo
             - s3_key (str): Ruta en S3
             - storage_class (str): Clase de almacenamiento (ver arriba)
+
+        Parámetros OPCIONALES:
+            - multipart, part_size_mb, max_workers, callback: Igual que en subir_archivo_s3
         
         Casos de uso: Subir backups a Glacier, datos históricos a Deep Archive
         """
+        if multipart:
+            return self.subir_archivo_s3_multipart(
+                bucket_name, file_path, s3_key,
+                storage_class=storage_class,
+                part_size_mb=part_size_mb,
+                max_workers=max_workers,
+                callback=callback,
+            )
+
         try:
             print(f"\n[S3] Subiendo archivo con Storage Class: {storage_class}...")
             print(f"  Archivo local: {file_path}")
@@ -375,7 +2023,476 @@ class StorageManager:
             print(f"✗ Error: {str(e)}")
             return False
 
+
+    def subir_archivo_s3_multipart(self, bucket_name, file_path, s3_key,
+                                   storage_class="STANDARD", part_size_mb=8,
+                                   max_workers=8, max_reintentos=3, callback=None,
+                                   manifest_path=None):
+        """
+        SUBIR ARCHIVO A S3 EN PARTES (MULTIPART EN PARALELO)
+
+        Divide el archivo en partes y las sube con un pool de hilos.
+        El progreso se guarda en un manifiesto local: si la subida se
+        interrumpe, al volver a llamar se reanuda desde las partes pendientes.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - file_path (str): Ruta local del archivo
+            - s3_key (str): Ruta en S3
+
+        Parámetros OPCIONALES:
+            - storage_class (str): Clase de almacenamiento (STANDARD, STANDARD_IA,
+                INTELLIGENT_TIERING, GLACIER, DEEP_ARCHIVE, ONEZONE_IA)
+            - part_size_mb (int): Tamaño de parte en MB (mínimo 5, se ajusta para no pasar de 10000 partes)
+            - max_workers (int): Número de partes subidas en paralelo
+            - max_reintentos (int): Reintentos por parte antes de abandonar
+            - callback: Función callback(bytes_subidos, bytes_totales, bytes_por_segundo)
+            - manifest_path (str): Ruta del manifiesto (por defecto "<archivo>.upload.json")
+
+        Retorna: True si la subida se completó, False si falló (el manifiesto se conserva)
+        """
+        try:
+            print(f"\n[S3] Subida multipart: {file_path} -> s3://{bucket_name}/{s3_key}")
+
+            if not os.path.exists(file_path):
+                print(f"✗ Archivo no encontrado: {file_path}")
+                return False
+
+            tamano = os.path.getsize(file_path)
+            mtime = os.path.getmtime(file_path)
+            part_size = calcular_tamano_parte(tamano, part_size_mb * 1024 * 1024)
+            num_partes = max(1, -(-tamano // part_size))
+            manifest_path = manifest_path or f"{file_path}.upload.json"
+
+            print(f"  Storage Class: {storage_class}")
+            print(f"  Tamaño: {tamano} bytes en {num_partes} partes de {part_size} bytes")
+
+            # Reanudar desde el manifiesto si corresponde al mismo archivo y destino
+            manifiesto = None
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r") as f:
+                    texto = f.read()
+                try:
+                    manifiesto = json.loads(texto)
+                except json.JSONDecodeError:
+                    # Manifiesto truncado (proceso cortado al escribir): se cancela
+                    # la subida que aún se pueda leer para no dejar partes cobrándose
+                    print("  ⚠ Manifiesto dañado, se empieza de cero")
+                    manifiesto = {}
+                    anterior = re.search(r'"upload_id":\s*"([^"]+)"', texto)
+                    if anterior:
+                        try:
+                            self.s3_client.abort_multipart_upload(
+                                Bucket=bucket_name, Key=s3_key, UploadId=anterior.group(1)
+                            )
+                            print(f"  Subida {anterior.group(1)[:12]}... cancelada")
+                        except Exception as e:
+                            print(f"  ⚠ No se pudo cancelar la subida anterior: {str(e)}")
+                if not isinstance(manifiesto, dict):
+                    manifiesto = {}
+                mismo_origen = (
+                    manifiesto.get("bucket") == bucket_name
+                    and manifiesto.get("key") == s3_key
+                    and manifiesto.get("size") == tamano
+                    and manifiesto.get("mtime") == mtime
+                    and manifiesto.get("part_size") == part_size
+                    and manifiesto.get("storage_class") == storage_class
+                )
+                if not mismo_origen:
+                    if manifiesto:
+                        print("  ⚠ Manifiesto de otra subida, se empieza de cero")
+                    manifiesto = None
+
+            partes_hechas = {}
+            if manifiesto:
+                upload_id = manifiesto["upload_id"]
+                try:
+                    # Las partes confirmadas por S3 son las que cuentan
+                    paginator = self.s3_client.get_paginator("list_parts")
+                    for pagina in paginator.paginate(
+                        Bucket=bucket_name, Key=s3_key, UploadId=upload_id
+                    ):
+                        for parte in pagina.get("Parts", []):
+                            partes_hechas[parte["PartNumber"]] = parte["ETag"]
+                    print(f"  Reanudando subida {upload_id[:12]}... ({len(partes_hechas)}/{num_partes} partes hechas)")
+                except Exception as e:
+                    print(f"  ⚠ No se pudo reanudar ({str(e)}), se empieza de cero")
+                    manifiesto = None
+                    partes_hechas = {}
+
+            if not manifiesto:
+                response = self.s3_client.create_multipart_upload(
+                    Bucket=bucket_name,
+                    Key=s3_key,
+                    StorageClass=storage_class,
+                )
+                upload_id = response["UploadId"]
+                manifiesto = {
+                    "bucket": bucket_name,
+                    "key": s3_key,
+                    "size": tamano,
+                    "mtime": mtime,
+                    "part_size": part_size,
+                    "storage_class": storage_class,
+                    "upload_id": upload_id,
+                }
+
+            lock_manifiesto = threading.Lock()
+
+            def guardar_manifiesto():
+                manifiesto["parts"] = {str(n): etag for n, etag in partes_hechas.items()}
+                tmp_path = f"{manifest_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(manifiesto, f)
+                os.replace(tmp_path, manifest_path)
+
+            guardar_manifiesto()
+
+            bytes_hechos = sum(
+                min(part_size, tamano - (n - 1) * part_size) for n in partes_hechas
+            )
+            progreso = ProgresoTransferencia(tamano, callback, bytes_hechos)
+
+            def subir_parte(numero):
+                inicio = (numero - 1) * part_size
+                longitud = min(part_size, tamano - inicio)
+
+                def intento():
+                    with open(file_path, "rb") as f:
+                        f.seek(inicio)
+                        datos = f.read(longitud)
+                    return self.s3_client.upload_part(
+                        Bucket=bucket_name,
+                        Key=s3_key,
+                        UploadId=upload_id,
+                        PartNumber=numero,
+                        Body=datos,
+                    )["ETag"]
+
+                etag = reintentar_con_backoff(intento, max_reintentos=max_reintentos)
+                with lock_manifiesto:
+                    partes_hechas[numero] = etag
+                    guardar_manifiesto()
+                progreso.sumar(longitud)
+                return numero
+
+            pendientes = [n for n in range(1, num_partes + 1) if n not in partes_hechas]
+            errores = []
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futuros = {executor.submit(subir_parte, n): n for n in pendientes}
+                for futuro in as_completed(futuros):
+                    try:
+                        futuro.result()
+                    except Exception as e:
+                        errores.append((futuros[futuro], str(e)))
+
+            if errores:
+                for numero, error in sorted(errores):
+                    print(f"  ✗ Parte {numero}: {error}")
+                print(f"✗ Subida incompleta, reanudable con el manifiesto {manifest_path}")
+                return False
+
+            self.s3_client.complete_multipart_upload(
+                Bucket=bucket_name,
+                Key=s3_key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [
+                        {"PartNumber": n, "ETag": partes_hechas[n]}
+                        for n in sorted(partes_hechas)
+                    ]
+                },
+            )
+            os.remove(manifest_path)
+
+            transcurrido = max(time.time() - progreso.inicio, 1e-6)
+            print(f"✓ Archivo subido en {num_partes} partes "
+                  f"({progreso.bytes_sesion / transcurrido / 1024 / 1024:.2f} MB/s)")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error en subida multipart: {str(e)}")
+            return False
     
+    def sincronizar_directorio_s3(self, bucket_name, directorio_local, prefix="",
+                                  storage_class="STANDARD", max_workers=8, dry_run=False,
+                                  eliminar_sobrantes=False, multipart_desde_mb=64,
+                                  part_size_mb=8, indice_path=None):
+        """
+        SINCRONIZAR DIRECTORIO LOCAL CON S3 (INCREMENTAL)
+
+        Recorre el directorio y compara cada archivo con el objeto remoto
+        (tamaño y ETag del listado paginado). Solo se suben los archivos
+        nuevos o modificados, varios a la vez. Los ETags calculados se
+        guardan en un índice local junto con el tamaño y la fecha de
+        modificación, así que los archivos que no han cambiado no se
+        vuelven a leer en la siguiente sincronización.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - directorio_local (str): Directorio a sincronizar
+
+        Parámetros OPCIONALES:
+            - prefix (str): Carpeta destino en S3 (ej: "exportaciones/")
+            - storage_class (str): Clase de almacenamiento de los archivos subidos
+            - max_workers (int): Archivos comparados/subidos en paralelo
+            - dry_run (bool): Solo mostrar lo que se subiría/eliminaría
+            - eliminar_sobrantes (bool): Borrar de S3 los objetos que ya no existen en local
+            - multipart_desde_mb (int): Tamaño a partir del cual se sube en multipart
+            - part_size_mb (int): Tamaño de parte en modo multipart
+            - indice_path (str): Índice de hashes (defecto: <directorio>/.s3sync_index.json)
+
+        NOTA: Con cifrado SSE-KMS el ETag no es el MD5 del contenido, por lo que
+              esos objetos se suben siempre
+
+        Retorna: Diccionario {"subidos": [claves], "sin_cambios": int,
+                 "eliminados": int, "errores": [...]} o None si falla el listado
+        """
+        try:
+            modo = " (DRY-RUN)" if dry_run else ""
+            print(f"\n[S3] Sincronizando {directorio_local} -> s3://{bucket_name}/{prefix}{modo}")
+
+            if not os.path.isdir(directorio_local):
+                print(f"✗ Error: Directorio no encontrado: {directorio_local}")
+                return None
+
+            if prefix and not prefix.endswith("/"):
+                prefix += "/"
+            indice_path = indice_path or os.path.join(directorio_local, ".s3sync_index.json")
+
+            indice = {}
+            if os.path.exists(indice_path):
+                try:
+                    with open(indice_path, "r") as f:
+                        indice = json.load(f).get("archivos", {})
+                except (ValueError, OSError):
+                    print(f"⚠ Índice ilegible, se recalcularán los hashes: {indice_path}")
+
+            # Archivos locales: el índice y los manifiestos de subida no se sincronizan
+            excluidos = {os.path.abspath(indice_path), os.path.abspath(f"{indice_path}.tmp")}
+            locales = {}
+            nuevo_indice = {}
+            for raiz, _, archivos in os.walk(directorio_local):
+                for nombre in archivos:
+                    ruta = os.path.join(raiz, nombre)
+                    if os.path.abspath(ruta) in excluidos or nombre.endswith(".upload.json"):
+                        continue
+                    rel = os.path.relpath(ruta, directorio_local).replace(os.sep, "/")
+                    stat = os.stat(ruta)
+                    locales[prefix + rel] = (ruta, rel, stat.st_size)
+
+                    # Los ETags guardados solo valen si el archivo no ha cambiado
+                    entrada = indice.get(rel)
+                    if (not entrada or entrada.get("size") != stat.st_size
+                            or entrada.get("mtime_ns") != stat.st_mtime_ns):
+                        entrada = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "etags": {}}
+                    nuevo_indice[rel] = entrada
+
+            remotos = {
+                obj.key: obj
+                for obj in self.iterar_objetos_s3(bucket_name, prefix)
+                if obj.size is not None
+            }
+            print(f"  {len(locales)} archivos locales, {len(remotos)} objetos remotos")
+
+            part_size_multipart = part_size_mb * 1024 * 1024
+            umbral_multipart = multipart_desde_mb * 1024 * 1024
+
+            def etag_de(ruta, entrada, part_size):
+                clave_etag = str(part_size or 0)
+                if clave_etag not in entrada["etags"]:
+                    entrada["etags"][clave_etag] = calcular_etag_local(ruta, part_size)
+                return entrada["etags"][clave_etag]
+
+            def part_size_subida(tamano):
+                # Tamaño de parte con el que quedará el objeto al subirlo
+                if tamano >= umbral_multipart:
+                    return calcular_tamano_parte(tamano, part_size_multipart)
+                if tamano >= TRANSFER_CHUNK_DEFECTO:
+                    return TRANSFER_CHUNK_DEFECTO
+                return None
+
+            def sincronizar_archivo(clave):
+                ruta, rel, tamano = locales[clave]
+                entrada = nuevo_indice[rel]
+                remoto = remotos.get(clave)
+
+                if remoto is not None and remoto.size == tamano and remoto.etag:
+                    etag_remoto = remoto.etag.strip('"')
+                    part_size = part_size_desde_etag(
+                        tamano, etag_remoto,
+                        (calcular_tamano_parte(tamano, part_size_multipart), TRANSFER_CHUNK_DEFECTO),
+                    )
+                    if etag_de(ruta, entrada, part_size) == etag_remoto:
+                        return False
+
+                if dry_run:
+                    print(f"  + {clave}")
+                    return True
+
+                ok = self.subir_archivo_s3_con_storage_class(
+                    bucket_name, ruta, clave,
+                    storage_class=storage_class,
+                    multipart=tamano >= umbral_multipart,
+                    part_size_mb=part_size_mb,
+                )
+                if not ok:
+                    raise RuntimeError(f"No se pudo subir {ruta}")
+
+                # Guardar el ETag del objeto subido para no releer el archivo la próxima vez
+                etag_de(ruta, entrada, part_size_subida(tamano))
+                return True
+
+            resultado = {"subidos": [], "sin_cambios": 0, "eliminados": 0, "errores": []}
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futuros = {executor.submit(sincronizar_archivo, clave): clave for clave in locales}
+                for futuro in as_completed(futuros):
+                    clave = futuros[futuro]
+                    try:
+                        if futuro.result():
+                            resultado["subidos"].append(clave)
+                        else:
+                            resultado["sin_cambios"] += 1
+                    except Exception as e:
+                        resultado["errores"].append({"Key": clave, "Message": str(e)})
+
+            sobrantes = [clave for clave in remotos if clave not in locales]
+            if eliminar_sobrantes and sobrantes:
+                borrado = self.eliminar_objetos_s3_lote(bucket_name, sobrantes, dry_run=dry_run)
+                resultado["eliminados"] = borrado["eliminados"]
+                resultado["errores"].extend(borrado["errores"])
+
+            # Guardar el índice de forma atómica (también en dry-run: los hashes siguen siendo válidos)
+            tmp_path = f"{indice_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"archivos": nuevo_indice}, f)
+            os.replace(tmp_path, indice_path)
+
+            for error in resultado["errores"]:
+                print(f"  ✗ {error['Key']}: {error['Message']}")
+            accion = "se subirían" if dry_run else "subidos"
+            print(f"✓ Sincronización completada: {len(resultado['subidos'])} {accion}, "
+                  f"{resultado['sin_cambios']} sin cambios, {resultado['eliminados']} eliminados, "
+                  f"{len(resultado['errores'])} errores")
+            return resultado
+
+        except Exception as e:
+            print(f"✗ Error al sincronizar directorio: {str(e)}")
+            return None
+
+    def iterar_objetos_s3(self, bucket_name, prefix="", delimiter=None,
+                          paralelo=False, max_workers=8, page_size=1000):
+        """
+        ITERAR OBJETOS DE S3 (PAGINADO Y BAJO DEMANDA)
+
+        Sigue los continuation tokens de list_objects_v2 página a página,
+        sin construir listas completas en memoria.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+
+        Parámetros OPCIONALES:
+            - prefix (str): Filtrar por prefijo (ej: "datos/")
+            - delimiter (str): Agrupar por carpetas (ej: "/"). Solo se recorre
+                el primer nivel y las subcarpetas se devuelven como prefijos
+            - paralelo (bool): Listar en paralelo cada subcarpeta del primer nivel
+            - max_workers (int): Subcarpetas listadas a la vez (modo paralelo)
+            - page_size (int): Claves por página (máximo 1000)
+
+        Retorna: Generador de ObjetoS3(key, size, last_modified, storage_class, etag).
+                 Los prefijos comunes se devuelven con size=None
+        """
+        if paralelo and not delimiter:
+            yield from self.iterar_objetos_s3_paralelo(
+                bucket_name, prefix, max_workers=max_workers, page_size=page_size
+            )
+            return
+
+        params = {
+            "Bucket": bucket_name,
+            "Prefix": prefix,
+            "PaginationConfig": {"PageSize": page_size},
+        }
+        if delimiter:
+            params["Delimiter"] = delimiter
+
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for pagina in paginator.paginate(**params):
+            for obj in pagina.get("Contents", []):
+                yield ObjetoS3(
+                    obj["Key"],
+                    obj["Size"],
+                    obj["LastModified"],
+                    obj.get("StorageClass", "STANDARD"),
+                    obj.get("ETag"),
+                )
+            for carpeta in pagina.get("CommonPrefixes", []):
+                yield ObjetoS3(carpeta["Prefix"], None, None, None, None)
+
+    def iterar_objetos_s3_paralelo(self, bucket_name, prefix="", max_workers=8,
+                                   page_size=1000):
+        """
+        ITERAR OBJETOS DE S3 REPARTIENDO EL LISTADO ENTRE SUBCARPETAS
+
+        Descubre las subcarpetas del primer nivel con Delimiter="/" y lista
+        cada una en un hilo distinto. Los objetos se devuelven según llegan,
+        por lo que el orden entre subcarpetas no está garantizado.
+        """
+        subcarpetas = []
+        for obj in self.iterar_objetos_s3(bucket_name, prefix, delimiter="/",
+                                          page_size=page_size):
+            if obj.size is None:
+                subcarpetas.append(obj.key)
+            else:
+                yield obj
+
+        if not subcarpetas:
+            return
+
+        resultados = queue.Queue(maxsize=page_size * max_workers)
+        parar = threading.Event()
+        FIN = object()
+
+        def listar_subcarpeta(sub_prefix):
+            try:
+                for obj in self.iterar_objetos_s3(bucket_name, sub_prefix,
+                                                  page_size=page_size):
+                    while not parar.is_set():
+                        try:
+                            resultados.put(obj, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    if parar.is_set():
+                        return
+            except Exception as e:
+                resultados.put(e)
+            finally:
+                resultados.put(FIN)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            for sub_prefix in subcarpetas:
+                executor.submit(listar_subcarpeta, sub_prefix)
+            pendientes = len(subcarpetas)
+            while pendientes:
+                obj = resultados.get()
+                if obj is FIN:
+                    pendientes -= 1
+                elif isinstance(obj, Exception):
+                    raise obj
+                else:
+                    yield obj
+        finally:
+            parar.set()
+            # Vaciar la cola para que ningún hilo se quede bloqueado
+            while True:
+                try:
+                    resultados.get_nowait()
+                except queue.Empty:
+                    break
+            executor.shutdown(wait=False)
+
     def listar_objetos_s3(self, bucket_name, prefix=""):
         """
         LISTAR OBJETOS EN S3
@@ -386,32 +2503,23 @@ class StorageManager:
         Parámetros OPCIONALES:
             - prefix (str): Filtrar por prefijo (ej: "datos/" para listar solo esa carpeta)
 
-        Retorna: Lista de objetos en el bucket
+        Retorna: Lista de objetos en el bucket (recorre todas las páginas;
+                 para buckets grandes usar iterar_objetos_s3)
         """
         try:
             print(f"\n[S3] Listando objetos en {bucket_name}...")
 
-            response = self.s3_client.list_objects_v2(
-                Bucket=bucket_name,
-                Prefix=prefix,  # OPCIONAL: Filtrar por prefijo
-            )
-
-            if "Contents" not in response:
-                print("  No hay objetos en el bucket")
-                return []
-
             objetos = []
-            for obj in response["Contents"]:
-                tamaño = obj["Size"]
-                fecha = obj["LastModified"]
-                clave = obj["Key"]
-
+            for obj in self.iterar_objetos_s3(bucket_name, prefix):
                 # No mostrar carpetas vacías (terminan en /)
-                if not clave.endswith("/"):
-                    print(f"  - {clave} ({tamaño} bytes, {fecha})")
-                    objetos.append(clave)
+                if not obj.key.endswith("/"):
+                    print(f"  - {obj.key} ({obj.size} bytes, {obj.last_modified})")
+                    objetos.append(obj.key)
                 else:
-                    print(f"  📁 {clave}")
+                    print(f"  📁 {obj.key}")
+
+            if not objetos:
+                print("  No hay objetos en el bucket")
 
             return objetos
 
@@ -419,7 +2527,8 @@ class StorageManager:
             print(f"✗ Error al listar objetos: {str(e)}")
             return []
         
-    def descargar_objeto_s3(self, bucket_name, s3_key, file_path=None):
+    def descargar_objeto_s3(self, bucket_name, s3_key, file_path=None, paralelo=False,
+                            part_size_mb=8, max_workers=8, callback=None):
         """
         DESCARGAR OBJETO DESDE S3
 
@@ -429,9 +2538,19 @@ class StorageManager:
 
         Parámetros OPCIONALES:
             - file_path (str): Ruta local donde guardar (por defecto usa el nombre del objeto)
+            - paralelo (bool): Descargar por rangos en paralelo (ver descargar_objeto_s3_paralelo)
+            - part_size_mb, max_workers, callback: Opciones del modo paralelo
 
         Retorna: Ruta donde se guardó el archivo
         """
+        if paralelo:
+            return self.descargar_objeto_s3_paralelo(
+                bucket_name, s3_key, file_path,
+                part_size_mb=part_size_mb,
+                max_workers=max_workers,
+                callback=callback,
+            )
+
         try:
             print(f"\n[S3] Descargando objeto desde S3...")
             print(f"  Bucket: {bucket_name}")
@@ -454,7 +2573,183 @@ class StorageManager:
             print(f"✗ Error al descargar objeto: {str(e)}")
             return None
 
-    def obtener_contenido_s3(self, bucket_name, s3_key):
+    def descargar_objeto_s3_paralelo(self, bucket_name, s3_key, file_path=None,
+                                     part_size_mb=8, max_workers=8, max_reintentos=3,
+                                     callback=None, verificar_etag=True):
+        """
+        DESCARGAR OBJETO DESDE S3 POR RANGOS EN PARALELO
+
+        Reserva el archivo completo en disco y descarga rangos de bytes con
+        un pool de hilos, escribiendo cada bloque directamente en su posición
+        (os.pwrite, o mmap donde no existe). El avance se guarda en un archivo
+        de estado "<archivo>.download.json": si la descarga se corta, al volver
+        a llamar solo se piden los rangos que faltan.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta del objeto en S3
+
+        Parámetros OPCIONALES:
+            - file_path (str): Ruta local donde guardar (por defecto el nombre del objeto)
+            - part_size_mb (int): Tamaño de cada rango en MB
+            - max_workers (int): Rangos descargados en paralelo
+            - max_reintentos (int): Reintentos por rango
+            - callback: Función callback(bytes_descargados, bytes_totales, bytes_por_segundo)
+            - verificar_etag (bool): Comprobar el ETag del archivo al terminar
+                (no se aplica a objetos con SSE-KMS o SSE-C, cuyo ETag no es un MD5)
+
+        Retorna: Ruta donde se guardó el archivo (None si falla)
+        """
+        try:
+            print(f"\n[S3] Descarga paralela: s3://{bucket_name}/{s3_key}")
+
+            if not file_path:
+                file_path = os.path.basename(s3_key)
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+            cabecera = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+            tamano = cabecera["ContentLength"]
+            etag = cabecera["ETag"]
+            part_size = max(1, part_size_mb) * 1024 * 1024
+            num_rangos = max(1, -(-tamano // part_size))
+
+            temp_path = f"{file_path}.part"
+            state_path = f"{file_path}.download.json"
+
+            print(f"  Tamaño: {tamano} bytes en {num_rangos} rangos")
+
+            # Reanudar solo si el objeto no ha cambiado desde la descarga anterior
+            hechos = set()
+            if os.path.exists(state_path) and os.path.exists(temp_path):
+                with open(state_path, "r") as f:
+                    estado = json.load(f)
+                if (estado.get("etag") == etag and estado.get("size") == tamano
+                        and estado.get("part_size") == part_size):
+                    hechos = set(estado.get("done", []))
+                    print(f"  Reanudando descarga ({len(hechos)}/{num_rangos} rangos hechos)")
+
+            if not hechos and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            fd = os.open(temp_path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+            try:
+                if os.fstat(fd).st_size != tamano:
+                    if hasattr(os, "posix_fallocate") and tamano:
+                        os.posix_fallocate(fd, 0, tamano)
+                    os.ftruncate(fd, tamano)
+
+                mapa = None
+                if not hasattr(os, "pwrite") and tamano:
+                    mapa = mmap.mmap(fd, tamano)
+
+                def escribir(datos, offset):
+                    if mapa is not None:
+                        mapa[offset:offset + len(datos)] = datos
+                    else:
+                        os.pwrite(fd, datos, offset)
+
+                lock_estado = threading.Lock()
+
+                def guardar_estado():
+                    tmp_state = f"{state_path}.tmp"
+                    with open(tmp_state, "w") as f:
+                        json.dump({
+                            "bucket": bucket_name,
+                            "key": s3_key,
+                            "etag": etag,
+                            "size": tamano,
+                            "part_size": part_size,
+                            "done": sorted(hechos),
+                        }, f)
+                    os.replace(tmp_state, state_path)
+
+                bytes_hechos = sum(
+                    min(part_size, tamano - i * part_size) for i in hechos
+                )
+                progreso = ProgresoTransferencia(tamano, callback, bytes_hechos)
+
+                def descargar_rango(indice):
+                    inicio = indice * part_size
+                    fin = min(inicio + part_size, tamano) - 1
+
+                    def intento():
+                        response = self.s3_client.get_object(
+                            Bucket=bucket_name,
+                            Key=s3_key,
+                            Range=f"bytes={inicio}-{fin}",
+                            IfMatch=etag,  # Falla si el objeto cambia a mitad de descarga
+                        )
+                        offset = inicio
+                        for bloque in response["Body"].iter_chunks(1024 * 1024):
+                            escribir(bloque, offset)
+                            offset += len(bloque)
+                        if offset != fin + 1:
+                            raise RangoIncompletoError(f"Rango {indice} incompleto ({offset - inicio} bytes)")
+
+                    reintentar_con_backoff(intento, max_reintentos=max_reintentos)
+                    with lock_estado:
+                        hechos.add(indice)
+                        guardar_estado()
+                    progreso.sumar(fin - inicio + 1)
+
+                pendientes = [i for i in range(num_rangos) if i not in hechos] if tamano else []
+                errores = []
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    futuros = {executor.submit(descargar_rango, i): i for i in pendientes}
+                    for futuro in as_completed(futuros):
+                        try:
+                            futuro.result()
+                        except Exception as e:
+                            errores.append((futuros[futuro], str(e)))
+
+                if mapa is not None:
+                    mapa.flush()
+                    mapa.close()
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            if errores:
+                for indice, error in sorted(errores):
+                    print(f"  ✗ Rango {indice}: {error}")
+                print(f"✗ Descarga incompleta, reanudable con {state_path}")
+                return None
+
+            cifrado = cabecera.get("ServerSideEncryption") in ("aws:kms", "aws:kms:dsse") \
+                or cabecera.get("SSECustomerAlgorithm")
+            if verificar_etag and cifrado:
+                # Con SSE-KMS y SSE-C el ETag no es el MD5 del contenido
+                print("  ⚠ Objeto cifrado con SSE-KMS/SSE-C: el ETag no se puede comprobar")
+            elif verificar_etag:
+                etag_remoto = etag.strip('"')
+                part_size_origen = None
+                if "-" in etag_remoto:
+                    # Objeto multipart: el tamaño de parte original lo da la parte 1
+                    part_size_origen = self.s3_client.head_object(
+                        Bucket=bucket_name, Key=s3_key, PartNumber=1
+                    )["ContentLength"]
+                etag_local = calcular_etag_local(temp_path, part_size_origen)
+                if etag_local != etag_remoto:
+                    # Los datos se conservan: repetir con verificar_etag=False los da por buenos
+                    # sin volver a descargarlos
+                    print(f"✗ ETag no coincide (local {etag_local}, S3 {etag_remoto}), "
+                          f"datos conservados en {temp_path}")
+                    return None
+                print(f"  ETag verificado: {etag_remoto}")
+
+            os.replace(temp_path, file_path)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+
+            print(f"✓ Archivo descargado: {file_path}")
+            return file_path
+
+        except Exception as e:
+            print(f"✗ Error en descarga paralela: {str(e)}")
+            return None
+
+    def obtener_contenido_s3(self, bucket_name, s3_key, en_streaming=False,
+                             chunk_size=64 * 1024, descomprimir=True):
         """
         OBTENER CONTENIDO DE UN OBJETO S3 (sin descargar archivo)
 
@@ -462,8 +2757,17 @@ class StorageManager:
             - bucket_name (str): Nombre del bucket
             - s3_key (str): Ruta del objeto (ej: "datos/archivo.csv")
 
-        Retorna: Contenido del objeto como bytes
+        Parámetros OPCIONALES:
+            - en_streaming (bool): Devolver un generador de bloques en lugar de
+                cargar todo el objeto en memoria (ver iterar_contenido_s3)
+            - chunk_size (int): Tamaño de bloque en bytes (modo streaming)
+            - descomprimir (bool): Descomprimir los objetos con Content-Encoding gzip/zstd
+
+        Retorna: Contenido del objeto como bytes (o generador de bytes)
         """
+        if en_streaming:
+            return self.iterar_contenido_s3(bucket_name, s3_key, chunk_size, descomprimir)
+
         try:
             print(f"\n[S3] Obteniendo contenido desde S3...")
             print(f"  Bucket: {bucket_name}")
@@ -474,7 +2778,16 @@ class StorageManager:
                 Key=s3_key,  # OBLIGATORIO: Clave del objeto
             )
 
-            # Leer contenido
+            # Leer contenido (descomprimiendo por bloques si viene comprimido)
+            codec = response.get("ContentEncoding")
+            if descomprimir and codec in CODECS_COMPRESION:
+                contenido = b"".join(descomprimir_bloques(
+                    response["Body"].iter_chunks(chunk_size), codec
+                ))
+                print(f"✓ Contenido obtenido ({response['ContentLength']} bytes {codec} -> "
+                      f"{len(contenido)} bytes)")
+                return contenido
+
             contenido = response["Body"].read()
 
             print(f"✓ Contenido obtenido ({len(contenido)} bytes)")
@@ -484,7 +2797,8 @@ class StorageManager:
             print(f"✗ Error al obtener contenido: {str(e)}")
             return None
 
-    def obtener_contenido_s3_como_texto(self, bucket_name, s3_key):
+    def obtener_contenido_s3_como_texto(self, bucket_name, s3_key, en_streaming=False,
+                                        encoding="utf-8", chunk_size=64 * 1024):
         """
         OBTENER CONTENIDO DE UN OBJETO S3 COMO TEXTO
 
@@ -492,17 +2806,252 @@ class StorageManager:
             - bucket_name (str): Nombre del bucket
             - s3_key (str): Ruta del objeto (ej: "datos/archivo.csv")
 
-        Retorna: Contenido como string
+        Parámetros OPCIONALES:
+            - en_streaming (bool): Devolver un generador de líneas (ver iterar_lineas_s3)
+            - encoding (str): Codificación del texto
+            - chunk_size (int): Tamaño de bloque en bytes (modo streaming)
+
+        Retorna: Contenido como string (o generador de líneas)
         """
+        if en_streaming:
+            return self.iterar_lineas_s3(bucket_name, s3_key, encoding, chunk_size)
+
         try:
             contenido_bytes = self.obtener_contenido_s3(bucket_name, s3_key)
             if contenido_bytes:
-                return contenido_bytes.decode("utf-8")
+                return contenido_bytes.decode(encoding)
             return None
         except Exception as e:
             print(f"✗ Error al decodificar contenido: {str(e)}")
             return None
 
+    def iterar_contenido_s3(self, bucket_name, s3_key, chunk_size=64 * 1024,
+                            descomprimir=True):
+        """
+        ITERAR EL CONTENIDO DE UN OBJETO S3 EN BLOQUES
+
+        Lee el cuerpo de la respuesta bloque a bloque, con memoria constante
+        sea cual sea el tamaño del objeto. Los objetos con Content-Encoding
+        gzip/zstd se descomprimen a medida que llegan.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta del objeto
+
+        Parámetros OPCIONALES:
+            - chunk_size (int): Tamaño máximo de cada bloque en bytes (comprimidos)
+            - descomprimir (bool): Descomprimir según el Content-Encoding
+
+        Retorna: Generador de bytes
+        """
+        response = self.s3_client.get_object(Bucket=bucket_name, Key=s3_key)
+        cuerpo = response["Body"]
+        codec = response.get("ContentEncoding") if descomprimir else None
+        try:
+            yield from descomprimir_bloques(cuerpo.iter_chunks(chunk_size), codec)
+        finally:
+            cuerpo.close()
+
+    def iterar_lineas_s3(self, bucket_name, s3_key, encoding="utf-8",
+                         chunk_size=64 * 1024, conservar_saltos=False):
+        """
+        ITERAR LAS LÍNEAS DE TEXTO DE UN OBJETO S3
+
+        Decodifica de forma incremental: los caracteres multibyte (UTF-8)
+        partidos entre dos bloques se recomponen antes de emitir la línea.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta del objeto
+
+        Parámetros OPCIONALES:
+            - encoding (str): Codificación del texto
+            - chunk_size (int): Tamaño de bloque leído de S3
+            - conservar_saltos (bool): Mantener el salto de línea al final
+                (necesario para csv.reader con campos multilínea)
+
+        Retorna: Generador de líneas (str)
+        """
+        yield from separar_lineas(
+            self.iterar_contenido_s3(bucket_name, s3_key, chunk_size),
+            encoding,
+            conservar_saltos,
+        )
+
+    def iterar_rangos_s3(self, bucket_name, s3_key, tam_rango=8 * 1024 * 1024,
+                         prefetch=2, tamano=None):
+        """
+        LEER UN OBJETO S3 POR RANGOS CONSECUTIVOS
+
+        Pide el objeto en rangos de bytes y mantiene los siguientes rangos
+        descargándose en segundo plano mientras se procesa el actual.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta del objeto
+
+        Parámetros OPCIONALES:
+            - tam_rango (int): Bytes por rango
+            - prefetch (int): Rangos pedidos por adelantado
+            - tamano (int): Tamaño del objeto si ya se conoce (evita un head_object)
+
+        Retorna: Generador de bytes (un bloque por rango, en orden)
+        """
+        if tamano is None:
+            tamano = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key)["ContentLength"]
+        if not tamano:
+            return
+
+        def leer_rango(inicio):
+            fin = min(inicio + tam_rango, tamano) - 1
+            return reintentar_con_backoff(
+                lambda: self.s3_client.get_object(
+                    Bucket=bucket_name, Key=s3_key, Range=f"bytes={inicio}-{fin}"
+                )["Body"].read()
+            )
+
+        inicios = iter(range(0, tamano, tam_rango))
+        with ThreadPoolExecutor(max_workers=max(1, prefetch)) as executor:
+            en_curso = [executor.submit(leer_rango, i) for _, i in zip(range(prefetch + 1), inicios)]
+            while en_curso:
+                datos = en_curso.pop(0).result()
+                siguiente = next(inicios, None)
+                if siguiente is not None:
+                    en_curso.append(executor.submit(leer_rango, siguiente))
+                yield datos
+
+    def consultar_objeto_s3(self, bucket_name, s3_key, columnas=None, filtro=None,
+                            formato=None, limite=None, delimitador=",", compresion=None,
+                            encoding="utf-8", usar_s3_select=True):
+        """
+        CONSULTAR FILAS DE UN OBJETO CSV/JSON SIN DESCARGARLO (S3 SELECT)
+
+        La proyección y el filtro se ejecutan en S3 con S3 Select, de modo
+        que solo viajan las filas y columnas pedidas. Si S3 Select no está
+        disponible (región, cuenta o servicio compatible sin soporte), el
+        objeto se recorre en streaming y se filtra en local con las mismas
+        condiciones.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta del objeto (CSV con cabecera o JSON Lines)
+
+        Parámetros OPCIONALES:
+            - columnas (list): Columnas a devolver (None = todas)
+            - filtro (list): Condiciones (columna, operador, valor) unidas con AND
+                Operadores: =, !=, <>, <, <=, >, >=, LIKE, IN (valor = lista)
+                Ejemplo: [("ciudad", "IN", ["Madrid", "Sevilla"]), ("total", ">", 2000)]
+            - formato (str): 'CSV' o 'JSON' (defecto: según la extensión)
+            - limite (int): Número máximo de filas
+            - delimitador (str): Separador de campos (CSV)
+            - compresion (str): 'NONE', 'GZIP' o 'BZIP2' (defecto: según el
+                Content-Encoding del objeto y, si no tiene, según la extensión)
+            - encoding (str): Codificación del texto (filtro local)
+            - usar_s3_select (bool): False para filtrar siempre en local
+
+        NOTA: En los CSV todos los campos se devuelven como texto
+
+        Retorna: Generador de filas (dict columna -> valor)
+        """
+        nombre = s3_key.lower()
+        if compresion is None:
+            # El Content-Encoding describe los bytes guardados: un .gz con
+            # Content-Encoding gzip tiene una sola capa de compresión
+            codificacion = self.s3_client.head_object(Bucket=bucket_name, Key=s3_key).get("ContentEncoding")
+            compresion = COMPRESION_S3_SELECT.get((codificacion or "").lower())
+            if compresion is None:
+                compresion = "GZIP" if nombre.endswith(".gz") else "BZIP2" if nombre.endswith(".bz2") else "NONE"
+        if formato is None:
+            nombre = nombre.rsplit(".gz", 1)[0].rsplit(".bz2", 1)[0]
+            formato = "JSON" if nombre.endswith((".json", ".jsonl", ".ndjson")) else "CSV"
+        formato = formato.upper()
+        compresion = compresion.upper()
+
+        # Se construye antes de empezar para que un filtro inválido falle sin recurrir al modo local
+        sql = construir_sql_s3_select(columnas, filtro, limite, campos_texto=formato == "CSV")
+
+        def filas_s3_select():
+            if formato == "CSV":
+                entrada = {"CSV": {"FileHeaderInfo": "USE", "FieldDelimiter": delimitador,
+                                   "AllowQuotedRecordDelimiter": True}}
+            else:
+                entrada = {"JSON": {"Type": "LINES"}}
+            entrada["CompressionType"] = compresion
+
+            print(f"\n[S3] S3 Select sobre {s3_key}: {sql}")
+            response = self.s3_client.select_object_content(
+                Bucket=bucket_name,
+                Key=s3_key,
+                ExpressionType="SQL",
+                Expression=sql,
+                InputSerialization=entrada,
+                OutputSerialization={"JSON": {"RecordDelimiter": "\n"}},
+            )
+
+            # Un registro puede llegar partido entre dos eventos: se acumula hasta el salto de línea
+            pendiente = b""
+            estadisticas = None
+            completo = False
+            for evento in response["Payload"]:
+                if "Records" in evento:
+                    pendiente += evento["Records"]["Payload"]
+                    *registros, pendiente = pendiente.split(b"\n")
+                    for registro in registros:
+                        if registro.strip():
+                            yield json.loads(registro)
+                elif "Stats" in evento:
+                    estadisticas = evento["Stats"]["Details"]
+                elif "End" in evento:
+                    completo = True
+            if pendiente.strip():
+                yield json.loads(pendiente)
+
+            if not completo:
+                raise RuntimeError("La respuesta de S3 Select terminó antes del evento End")
+            if estadisticas:
+                print(f"✓ S3 Select: {estadisticas.get('BytesScanned', 0)} bytes escaneados, "
+                      f"{estadisticas.get('BytesReturned', 0)} bytes devueltos")
+
+        def filas_locales():
+            # Se descomprime una sola vez, aquí, sin la descompresión automática por Content-Encoding
+            codecs_locales = {"NONE": None, "GZIP": "gzip", "BZIP2": "bzip2", "ZSTD": "zstd"}
+            if compresion not in codecs_locales:
+                raise ValueError(f"Compresión no soportada en el filtro local: {compresion}")
+            bloques = descomprimir_bloques(
+                self.iterar_contenido_s3(bucket_name, s3_key, descomprimir=False),
+                codecs_locales[compresion],
+            )
+
+            lineas = separar_lineas(bloques, encoding, conservar_saltos=formato == "CSV")
+            if formato == "CSV":
+                filas = csv.DictReader(lineas, delimiter=delimitador)
+            else:
+                filas = (json.loads(linea) for linea in lineas if linea.strip())
+
+            emitidas = 0
+            for fila in filas:
+                if filtro and not cumple_filtro(fila, filtro):
+                    continue
+                yield {c: fila.get(c) for c in columnas} if columnas else fila
+                emitidas += 1
+                if limite and emitidas >= limite:
+                    return
+
+        if usar_s3_select and compresion != "ZSTD":
+            emitidas = 0
+            try:
+                for fila in filas_s3_select():
+                    emitidas += 1
+                    yield fila
+                return
+            except Exception as e:
+                # Con filas ya entregadas no se puede repetir la consulta sin duplicarlas
+                if emitidas:
+                    raise
+                print(f"⚠ S3 Select no disponible ({str(e)}), filtrando en local")
+
+        yield from filas_locales()
+
     def eliminar_objeto_s3(self, bucket_name, s3_key):
         """
         ELIMINAR OBJETO DE S3
@@ -528,24 +3077,183 @@ class StorageManager:
             print(f"✗ Error al eliminar objeto: {str(e)}")
             return False
 
-    def eliminar_bucket_s3(self, bucket_name):
+    def eliminar_objetos_s3_lote(self, bucket_name, claves, dry_run=False,
+                                 max_workers=4, max_reintentos=3):
+        """
+        ELIMINAR OBJETOS DE S3 EN LOTES (delete_objects)
+
+        Agrupa las claves en lotes de hasta 1000 y envía varios lotes a la vez.
+        Las claves se consumen bajo demanda, por lo que se puede pasar
+        directamente un generador de millones de objetos.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - claves: Iterable de claves (str), tuplas (clave, version_id) u ObjetoS3
+
+        Parámetros OPCIONALES:
+            - dry_run (bool): Solo mostrar lo que se eliminaría, sin borrar nada
+            - max_workers (int): Lotes enviados en paralelo
+            - max_reintentos (int): Reintentos por lote si se corta la respuesta
+                (throttling y errores de red ya los reintenta botocore)
+
+        ADVERTENCIA: Esta acción es irreversible
+
+        Retorna: Diccionario {"eliminados": int, "errores": [dict por clave fallida]}
+        """
+        resultado = {"eliminados": 0, "errores": []}
+        lock = threading.Lock()
+
+        def a_identificador(clave):
+            if isinstance(clave, ObjetoS3):
+                return {"Key": clave.key}
+            if isinstance(clave, (tuple, list)):
+                identificador = {"Key": clave[0]}
+                if clave[1]:
+                    identificador["VersionId"] = clave[1]
+                return identificador
+            return {"Key": clave}
+
+        def lotes():
+            lote = []
+            for clave in claves:
+                lote.append(a_identificador(clave))
+                if len(lote) == 1000:
+                    yield lote
+                    lote = []
+            if lote:
+                yield lote
+
+        def eliminar_lote(lote):
+            response = reintentar_con_backoff(
+                lambda: self.s3_client.delete_objects(
+                    Bucket=bucket_name,
+                    Delete={"Objects": lote, "Quiet": True},  # Solo devuelve los errores
+                ),
+                max_reintentos=max_reintentos,
+            )
+            errores = response.get("Errors", [])
+            with lock:
+                resultado["eliminados"] += len(lote) - len(errores)
+                for error in errores:
+                    resultado["errores"].append({
+                        "Key": error.get("Key"),
+                        "VersionId": error.get("VersionId"),
+                        "Code": error.get("Code"),
+                        "Message": error.get("Message"),
+                    })
+
+        try:
+            modo = " (DRY-RUN)" if dry_run else ""
+            print(f"\n[S3] Eliminando objetos en lotes de {bucket_name}{modo}...")
+
+            if dry_run:
+                for lote in lotes():
+                    for identificador in lote:
+                        version = identificador.get("VersionId")
+                        print(f"  - {identificador['Key']}" + (f" (versión {version})" if version else ""))
+                    resultado["eliminados"] += len(lote)
+                print(f"✓ Se eliminarían {resultado['eliminados']} objetos/versiones")
+                return resultado
+
+            # Limitar los lotes en vuelo para no materializar todas las claves
+            en_vuelo = threading.BoundedSemaphore(max_workers * 2)
+            futuros = []
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                for lote in lotes():
+                    en_vuelo.acquire()
+                    futuro = executor.submit(eliminar_lote, lote)
+                    futuro.add_done_callback(lambda _: en_vuelo.release())
+                    futuros.append((futuro, lote))
+                    futuros = [(f, l) for f, l in futuros if not f.done() or f.exception()]
+
+            for futuro, lote in futuros:
+                if futuro.exception():
+                    for identificador in lote:
+                        resultado["errores"].append({
+                            "Key": identificador["Key"],
+                            "VersionId": identificador.get("VersionId"),
+                            "Code": "BatchFailed",
+                            "Message": str(futuro.exception()),
+                        })
+
+            for error in resultado["errores"]:
+                print(f"  ✗ {error['Key']}: {error['Code']} - {error['Message']}")
+            print(f"✓ {resultado['eliminados']} objetos/versiones eliminados, "
+                  f"{len(resultado['errores'])} errores")
+            return resultado
+
+        except Exception as e:
+            # Un fallo al recorrer las claves deja el borrado incompleto
+            resultado["errores"].append({
+                "Key": None,
+                "VersionId": None,
+                "Code": type(e).__name__,
+                "Message": str(e),
+            })
+            print(f"✗ Error al eliminar objetos en lote: {str(e)}")
+            return resultado
+
+    def iterar_versiones_bucket(self, bucket_name, prefix=""):
+        """
+        ITERAR TODAS LAS VERSIONES Y DELETE MARKERS DE UN BUCKET
+
+        Retorna: Generador de tuplas (clave, version_id)
+        """
+        paginator = self.s3_client.get_paginator("list_object_versions")
+        for pagina in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for version in pagina.get("Versions", []):
+                yield version["Key"], version["VersionId"]
+            for marcador in pagina.get("DeleteMarkers", []):
+                yield marcador["Key"], marcador["VersionId"]
+
+    def vaciar_bucket_s3(self, bucket_name, dry_run=False, max_workers=4):
+        """
+        VACIAR BUCKET S3 (objetos, versiones y delete markers)
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+
+        Parámetros OPCIONALES:
+            - dry_run (bool): Solo mostrar lo que se eliminaría
+            - max_workers (int): Lotes de borrado en paralelo
+
+        Retorna: Diccionario {"eliminados": int, "errores": [...]}
+        """
+        versionado = self.s3_client.get_bucket_versioning(Bucket=bucket_name).get("Status")
+        if versionado in ("Enabled", "Suspended"):
+            claves = self.iterar_versiones_bucket(bucket_name)
+        else:
+            claves = (obj.key for obj in self.iterar_objetos_s3(bucket_name))
+        return self.eliminar_objetos_s3_lote(
+            bucket_name, claves, dry_run=dry_run, max_workers=max_workers
+        )
+
+    def eliminar_bucket_s3(self, bucket_name, dry_run=False):
         """
         ELIMINAR BUCKET S3 (vacío)
 
         Parámetro OBLIGATORIO:
             - bucket_name (str): Nombre del bucket
 
-        NOTA: El bucket DEBE estar vacío para poder eliminarlo
+        Parámetros OPCIONALES:
+            - dry_run (bool): Solo mostrar lo que se eliminaría
+
+        NOTA: El bucket se vacía antes con borrados en lote (incluidas las versiones)
         ADVERTENCIA: Esta acción es irreversible
         """
         try:
             print(f"\n[S3] Eliminando bucket: {bucket_name}")
 
-            # Primero, eliminar todos los objetos
+            # Primero, eliminar todos los objetos y versiones
             print(f"  Limpiando objetos...")
-            objetos = self.listar_objetos_s3(bucket_name)
-            for obj in objetos:
-                self.eliminar_objeto_s3(bucket_name, obj)
+            resultado = self.vaciar_bucket_s3(bucket_name, dry_run=dry_run)
+
+            if dry_run:
+                return True
+
+            if resultado["errores"]:
+                print(f"✗ No se elimina el bucket: {len(resultado['errores'])} errores al vaciarlo")
+                return False
 
             # Eliminar el bucket
             self.s3_client.delete_bucket(Bucket=bucket_name)
@@ -581,59 +3289,196 @@ class StorageManager:
             print(f"✗ Error: {str(e)}")
             return False
 
-    def obtener_versiones_objeto(self, bucket_name, s3_key):
+    def iterar_versiones_objeto(self, bucket_name, s3_key, desde=None, hasta=None,
+                                incluir_borrados=False, page_size=1000):
+        """
+        ITERAR EL HISTORIAL DE VERSIONES DE UN OBJETO (PAGINADO)
+
+        Recorre list_object_versions página a página, de la versión más
+        reciente a la más antigua, y deja de pedir páginas en cuanto se
+        pasa de `desde` o aparece otra clave.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta exacta del objeto
+
+        Parámetros OPCIONALES:
+            - desde, hasta (datetime): Rango de fechas de modificación (sin zona = UTC)
+            - incluir_borrados (bool): Incluir los delete markers (size=None)
+            - page_size (int): Versiones por página (máximo 1000)
+
+        Retorna: Generador de VersionS3(key, version_id, last_modified, size, is_latest, etag)
+        """
+        def con_zona(fecha):
+            if fecha is not None and fecha.tzinfo is None:
+                return fecha.replace(tzinfo=datetime.timezone.utc)
+            return fecha
+
+        desde, hasta = con_zona(desde), con_zona(hasta)
+        paginator = self.s3_client.get_paginator("list_object_versions")
+        paginas = paginator.paginate(
+            Bucket=bucket_name,
+            Prefix=s3_key,
+            PaginationConfig={"PageSize": page_size},
+        )
+        for pagina in paginas:
+            entradas = pagina.get("Versions", [])
+            if incluir_borrados:
+                entradas = entradas + pagina.get("DeleteMarkers", [])
+
+            # El prefijo también devuelve claves más largas ("datos.csv" -> "datos.csv.bak"),
+            # que van detrás en orden lexicográfico: al verlas, el historial ha terminado
+            terminado = any(
+                entrada["Key"] > s3_key
+                for entrada in pagina.get("Versions", []) + pagina.get("DeleteMarkers", [])
+            )
+            # Versiones y delete markers llegan en listas separadas: se mezclan por fecha
+            # (con la misma fecha, la marcada como IsLatest va primero)
+            propias = sorted(
+                (entrada for entrada in entradas if entrada["Key"] == s3_key),
+                key=lambda entrada: (entrada["LastModified"], entrada["IsLatest"]),
+                reverse=True,
+            )
+            for entrada in propias:
+                if desde and entrada["LastModified"] < desde:
+                    terminado = True
+                    break
+                if hasta and entrada["LastModified"] > hasta:
+                    continue
+                yield VersionS3(
+                    entrada["Key"],
+                    entrada["VersionId"],
+                    entrada["LastModified"],
+                    entrada.get("Size"),
+                    entrada["IsLatest"],
+                    entrada.get("ETag"),
+                )
+            if terminado:
+                return
+
+    def obtener_contenidos_versiones_s3(self, bucket_name, s3_key, version_ids,
+                                        max_workers=16, cache_dir=None):
+        """
+        OBTENER EL CONTENIDO DE VARIAS VERSIONES DE UN OBJETO EN PARALELO
+
+        Las versiones de S3 son inmutables, así que con cache_dir su contenido
+        se guarda en disco sin invalidarlo nunca: las siguientes lecturas de
+        la misma versión no hacen ninguna llamada a S3. La versión "null"
+        (objetos subidos sin versionado o con el versionado suspendido) se
+        puede sobrescribir, por lo que nunca se guarda en la caché.
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - s3_key (str): Ruta del objeto
+            - version_ids (list): IDs de versión (o VersionS3)
+
+        Parámetros OPCIONALES:
+            - max_workers (int): Versiones descargadas a la vez
+            - cache_dir (str): Directorio de la caché local (None = sin caché;
+                se puede borrar en cualquier momento)
+
+        Retorna: Diccionario {version_id: bytes} (None en las versiones que fallen)
+        """
+        version_ids = [v.version_id if isinstance(v, VersionS3) else v for v in version_ids]
+        if cache_dir:
+            directorio = os.path.join(
+                cache_dir, hashlib.sha256(f"{bucket_name}/{s3_key}".encode("utf-8")).hexdigest()
+            )
+
+        def ruta_cache(version_id):
+            return os.path.join(directorio, hashlib.sha256(version_id.encode("utf-8")).hexdigest())
+
+        def obtener(version_id):
+            usar_cache = bool(cache_dir) and version_id != "null"
+            if usar_cache and os.path.exists(ruta_cache(version_id)):
+                with open(ruta_cache(version_id), "rb") as f:
+                    return f.read(), True
+
+            response = reintentar_con_backoff(
+                lambda: self.s3_client.get_object(Bucket=bucket_name, Key=s3_key, VersionId=version_id)
+            )
+            contenido = b"".join(descomprimir_bloques(
+                response["Body"].iter_chunks(), response.get("ContentEncoding")
+            ))
+
+            if usar_cache:
+                os.makedirs(directorio, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(contenido)
+                os.replace(tmp_path, ruta_cache(version_id))
+            return contenido, False
+
+        print(f"\n[S3] Obteniendo {len(version_ids)} versiones de {s3_key}...")
+        contenidos = {}
+        desde_cache = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futuros = {executor.submit(obtener, version_id): version_id
+                       for version_id in dict.fromkeys(version_ids)}
+            for futuro in as_completed(futuros):
+                version_id = futuros[futuro]
+                try:
+                    contenidos[version_id], en_cache = futuro.result()
+                    desde_cache += en_cache
+                except Exception as e:
+                    print(f"  ✗ Versión {version_id}: {str(e)}")
+                    contenidos[version_id] = None
+
+        correctas = sum(1 for c in contenidos.values() if c is not None)
+        print(f"✓ {correctas}/{len(contenidos)} versiones obtenidas ({desde_cache} desde caché)")
+        return contenidos
+
+    def obtener_versiones_objeto(self, bucket_name, s3_key, desde=None, hasta=None):
         """
         OBTENER TODAS LAS VERSIONES DE UN OBJETO
-        
-        Retorna lista de versiones con sus IDs
+
+        Parámetros OPCIONALES:
+            - desde, hasta (datetime): Rango de fechas (ver iterar_versiones_objeto)
+
+        Retorna lista de versiones con sus IDs (de la más reciente a la más antigua)
         """
         try:
             print(f"\n[S3] Listando versiones de {s3_key}...")
-            
-            response = self.s3_client.list_object_versions(
-                Bucket=bucket_name,
-                Prefix=s3_key
-            )
-            
+
             versiones = []
-            if 'Versions' in response:
-                for version in response['Versions']:
-                    versiones.append({
-                        'VersionId': version['VersionId'],
-                        'LastModified': version['LastModified'],
-                        'Size': version['Size'],
-                        'IsLatest': version['IsLatest']
-                    })
-                    
-                    print(f"\n  Versión: {version['VersionId']}")
-                    print(f"    Última: {version['IsLatest']}")
-                    print(f"    Fecha: {version['LastModified']}")
-                    print(f"    Tamaño: {version['Size']} bytes")
-            
+            for version in self.iterar_versiones_objeto(bucket_name, s3_key, desde, hasta):
+                versiones.append({
+                    'VersionId': version.version_id,
+                    'LastModified': version.last_modified,
+                    'Size': version.size,
+                    'IsLatest': version.is_latest
+                })
+
+                print(f"\n  Versión: {version.version_id}")
+                print(f"    Última: {version.is_latest}")
+                print(f"    Fecha: {version.last_modified}")
+                print(f"    Tamaño: {version.size} bytes")
+
             return versiones
-            
+
         except Exception as e:
             print(f"✗ Error: {str(e)}")
             return []
 
-    def obtener_version_especifica(self, bucket_name, s3_key, version_id):
+    def obtener_version_especifica(self, bucket_name, s3_key, version_id, cache_dir=None):
         """
         OBTENER UNA VERSION ESPECIFICA DE UN OBJETO
+
+        Para varias versiones es más rápido obtener_contenidos_versiones_s3
+        (cache_dir: ver obtener_contenidos_versiones_s3)
         """
         try:
             print(f"\n[S3] Obteniendo versión {version_id[:8]}... del objeto {s3_key}")
-            
-            response = self.s3_client.get_object(
-                Bucket=bucket_name,
-                Key=s3_key,
-                VersionId=version_id
-            )
-            
-            contenido = response['Body'].read()
+
+            contenido = self.obtener_contenidos_versiones_s3(
+                bucket_name, s3_key, [version_id], cache_dir=cache_dir
+            )[version_id]
+            if contenido is None:
+                return None
+
             print(f"✓ Contenido obtenido ({len(contenido)} bytes)")
-            
             return contenido
-            
+
         except Exception as e:
             print(f"✗ Error: {str(e)}")
             return None    
@@ -688,7 +3533,9 @@ class StorageManager:
             print(f"✗ Error: {str(e)}")
             return None
 
-    def ejecutar_query_athena(self, database_name, sql, bucket_name):
+    def ejecutar_query_athena(self, database_name, sql, bucket_name, timeout=300,
+                              usar_cache=False, reutilizar_resultados_min=None, ttl_cache=None,
+                              huella_objetos=False):
         """
         EJECUTAR QUERY EN ATHENA
         
@@ -696,51 +3543,332 @@ class StorageManager:
             - database_name: Base de datos
             - sql: Consulta SQL
             - bucket_name: Bucket para resultados
+            - timeout: Segundos máximos de espera (la query se cancela al superarlos)
+            - usar_cache: Consultar primero la caché local (AthenaResultCache); la
+                entrada solo vale si las tablas no han cambiado en el catálogo
+            - ttl_cache: Segundos que vale una entrada de la caché. Las queries con
+                funciones no deterministas (now(), rand()...) solo usan la caché
+                si se indica
+            - huella_objetos: Incluir en la huella los ETag de los objetos de
+                las tablas (para tablas cuyos archivos cambian sin tocar el
+                catálogo; cuesta un listado de S3 por consulta)
+            - reutilizar_resultados_min: Activar el "query result reuse" de Athena
+                con esa antigüedad máxima en minutos (si el workgroup lo soporta)
+
+        Retorna: Diccionario {"query_id", "columnas", "filas"} (None si falla). Las
+                 filas se leen a medida que se recorren; con usar_cache el
+                 resultado se guarda en la caché al terminar de recorrerlas.
         """
         try:
             print(f"\n[ATHENA] Ejecutando query...")
             print(f"SQL: {sql}\n")
+
+            clave_cache = None
+            if usar_cache and ttl_cache is None and not AthenaResultCache.es_determinista(sql):
+                print("⚠ La query usa funciones no deterministas: no se usa la caché (indica ttl_cache)")
+                usar_cache = False
+            if usar_cache:
+                if self.cache_athena is None:
+                    self.cache_athena = AthenaResultCache()
+                huella = self.huella_tablas_athena(
+                    database_name, sql, listar_objetos=huella_objetos,
+                    excluir_prefijo=f"s3://{bucket_name}/athena-results/",
+                )
+                if huella:
+                    clave_cache = self.cache_athena.calcular_clave(sql, database_name, huella)
+                    en_cache = self.cache_athena.obtener(clave_cache, ttl=ttl_cache)
+                    if en_cache:
+                        print(f"✓ Resultado obtenido de la caché local ({len(en_cache['filas'])} filas)")
+                        return {"query_id": None, **en_cache}
             
-            response = self.athena_client.start_query_execution(
-                QueryString=sql,
-                QueryExecutionContext={'Database': database_name},
-                ResultConfiguration={'OutputLocation': f's3://{bucket_name}/athena-results/'}
-            )
+            params = {
+                "QueryString": sql,
+                "QueryExecutionContext": {'Database': database_name},
+                "ResultConfiguration": {'OutputLocation': f's3://{bucket_name}/athena-results/'},
+            }
+            if reutilizar_resultados_min:
+                params["ResultReuseConfiguration"] = {
+                    "ResultReuseByAgeConfiguration": {
+                        "Enabled": True,
+                        "MaxAgeInMinutes": reutilizar_resultados_min,
+                    }
+                }
+            try:
+                response = self.athena_client.start_query_execution(**params)
+            except Exception as e:
+                if "ResultReuseConfiguration" not in params:
+                    raise
+                # Workgroups sin motor v3 no admiten la reutilización de resultados
+                print(f"⚠ Reutilización de resultados no disponible: {str(e)}")
+                params.pop("ResultReuseConfiguration")
+                response = self.athena_client.start_query_execution(**params)
             
             query_id = response['QueryExecutionId']
             print(f"✓ Query ejecutado. ID: {query_id}")
             
-            # Esperar a que termine
-            import time
-            max_attempts = 30
-            for i in range(max_attempts):
-                response = self.athena_client.get_query_execution(QueryExecutionId=query_id)
-                status = response['QueryExecution']['Status']['State']
-                
-                if status == 'SUCCEEDED':
-                    print(f"✓ Query completado")
-                    break
-                elif status == 'FAILED':
-                    print(f"✗ Query falló: {response['QueryExecution']['Status']['StateChangeReason']}")
-                    return None
-                
-                time.sleep(1)
-            
-            # Obtener resultados
-            results = self.athena_client.get_query_results(QueryExecutionId=query_id)
-            
-            # Mostrar resultados
-            print(f"\n[RESULTADOS]")
-            for row in results['ResultSet']['Rows']:
-                valores = [col.get('VarCharValue', '') for col in row['Data']]
-                print(f"  {valores}")
+            # Esperar a que termine (espera exponencial con jitter)
+            estado = esperar_query_athena(self.athena_client, query_id, timeout=timeout)
+            if estado['estado'] != 'SUCCEEDED':
+                print(f"✗ Query {estado['estado']}: {estado['motivo']}")
+                return None
+            print(f"✓ Query completado ({estado['bytes_escaneados']} bytes escaneados, "
+                  f"{estado['tiempo_ejecucion_ms']} ms)")
             
-            return results
+            resultado = self.mostrar_resultados_athena(query_id)
+            if clave_cache:
+                filas = resultado["filas"]
+
+                def guardar_al_terminar():
+                    vistas = []
+                    for fila in filas:
+                        vistas.append(fila)
+                        yield fila
+                    self.cache_athena.guardar(clave_cache, resultado["columnas"], vistas)
+
+                resultado["filas"] = guardar_al_terminar()
+            return resultado
             
         except Exception as e:
             print(f"✗ Error: {str(e)}")
             return None
 
+    def huella_tablas_athena(self, database_name, sql, listar_objetos=False, excluir_prefijo=None):
+        """
+        HUELLA DEL ESTADO DE LAS TABLAS USADAS EN UNA QUERY
+
+        Busca las tablas de las cláusulas FROM/JOIN y resume en un hash lo que
+        el catálogo de Glue sabe de ellas: esquema (columnas y claves de
+        partición con sus tipos), LOCATION, fecha de modificación, parámetros
+        y particiones registradas (valores, LOCATION y fecha de creación).
+        Solo hace llamadas a Glue, no lista S3.
+
+        Parámetros OPCIONALES:
+            - listar_objetos (bool): Añadir los ETag y fechas de todos los objetos
+                de la tabla y de sus particiones (detecta archivos sustituidos sin
+                cambiar el catálogo, pero lista toda la tabla en cada consulta)
+            - excluir_prefijo (str): Prefijo s3:// que no cuenta al listar (los
+                resultados de Athena, si caen dentro de la tabla)
+
+        Retorna: Hash hexadecimal, o None si alguna tabla no se puede resolver
+                 (en ese caso no se usa la caché)
+        """
+        tablas = sorted(set(
+            re.findall(r'\b(?:from|join)\s+([\w."]+)', sql, flags=re.I)
+        ))
+        if not tablas:
+            return None
+
+        huella = hashlib.sha256()
+        for tabla in tablas:
+            partes = tabla.replace('"', "").split(".")
+            database, nombre = (partes[-2], partes[-1]) if len(partes) > 1 else (database_name, partes[0])
+            try:
+                metadata = self.glue_client.get_table(DatabaseName=database, Name=nombre)["Table"]
+            except Exception:
+                return None
+            descriptor = metadata.get("StorageDescriptor", {})
+            location = descriptor.get("Location")
+            if not location:
+                return None
+
+            huella.update(f"{database}.{nombre}@{location}|{metadata.get('UpdateTime')}\n".encode("utf-8"))
+            huella.update(json.dumps(metadata.get("Parameters", {}), sort_keys=True).encode("utf-8"))
+            for tipo, columnas in (("Columns", descriptor.get("Columns", [])),
+                                   ("PartitionKeys", metadata.get("PartitionKeys", []))):
+                for col in columnas:
+                    huella.update(f"{tipo}|{col['Name']}|{col.get('Type')}\n".encode("utf-8"))
+
+            locations = [location]
+            if metadata.get("PartitionKeys"):
+                try:
+                    particiones = [
+                        particion
+                        for pagina in self.glue_client.get_paginator("get_partitions").paginate(
+                            DatabaseName=database, TableName=nombre
+                        )
+                        for particion in pagina["Partitions"]
+                    ]
+                except Exception:
+                    return None
+                for particion in sorted(particiones, key=lambda p: p["Values"]):
+                    ubicacion = particion.get("StorageDescriptor", {}).get("Location", "")
+                    huella.update(f"particion|{particion['Values']}|{ubicacion}|"
+                                  f"{particion.get('CreationTime')}\n".encode("utf-8"))
+                    if ubicacion and not ubicacion.startswith(location.rstrip("/") + "/"):
+                        locations.append(ubicacion)
+
+            if not listar_objetos:
+                continue
+            for ubicacion in locations:
+                bucket, _, prefix = ubicacion.replace("s3://", "", 1).partition("/")
+                for obj in self.iterar_objetos_s3(bucket, prefix):
+                    if excluir_prefijo and f"s3://{bucket}/{obj.key}".startswith(excluir_prefijo):
+                        continue
+                    huella.update(f"{obj.key}|{obj.etag}|{obj.last_modified}\n".encode("utf-8"))
+        return huella.hexdigest()
+
+    def iterar_resultados_athena(self, query_id, tipar=True, desde_csv=None,
+                                 umbral_csv_mb=16, por_columnas=False, tam_lote=10000,
+                                 metadata=None):
+        """
+        ITERAR TODAS LAS FILAS DEL RESULTADO DE UNA QUERY DE ATHENA
+
+        Para resultados pequeños pagina get_query_results. Para resultados
+        grandes lee directamente el CSV que Athena deja en athena-results/
+        mediante lecturas por rangos, sin miles de llamadas paginadas.
+
+        Parámetros:
+            - query_id: ID de la query (debe haber terminado)
+            - tipar: Convertir los valores según los tipos de las columnas
+            - desde_csv: True/False para forzar el origen (None = según tamaño)
+            - umbral_csv_mb: Tamaño del CSV a partir del cual se lee desde S3
+            - por_columnas: Devolver lotes {columna: [valores]} en lugar de filas
+            - tam_lote: Filas por lote (modo por_columnas)
+            - metadata: Columnas [(nombre, tipo)] si ya se han obtenido
+
+        Los NULL se devuelven como None y las cadenas vacías como "" tanto
+        si se lee de get_query_results como del CSV.
+
+        Retorna: Generador de tuplas (una por fila) o de diccionarios por columnas
+        """
+        ejecucion = self.athena_client.get_query_execution(QueryExecutionId=query_id)["QueryExecution"]
+        es_select = ejecucion.get("StatementType") == "DML"
+        output_location = ejecucion.get("ResultConfiguration", {}).get("OutputLocation", "")
+
+        if metadata is None:
+            metadata = self.obtener_metadata_athena(query_id)
+        columnas = [nombre for nombre, _ in metadata]
+        tipos = [tipo for _, tipo in metadata]
+
+        bucket_resultados, _, key_resultados = output_location.replace("s3://", "", 1).partition("/")
+        tamano_csv = None
+        if desde_csv is not False and es_select and key_resultados.endswith(".csv"):
+            tamano_csv = self.s3_client.head_object(
+                Bucket=bucket_resultados, Key=key_resultados
+            )["ContentLength"]
+            if desde_csv is None:
+                desde_csv = tamano_csv >= umbral_csv_mb * 1024 * 1024
+        else:
+            desde_csv = False
+
+        def filas_texto():
+            if desde_csv:
+                lineas = separar_lineas(
+                    self.iterar_rangos_s3(bucket_resultados, key_resultados, tamano=tamano_csv),
+                    conservar_saltos=True,
+                )
+                lector = filas_csv_athena(lineas)
+                next(lector, None)  # Cabecera
+                yield from lector
+                return
+
+            paginator = self.athena_client.get_paginator("get_query_results")
+            primera = es_select
+            for pagina in paginator.paginate(QueryExecutionId=query_id,
+                                             PaginationConfig={"PageSize": 1000}):
+                filas = pagina["ResultSet"]["Rows"]
+                if primera:
+                    filas = filas[1:]  # En los SELECT la primera fila es la cabecera
+                    primera = False
+                for fila in filas:
+                    yield [col.get("VarCharValue") for col in fila["Data"]]
+
+        def filas():
+            for fila in filas_texto():
+                if tipar:
+                    yield tuple(convertir_valor_athena(v, t) for v, t in zip(fila, tipos))
+                else:
+                    yield tuple(fila)
+
+        if not por_columnas:
+            yield from filas()
+            return
+
+        lote = {col: [] for col in columnas}
+        num_filas = 0
+        for fila in filas():
+            for col, valor in zip(columnas, fila):
+                lote[col].append(valor)
+            num_filas += 1
+            if num_filas == tam_lote:
+                yield lote
+                lote = {col: [] for col in columnas}
+                num_filas = 0
+        if num_filas:
+            yield lote
+
+    def obtener_metadata_athena(self, query_id):
+        """
+        Obtiene las columnas del resultado de una query como lista de (nombre, tipo)
+        """
+        metadata = self.athena_client.get_query_results(
+            QueryExecutionId=query_id, MaxResults=1
+        )["ResultSet"]["ResultSetMetadata"]["ColumnInfo"]
+        return [(col["Name"], col["Type"].lower()) for col in metadata]
+
+    def mostrar_resultados_athena(self, query_id, max_filas_mostrar=100):
+        """
+        MOSTRAR RESULTADOS DE UNA QUERY TERMINADA
+
+        Solo lee las primeras max_filas_mostrar filas para mostrarlas; el
+        resto se sigue leyendo (por páginas) a medida que se recorre "filas".
+
+        Retorna: Diccionario {"query_id", "columnas", "filas"}, con "filas" un
+                 iterador de todas las filas tipadas
+        """
+        metadata = self.obtener_metadata_athena(query_id)
+        columnas = [nombre for nombre, _ in metadata]
+        filas = self.iterar_resultados_athena(query_id, metadata=metadata)
+        primeras = list(itertools.islice(filas, max_filas_mostrar + 1))
+
+        print(f"\n[RESULTADOS] {min(len(primeras), max_filas_mostrar)} filas mostradas")
+        print(f"  {columnas}")
+        for fila in primeras[:max_filas_mostrar]:
+            print(f"  {list(fila)}")
+        if len(primeras) > max_filas_mostrar:
+            print("  ... (hay más filas)")
+
+        return {"query_id": query_id, "columnas": columnas, "filas": itertools.chain(primeras, filas)}
+
+    def ejecutar_queries_athena(self, database_name, sqls, bucket_name,
+                                max_concurrentes=5, timeout=300):
+        """
+        EJECUTAR VARIAS QUERIES DE ATHENA EN PARALELO
+
+        Parámetros:
+            - database_name: Base de datos
+            - sqls: Lista de consultas SQL
+            - bucket_name: Bucket para resultados
+            - max_concurrentes: Queries en ejecución a la vez
+            - timeout: Segundos máximos por query
+
+        Retorna: Lista de diccionarios (query_id, estado, bytes_escaneados,
+                 tiempo_ejecucion_ms...) en el mismo orden que sqls
+        """
+        print(f"\n[ATHENA] Ejecutando {len(sqls)} queries (máx. {max_concurrentes} a la vez)...")
+        output_location = f's3://{bucket_name}/athena-results/'
+
+        with AthenaExecutor(self.athena_client, max_concurrentes, timeout) as executor:
+            futuros = [executor.enviar(sql, database_name, output_location) for sql in sqls]
+            resultados = []
+            for futuro, sql in zip(futuros, sqls):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    resultados.append({"query_id": None, "estado": "ERROR",
+                                       "motivo": str(e), "sql": sql})
+
+        for resultado in resultados:
+            print(f"\nSQL: {resultado['sql']}")
+            if resultado["estado"] != "SUCCEEDED":
+                print(f"✗ Query {resultado['estado']}: {resultado['motivo']}")
+                continue
+            print(f"✓ {resultado['bytes_escaneados']} bytes escaneados, "
+                  f"{resultado['tiempo_ejecucion_ms']} ms")
+            self.mostrar_resultados_athena(resultado["query_id"])
+
+        return resultados
+
     def crear_tabla_athena_json(self, database_name, table_name, bucket_name, 
                             json_path, columns):
         """
@@ -777,29 +3905,57 @@ class StorageManager:
             return None
         
     def crear_tabla_particionada_athena(self, database_name, table_name, 
-                                    bucket_name, columns):
+                                    bucket_name, columns, path="datos_particionados/",
+                                    num_columnas_particion=1, proyeccion=None):
         """
         CREAR TABLA PARTICIONADA EN ATHENA
         
         Las particiones aceleran las queries filtrando por columna
+
+        Parámetros:
+            - columns: Lista de tuplas (nombre, tipo); las últimas
+                num_columnas_particion son las columnas de partición
+            - path: Carpeta del bucket con los datos (ej: "datos_particionados/")
+            - num_columnas_particion: Cuántas columnas finales son de partición
+            - proyeccion: Configuración de partition projection por columna, ej:
+                {"year": {"type": "integer", "range": "2020,2030"}}
+                Con proyección Athena calcula las particiones a partir de la
+                ruta y no hace falta registrarlas (ALTER TABLE ADD PARTITION)
         """
         try:
             print(f"\n[ATHENA] Creando tabla particionada {table_name}...")
             
-            cols_def = ", ".join([f"{col} {tipo}" for col, tipo in columns[:-1]])
-            partition_col, partition_type = columns[-1]
+            cols_def = ", ".join([f"{col} {tipo}" for col, tipo in columns[:-num_columnas_particion]])
+            particiones = columns[-num_columnas_particion:]
+            partition_def = ", ".join([f"{col} {tipo}" for col, tipo in particiones])
+            location = f"s3://{bucket_name}/{path}"
             
             sql = f"""
             CREATE EXTERNAL TABLE IF NOT EXISTS {database_name}.{table_name} (
                 {cols_def}
             )
             PARTITIONED BY (
-                {partition_col} {partition_type}
+                {partition_def}
             )
             ROW FORMAT DELIMITED
             FIELDS TERMINATED BY ','
             STORED AS TEXTFILE
-            LOCATION 's3://{bucket_name}/datos_particionados/'
+            LOCATION '{location}'
+            """
+
+            if proyeccion:
+                propiedades = {"projection.enabled": "true"}
+                for col, opciones in proyeccion.items():
+                    for opcion, valor in opciones.items():
+                        propiedades[f"projection.{col}.{opcion}"] = str(valor)
+                plantilla = "/".join(f"{col}=${{{col}}}" for col, _ in particiones)
+                propiedades["storage.location.template"] = f"{location.rstrip('/')}/{plantilla}"
+                props_def = ",\n                ".join(
+                    f"'{clave}'='{valor}'" for clave, valor in propiedades.items()
+                )
+                sql += f"""TBLPROPERTIES (
+                {props_def}
+            )
             """
             
             print(f"SQL:\n{sql}")
@@ -817,33 +3973,291 @@ class StorageManager:
             print(f"✗ Error: {str(e)}")
             return None
 
-    def agregar_particion_athena(self, database_name, table_name, 
-                                partition_value, bucket_name, path):
+    def agregar_particion_athena(self, database_name, table_name, 
+                                partition_value, bucket_name, path):
+        """
+        AGREGAR PARTICIÓN A TABLA
+        """
+        try:
+            print(f"\n[ATHENA] Agregando partición...")
+            
+            sql = f"""
+            ALTER TABLE {database_name}.{table_name}
+            ADD IF NOT EXISTS PARTITION (year='{partition_value}')
+            LOCATION 's3://{bucket_name}/{path}'
+            """
+            
+            response = self.athena_client.start_query_execution(
+                QueryString=sql,
+                QueryExecutionContext={'Database': database_name},
+                ResultConfiguration={'OutputLocation': f's3://{bucket_name}/athena-results/'}
+            )
+            
+            print(f"✓ Partición agregada")
+            return response['QueryExecutionId']
+            
+        except Exception as e:
+            print(f"✗ Error: {str(e)}")
+            return None
+    
+    def descubrir_particiones_s3(self, bucket_name, path, columnas_particion):
+        """
+        DESCUBRIR PARTICIONES EN S3 (carpetas del tipo col=valor/)
+
+        Recorre solo los niveles de carpetas con Delimiter="/", sin listar
+        los archivos de datos.
+
+        Parámetros:
+            - bucket_name: Bucket con los datos
+            - path: Carpeta base de la tabla (ej: "datos_particionados/")
+            - columnas_particion: Columnas de partición en orden (ej: ["year", "month"])
+
+        Retorna: Lista de tuplas (valores, ruta) ej: [(("2024",), "datos_particionados/year=2024/")]
+        """
+        path = path.rstrip("/") + "/" if path else ""
+        niveles = [((), path)]
+        for columna in columnas_particion:
+            siguientes = []
+            for valores, prefijo in niveles:
+                for obj in self.iterar_objetos_s3(bucket_name, prefijo, delimiter="/"):
+                    if obj.size is not None:
+                        continue
+                    carpeta = obj.key[len(prefijo):].rstrip("/")
+                    nombre, separador, valor = carpeta.partition("=")
+                    if separador and nombre == columna:
+                        siguientes.append((valores + (valor,), obj.key))
+            niveles = siguientes
+        return niveles
+
+    def obtener_particiones_athena(self, database_name, table_name, bucket_name):
+        """
+        OBTENER LAS PARTICIONES YA REGISTRADAS (SHOW PARTITIONS)
+
+        Retorna: Conjunto de tuplas con los valores de cada partición
+        """
+        response = self.athena_client.start_query_execution(
+            QueryString=f"SHOW PARTITIONS {database_name}.{table_name}",
+            QueryExecutionContext={'Database': database_name},
+            ResultConfiguration={'OutputLocation': f's3://{bucket_name}/athena-results/'}
+        )
+        estado = esperar_query_athena(self.athena_client, response['QueryExecutionId'])
+        if estado['estado'] != 'SUCCEEDED':
+            raise RuntimeError(f"SHOW PARTITIONS {estado['estado']}: {estado['motivo']}")
+
+        particiones = set()
+        for fila in self.iterar_resultados_athena(response['QueryExecutionId'], tipar=False):
+            # Cada fila es del tipo "year=2024/month=01"
+            particiones.add(tuple(
+                parte.partition("=")[2] for parte in (fila[0] or "").split("/") if parte
+            ))
+        return particiones
+
+    def registrar_particiones_athena(self, database_name, table_name, bucket_name,
+                                     path, columnas_particion=("year",),
+                                     particiones_por_query=100, max_concurrentes=4):
+        """
+        REGISTRAR EN LOTE LAS PARTICIONES QUE FALTAN
+
+        Descubre las carpetas de partición en S3, las compara con las ya
+        registradas y añade solo las nuevas, agrupando muchas particiones en
+        cada ALTER TABLE ADD PARTITION y enviando varias queries a la vez.
+
+        Parámetros:
+            - database_name, table_name: Tabla particionada
+            - bucket_name: Bucket de los datos (y de los resultados de Athena)
+            - path: Carpeta base de la tabla (ej: "datos_particionados/")
+            - columnas_particion: Columnas de partición en orden
+            - particiones_por_query: Particiones por sentencia ALTER TABLE
+            - max_concurrentes: Sentencias ejecutadas a la vez
+
+        Retorna: Número de particiones añadidas (None si falla)
+        """
+        try:
+            print(f"\n[ATHENA] Registrando particiones de {database_name}.{table_name}...")
+
+            en_s3 = self.descubrir_particiones_s3(bucket_name, path, columnas_particion)
+            registradas = self.obtener_particiones_athena(database_name, table_name, bucket_name)
+            nuevas = [(valores, ruta) for valores, ruta in en_s3 if valores not in registradas]
+
+            print(f"  En S3: {len(en_s3)}, registradas: {len(registradas)}, nuevas: {len(nuevas)}")
+            if not nuevas:
+                print(f"✓ No hay particiones nuevas")
+                return 0
+
+            sqls = []
+            for i in range(0, len(nuevas), particiones_por_query):
+                clausulas = []
+                for valores, ruta in nuevas[i:i + particiones_por_query]:
+                    spec = ", ".join(
+                        f"{col}='{valor.replace(chr(39), chr(39) * 2)}'"
+                        for col, valor in zip(columnas_particion, valores)
+                    )
+                    clausulas.append(f"PARTITION ({spec}) LOCATION 's3://{bucket_name}/{ruta}'")
+                sqls.append(
+                    f"ALTER TABLE {database_name}.{table_name} ADD IF NOT EXISTS\n"
+                    + "\n".join(clausulas)
+                )
+
+            output_location = f's3://{bucket_name}/athena-results/'
+            with AthenaExecutor(self.athena_client, max_concurrentes) as executor:
+                futuros = [executor.enviar(sql, database_name, output_location) for sql in sqls]
+                resultados = [futuro.result() for futuro in futuros]
+
+            fallidas = [r for r in resultados if r["estado"] != "SUCCEEDED"]
+            for r in fallidas:
+                print(f"  ✗ {r['estado']}: {r['motivo']}")
+            if fallidas:
+                print(f"✗ {len(fallidas)} de {len(sqls)} sentencias fallaron")
+                return None
+
+            print(f"✓ {len(nuevas)} particiones añadidas en {len(sqls)} sentencias")
+            return len(nuevas)
+
+        except Exception as e:
+            print(f"✗ Error: {str(e)}")
+            return None
+
+    def compactar_tabla_athena_parquet(self, database_name, tabla_origen, tabla_destino,
+                                       bucket_name, destino_path, columnas_particion=None,
+                                       compresion="SNAPPY", tamano_archivo_mb=128,
+                                       bucketed_by=None, ratio_compresion=0.25,
+                                       max_concurrentes=4):
         """
-        AGREGAR PARTICIÓN A TABLA
+        COMPACTAR UNA TABLA CSV/JSON A PARQUET (CTAS + INSERT INTO)
+
+        Reescribe los datos de una tabla de texto como Parquet comprimido y
+        particionado, y registra la nueva tabla. Athena limita cada CTAS/INSERT
+        a 100 particiones, así que la primera tanda se crea con CTAS y el resto
+        se añade con INSERT INTO en paralelo.
+
+        Parámetros:
+            - database_name: Base de datos
+            - tabla_origen: Tabla de texto existente (ej: "personas")
+            - tabla_destino: Nombre de la nueva tabla Parquet
+            - bucket_name: Bucket de destino (y de resultados de Athena)
+            - destino_path: Carpeta vacía para los Parquet (ej: "parquet/personas/")
+            - columnas_particion: Columnas por las que particionar (opcional)
+            - compresion: SNAPPY, GZIP, ZSTD...
+            - tamano_archivo_mb: Tamaño objetivo de cada archivo Parquet
+            - bucketed_by: Columna para repartir en archivos; con ella el número de
+                archivos se calcula según tamano_archivo_mb (bucket_count)
+            - ratio_compresion: Tamaño estimado del Parquet respecto al texto
+            - max_concurrentes: INSERT INTO ejecutados a la vez
+
+        Retorna: Diccionario con la tabla creada y las sentencias ejecutadas (None si falla)
         """
         try:
-            print(f"\n[ATHENA] Agregando partición...")
-            
-            sql = f"""
-            ALTER TABLE {database_name}.{table_name}
-            ADD IF NOT EXISTS PARTITION (year='{partition_value}')
-            LOCATION 's3://{bucket_name}/{path}'
-            """
-            
-            response = self.athena_client.start_query_execution(
-                QueryString=sql,
-                QueryExecutionContext={'Database': database_name},
-                ResultConfiguration={'OutputLocation': f's3://{bucket_name}/athena-results/'}
+            print(f"\n[ATHENA] Compactando {tabla_origen} a Parquet en {tabla_destino}...")
+            columnas_particion = list(columnas_particion or [])
+            destino_path = destino_path.rstrip("/") + "/"
+            output_location = f's3://{bucket_name}/athena-results/'
+
+            if next(self.iterar_objetos_s3(bucket_name, destino_path), None):
+                print(f"✗ La carpeta destino s3://{bucket_name}/{destino_path} no está vacía")
+                return None
+
+            metadata = self.athena_client.get_table_metadata(
+                CatalogName="AwsDataCatalog",
+                DatabaseName=database_name,
+                TableName=tabla_origen,
+            )["TableMetadata"]
+            tipos = {c["Name"]: c.get("Type") for c in metadata["Columns"] + metadata.get("PartitionKeys", [])}
+            columnas = list(tipos)
+
+            # Las columnas de partición tienen que ir al final del SELECT
+            select_cols = [c for c in columnas if c not in columnas_particion] + columnas_particion
+            select_sql = f"SELECT {', '.join(select_cols)} FROM {database_name}.{tabla_origen}"
+
+            # Estimar el número de archivos a partir del tamaño de los datos de origen
+            location = metadata.get("Parameters", {}).get("location", "")
+            origen_bucket, _, origen_prefix = location.replace("s3://", "", 1).partition("/")
+            tamano_origen = sum(
+                obj.size or 0 for obj in self.iterar_objetos_s3(origen_bucket, origen_prefix)
+            ) if origen_bucket else 0
+
+            valores_particion = []
+            if columnas_particion:
+                # Valores sin tipar (el texto de Athena) para construir literales exactos
+                with AthenaExecutor(self.athena_client) as executor:
+                    distinct = executor.ejecutar(
+                        f"SELECT DISTINCT {', '.join(columnas_particion)} FROM {database_name}.{tabla_origen}",
+                        database_name,
+                        output_location,
+                    )
+                if distinct["estado"] != "SUCCEEDED":
+                    print(f"✗ SELECT DISTINCT {distinct['estado']}: {distinct['motivo']}")
+                    return None
+                valores_particion = list(self.iterar_resultados_athena(distinct["query_id"], tipar=False))
+
+            propiedades = [
+                "format = 'PARQUET'",
+                f"write_compression = '{compresion}'",
+                f"external_location = 's3://{bucket_name}/{destino_path}'",
+            ]
+            if columnas_particion:
+                propiedades.append(
+                    "partitioned_by = ARRAY[" + ", ".join(f"'{c}'" for c in columnas_particion) + "]"
+                )
+            if bucketed_by:
+                tamano_estimado = tamano_origen * ratio_compresion / max(1, len(valores_particion))
+                bucket_count = max(1, -(-int(tamano_estimado) // (tamano_archivo_mb * 1024 * 1024)))
+                propiedades.append(f"bucketed_by = ARRAY['{bucketed_by}']")
+                propiedades.append(f"bucket_count = {bucket_count}")
+                print(f"  {bucket_count} archivos por partición (~{tamano_archivo_mb} MB cada uno)")
+
+            def filtro(grupo):
+                condiciones = []
+                for valores in grupo:
+                    partes = []
+                    for col, valor in zip(columnas_particion, valores):
+                        if valor is None:
+                            partes.append(f"{col} IS NULL")
+                        else:
+                            partes.append(f"{col} = {literal_athena(valor, tipos.get(col))}")
+                    condiciones.append("(" + " AND ".join(partes) + ")")
+                return " WHERE " + " OR ".join(condiciones)
+
+            grupos = [valores_particion[i:i + 100] for i in range(0, len(valores_particion), 100)]
+
+            ctas = (
+                f"CREATE TABLE {database_name}.{tabla_destino}\n"
+                f"WITH ({', '.join(propiedades)})\n"
+                f"AS {select_sql}" + (filtro(grupos[0]) if grupos else "")
             )
-            
-            print(f"✓ Partición agregada")
-            return response['QueryExecutionId']
-            
+            print(f"SQL:\n{ctas}")
+            with AthenaExecutor(self.athena_client, max_concurrentes) as executor:
+                resultado = executor.enviar(ctas, database_name, output_location).result()
+                if resultado["estado"] != "SUCCEEDED":
+                    print(f"✗ CTAS {resultado['estado']}: {resultado['motivo']}")
+                    return None
+
+                inserts = [
+                    f"INSERT INTO {database_name}.{tabla_destino} {select_sql}{filtro(grupo)}"
+                    for grupo in grupos[1:]
+                ]
+                futuros = [executor.enviar(sql, database_name, output_location) for sql in inserts]
+                resultados = [resultado] + [futuro.result() for futuro in futuros]
+
+            fallidas = [r for r in resultados if r["estado"] != "SUCCEEDED"]
+            for r in fallidas:
+                print(f"  ✗ {r['estado']}: {r['motivo']}")
+            if fallidas:
+                print(f"✗ {len(fallidas)} de {len(resultados)} sentencias fallaron")
+                return None
+
+            print(f"✓ Tabla Parquet creada: {database_name}.{tabla_destino} "
+                  f"({len(resultados)} sentencias, {len(valores_particion)} particiones)")
+            return {
+                "tabla": f"{database_name}.{tabla_destino}",
+                "location": f"s3://{bucket_name}/{destino_path}",
+                "particiones": len(valores_particion),
+                "sentencias": resultados,
+            }
+
         except Exception as e:
             print(f"✗ Error: {str(e)}")
             return None
-    
+
     # ==================== VPC/NETWORK MANAGEMENT ====================
 
     def obtener_vpc_predeterminada(self):
@@ -1196,14 +4610,62 @@ class StorageManager:
         """
         Obtener estado actual de una instancia EC2
         """
-        try:
-            response = self.ec2_client.describe_instances(InstanceIds=[instance_id])
-            state = response["Reservations"][0]["Instances"][0]["State"]["Name"]
+        state = self.obtener_estados_ec2([instance_id]).get(instance_id)
+        if state:
             print(f"[EC2] Estado de {instance_id}: {state}")
-            return state
+        return state
+
+    def obtener_estados_ec2(self, instance_ids):
+        """
+        Obtener el estado de varias instancias EC2 con una sola consulta (paginada)
+
+        Se filtra por instance-id en lugar de pasar InstanceIds: así un ID que
+        ya no existe no hace fallar la consulta de todos los demás.
+
+        Retorna: Diccionario {instance_id: estado} (sin los IDs que no existen)
+        """
+        try:
+            estados = {}
+            instance_ids = list(dict.fromkeys(instance_ids))
+            paginator = self.ec2_client.get_paginator("describe_instances")
+            # Máximo de valores por filtro
+            for i in range(0, len(instance_ids), 200):
+                filtro = [{"Name": "instance-id", "Values": instance_ids[i:i + 200]}]
+                for pagina in paginator.paginate(Filters=filtro):
+                    for reserva in pagina["Reservations"]:
+                        for instancia in reserva["Instances"]:
+                            estados[instancia["InstanceId"]] = instancia["State"]["Name"]
+            return estados
         except Exception as e:
             print(f"✗ Error al obtener estado: {str(e)}")
-            return None
+            return {}
+
+    def obtener_estados_ebs(self, volume_ids):
+        """
+        Obtener estado y asociaciones de varios volúmenes EBS en una sola consulta
+
+        Como en obtener_estados_ec2, se filtra por volume-id para que un
+        volumen borrado no haga fallar la consulta del resto.
+
+        Retorna: Diccionario {volume_id: {"estado": ..., "instancias": [...]}}
+                 (sin los IDs que no existen)
+        """
+        try:
+            estados = {}
+            volume_ids = list(dict.fromkeys(volume_ids))
+            paginator = self.ec2_client.get_paginator("describe_volumes")
+            for i in range(0, len(volume_ids), 200):
+                filtro = [{"Name": "volume-id", "Values": volume_ids[i:i + 200]}]
+                for pagina in paginator.paginate(Filters=filtro):
+                    for volumen in pagina["Volumes"]:
+                        estados[volumen["VolumeId"]] = {
+                            "estado": volumen["State"],
+                            "instancias": [a["InstanceId"] for a in volumen.get("Attachments", [])],
+                        }
+            return estados
+        except Exception as e:
+            print(f"✗ Error al obtener volúmenes: {str(e)}")
+            return {}
 
     # ==================== EBS MANAGEMENT ====================
     # Almacenamiento: Almacenamiento en bloque persistente y de alto rendimiento
@@ -1298,7 +4760,10 @@ class StorageManager:
             )
 
             # Esperar a que se asocie
-            time.sleep(2)
+            self.ec2_client.get_waiter("volume_in_use").wait(
+                VolumeIds=[volume_id],
+                WaiterConfig={"Delay": 2, "MaxAttempts": 60},
+            )
 
             print(f"✓ Volumen asociado en dispositivo {device}")
 
@@ -1371,21 +4836,214 @@ df -h {mount_point}
 """
         return user_data_script
 
-    def agregar_archivo_ebs(self, instance_id, archivo_path, contenido):
+    def configurar_ssh(self, usuario="ec2-user", directorio_claves=".", puerto=22,
+                       verificar_host=True):
+        """
+        CONFIGURAR EL ACCESO SSH A LAS INSTANCIAS EC2
+
+        Parámetros OPCIONALES:
+            - usuario (str): Usuario remoto (ec2-user en Amazon Linux, ubuntu en Ubuntu)
+            - directorio_claves (str): Carpeta con los archivos <key_name>.pem
+            - puerto (int): Puerto SSH
+            - verificar_host (bool): Verificar la clave de host con known_hosts o con
+                la salida de consola de la instancia. False acepta cualquier clave
+                (solo para pruebas: expuesto a MITM)
+
+        Retorna: PoolSSH (las conexiones abiertas antes se cierran)
+        """
+        if self.pool_ssh is not None:
+            self.pool_ssh.cerrar()
+        self.pool_ssh = PoolSSH(
+            self.ec2_client,
+            usuario=usuario,
+            directorio_claves=directorio_claves,
+            puerto=puerto,
+            verificar_host=verificar_host,
+        )
+        return self.pool_ssh
+
+    def subir_archivos_ec2(self, instance_id, archivos, directorio_remoto=".", canales=4,
+                           en_vuelo=64, compresion=False, verificar=True,
+                           lote_verificacion=200):
+        """
+        SUBIR MUCHOS ARCHIVOS A UNA INSTANCIA EC2 POR SFTP (EBS/EFS MONTADOS)
+
+        Usa una única conexión SSH por instancia y abre sobre ella varios
+        canales SFTP que suben archivos a la vez. Las escrituras van en
+        modo pipelined (sin esperar la confirmación de cada bloque) con un
+        máximo de peticiones pendientes por archivo. Al terminar se
+        comprueba el SHA-256 de los archivos con sha256sum en el servidor,
+        en lotes.
+
+        Parámetros OBLIGATORIOS:
+            - instance_id (str): ID de la instancia
+            - archivos: Directorio local (se sube entero), dict {local: remoto},
+                o lista de rutas locales / tuplas (local, remoto)
+
+        Parámetros OPCIONALES:
+            - directorio_remoto (str): Destino de los archivos sin ruta remota explícita
+                (ej: "/mnt/datos" para el EBS montado por user_data, o el punto de montaje EFS)
+            - canales (int): Canales SFTP en paralelo sobre la misma conexión
+            - en_vuelo (int): Escrituras de 32 KB pendientes de confirmar por archivo
+            - compresion (bool): Comprimir el tráfico SSH (útil con CSV/JSON en redes lentas)
+            - verificar (bool): Comparar el SHA-256 local con el remoto
+            - lote_verificacion (int): Archivos por cada llamada a sha256sum
+
+        NOTA: El usuario SSH necesita permiso de escritura en el destino
+              (el user_data de montaje hace chown ec2-user sobre el punto de montaje)
+
+        Retorna: Diccionario {"subidos": int, "bytes": int, "errores": [...]} o None si falla la conexión
+        """
+        if isinstance(archivos, str) and os.path.isdir(archivos):
+            pares = []
+            for raiz, _, nombres in os.walk(archivos):
+                for nombre in nombres:
+                    local = os.path.join(raiz, nombre)
+                    rel = os.path.relpath(local, archivos).replace(os.sep, "/")
+                    pares.append((local, posixpath.join(directorio_remoto, rel)))
+        elif isinstance(archivos, dict):
+            pares = list(archivos.items())
+        else:
+            pares = [
+                tuple(archivo) if isinstance(archivo, (tuple, list))
+                else (archivo, posixpath.join(directorio_remoto, os.path.basename(archivo)))
+                for archivo in archivos
+            ]
+
+        def lotes(elementos, tamano):
+            for i in range(0, len(elementos), tamano):
+                yield elementos[i:i + tamano]
+
+        try:
+            print(f"\n[SFTP] Subiendo {len(pares)} archivos a {instance_id} "
+                  f"({canales} canales, compresión {'sí' if compresion else 'no'})...")
+            pool = self.pool_ssh or self.configurar_ssh()
+            cliente = pool.conexion(instance_id, compresion)
+
+            # Crear los directorios remotos con pocos comandos en lugar de uno por archivo
+            directorios = sorted({posixpath.dirname(remoto) for _, remoto in pares} - {"", "."})
+            for lote in lotes(directorios, 500):
+                codigo, _, errores = pool.ejecutar(
+                    instance_id, "mkdir -p -- " + " ".join(shlex.quote(d) for d in lote), compresion
+                )
+                if codigo != 0:
+                    raise RuntimeError(f"mkdir falló: {errores.strip()}")
+
+            locales = threading.local()
+            canales_abiertos = []
+            lock = threading.Lock()
+
+            def sftp_del_hilo():
+                if not hasattr(locales, "sftp"):
+                    locales.sftp = cliente.open_sftp()
+                    with lock:
+                        canales_abiertos.append(locales.sftp)
+                return locales.sftp
+
+            def subir(local, remoto):
+                sftp = sftp_del_hilo()
+                sha256 = hashlib.sha256()
+                enviados = 0
+                with open(local, "rb") as origen, sftp.open(remoto, "wb") as destino:
+                    for i, bloque in enumerate(iter(lambda: origen.read(TAM_BLOQUE_SFTP), b""), 1):
+                        # Cada en_vuelo bloques se escribe uno sin pipelining: paramiko
+                        # espera entonces todas las confirmaciones pendientes
+                        destino.set_pipelined(i % en_vuelo != 0)
+                        destino.write(bloque)
+                        sha256.update(bloque)
+                        enviados += len(bloque)
+                return sha256.hexdigest(), enviados
+
+            resultado = {"subidos": 0, "bytes": 0, "errores": []}
+            hashes = {}
+            inicio = time.time()
+            try:
+                with ThreadPoolExecutor(max_workers=canales) as executor:
+                    futuros = {executor.submit(subir, local, remoto): remoto for local, remoto in pares}
+                    for futuro in as_completed(futuros):
+                        remoto = futuros[futuro]
+                        try:
+                            hashes[remoto], enviados = futuro.result()
+                            resultado["subidos"] += 1
+                            resultado["bytes"] += enviados
+                        except Exception as e:
+                            resultado["errores"].append({"Archivo": remoto, "Motivo": str(e)})
+            finally:
+                for sftp in canales_abiertos:
+                    sftp.close()
+
+            transcurrido = max(time.time() - inicio, 1e-6)
+            print(f"✓ {resultado['subidos']} archivos subidos ({resultado['bytes'] / 1024 / 1024:.2f} MB, "
+                  f"{resultado['bytes'] / transcurrido / 1024 / 1024:.2f} MB/s)")
+
+            if verificar and hashes:
+                def verificar_lote(lote):
+                    _, salida, _ = pool.ejecutar(
+                        instance_id, "sha256sum -- " + " ".join(shlex.quote(r) for r in lote), compresion
+                    )
+                    remotos = {}
+                    for linea in salida.splitlines():
+                        suma, _, ruta = linea.partition("  ")
+                        remotos[ruta] = suma
+                    return [r for r in lote if remotos.get(r) != hashes[r]]
+
+                with ThreadPoolExecutor(max_workers=canales) as executor:
+                    for fallidos in executor.map(verificar_lote, lotes(sorted(hashes), lote_verificacion)):
+                        for remoto in fallidos:
+                            resultado["subidos"] -= 1
+                            resultado["errores"].append({"Archivo": remoto, "Motivo": "checksum distinto"})
+                print(f"✓ Checksums verificados en el servidor")
+
+            for error in resultado["errores"]:
+                print(f"  ✗ {error['Archivo']}: {error['Motivo']}")
+            return resultado
+
+        except Exception as e:
+            print(f"✗ Error en la transferencia SFTP: {str(e)}")
+            return None
+
+    def agregar_archivo_ebs(self, instance_id, archivo_path, contenido, compresion=False):
         """
         AGREGAR ARCHIVO AL VOLUMEN EBS (via SSH)
 
-        NOTA: Requiere SSH accesible y credenciales de clave privada
-        Para simplificar la demostración, usaremos user_data en EC2
+        Escribe el contenido por SFTP reutilizando la conexión SSH de la
+        instancia. Para muchos archivos usar subir_archivos_ec2.
 
         Parámetros:
             - instance_id: ID de la instancia
-            - archivo_path: Ruta donde crear el archivo
-            - contenido: Contenido del archivo
+            - archivo_path: Ruta donde crear el archivo (ej: "/mnt/datos/notas.txt")
+            - contenido: Contenido del archivo (str o bytes)
+            - compresion: Comprimir el tráfico SSH
+
+        NOTA: Requiere SSH accesible y el archivo <key_name>.pem (ver configurar_ssh)
         """
-        print(f"\n[EBS] Para agregar archivos al EBS, usa SSH o configurar user_data")
-        print(f"      Archivo que se guardaría: {archivo_path}")
-        print(f"      Contenido: {contenido[:50]}...")
+        try:
+            print(f"\n[EBS] Escribiendo {archivo_path} en {instance_id}...")
+            if isinstance(contenido, str):
+                contenido = contenido.encode("utf-8")
+
+            pool = self.pool_ssh or self.configurar_ssh()
+            directorio = posixpath.dirname(archivo_path)
+            if directorio:
+                codigo, _, errores = pool.ejecutar(
+                    instance_id, f"mkdir -p -- {shlex.quote(directorio)}", compresion
+                )
+                if codigo != 0:
+                    raise RuntimeError(f"mkdir falló: {errores.strip()}")
+
+            sftp = pool.conexion(instance_id, compresion).open_sftp()
+            try:
+                with sftp.open(archivo_path, "wb") as destino:
+                    destino.write(contenido)
+            finally:
+                sftp.close()
+
+            print(f"✓ Archivo guardado ({len(contenido)} bytes)")
+            return True
+
+        except Exception as e:
+            print(f"✗ Error al escribir el archivo: {str(e)}")
+            return False
 
     # ==================== EFS MANAGEMENT ====================
     # Almacenamiento: Sistema de archivos elástico y compartido
@@ -1482,6 +5140,26 @@ df -h {mount_point}
             print(f"✗ Error al crear Mount Target: {str(e)}")
             return None
 
+    def esperar_efs_disponible(self, fs_id, timeout=300, espera_inicial=1, espera_maxima=15):
+        """
+        Esperar a que un EFS esté en estado 'available'
+        (EFS no tiene waiters nativos en boto3: espera exponencial con jitter)
+        """
+        inicio = time.time()
+        espera = espera_inicial
+        while True:
+            estado = self.efs_client.describe_file_systems(FileSystemId=fs_id)[
+                "FileSystems"
+            ][0]["LifeCycleState"]
+            if estado == "available":
+                return True
+            if estado in ("error", "deleting", "deleted") or time.time() - inicio > timeout:
+                print(f"✗ EFS {fs_id} en estado {estado}")
+                return False
+            print(f"EFS aún en estado {estado}, esperando...")
+            time.sleep(random.uniform(espera / 2, espera))
+            espera = min(espera * 2, espera_maxima)
+
     def listar_efs(self):
         """
         Listar todos los EFS disponibles
@@ -1505,6 +5183,278 @@ df -h {mount_point}
             print(f"✗ Error al listar EFS: {str(e)}")
             return []
 
+# ==================== GESTOR DE ALMACENAMIENTO ASÍNCRONO ====================
+
+async def gather_limited(limite, *aws, return_exceptions=False):
+    """
+    Como asyncio.gather, pero con un máximo de `limite` corrutinas en curso a la vez.
+
+    Parámetros:
+        - limite (int): Corrutinas ejecutándose simultáneamente
+        - *aws: Corrutinas/awaitables
+        - return_exceptions (bool): Devolver las excepciones como resultados
+
+    Retorna: Lista de resultados en el mismo orden que aws
+    """
+    semaforo = asyncio.Semaphore(limite)
+
+    async def limitada(aw):
+        async with semaforo:
+            return await aw
+
+    return await asyncio.gather(*(limitada(aw) for aw in aws), return_exceptions=return_exceptions)
+
+
+class AsyncStorageManager:
+    """
+    Versión asyncio de las operaciones de S3 y Athena de StorageManager.
+
+    Cada método es una corrutina que ejecuta el método síncrono equivalente
+    en un pool de hilos propio; boto3 libera el GIL mientras espera la red,
+    así que miles de operaciones pequeñas se solapan. Los métodos iterar_*
+    devuelven generadores asíncronos (async for).
+
+    Ejemplo:
+        async with AsyncStorageManager() as manager:
+            await gather_limited(32, *(
+                manager.subir_contenido_s3(bucket, contenido, clave)
+                for clave, contenido in archivos.items()
+            ))
+
+    NOTA: Para más de 50 operaciones en vuelo hay que subir también el pool
+          de conexiones: AWSClientRegistry.configurar(max_pool_connections=N)
+    """
+
+    METODOS_S3 = (
+        "crear_bucket_s3", "crear_carpeta_s3", "subir_archivo_s3", "subir_contenido_s3",
+        "subir_contenido_s3_con_storage_class", "subir_archivo_s3_con_storage_class",
+        "subir_archivo_s3_multipart", "sincronizar_directorio_s3", "listar_objetos_s3",
+        "descargar_objeto_s3", "descargar_objeto_s3_paralelo", "obtener_contenido_s3",
+        "obtener_contenido_s3_como_texto", "eliminar_objeto_s3", "eliminar_objetos_s3_lote",
+        "vaciar_bucket_s3", "eliminar_bucket_s3", "habilitar_versionado_s3",
+        "obtener_versiones_objeto", "obtener_version_especifica",
+        "obtener_contenidos_versiones_s3",
+    )
+    METODOS_ATHENA = (
+        "crear_tabla_athena_csv", "crear_tabla_athena_json", "crear_tabla_particionada_athena",
+        "ejecutar_query_athena", "ejecutar_queries_athena", "obtener_metadata_athena",
+        "mostrar_resultados_athena", "agregar_particion_athena", "descubrir_particiones_s3",
+        "obtener_particiones_athena", "registrar_particiones_athena",
+        "compactar_tabla_athena_parquet",
+    )
+    GENERADORES = (
+        "iterar_objetos_s3", "iterar_contenido_s3", "iterar_lineas_s3", "iterar_rangos_s3",
+        "consultar_objeto_s3", "iterar_versiones_bucket", "iterar_versiones_objeto",
+        "iterar_resultados_athena",
+    )
+
+    def __init__(self, region="us-east-1", endpoint_url=None, max_workers=None, manager=None):
+        """
+        Args:
+            region (str): Región de AWS
+            endpoint_url (str o dict): Endpoint alternativo (ver StorageManager)
+            max_workers (int): Hilos del pool (defecto: tamaño del pool de conexiones)
+            manager (StorageManager): Gestor síncrono a reutilizar (opcional)
+        """
+        self.manager = manager or StorageManager(region=region, endpoint_url=endpoint_url)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or AWSClientRegistry.opciones["max_pool_connections"]
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        self.executor.shutdown(wait=True)
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta una función síncrona en el pool y espera su resultado
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(funcion, *args, **kwargs))
+
+    async def iterar(self, generador):
+        """
+        Convierte un generador síncrono en uno asíncrono (cada next() va al pool)
+        """
+        FIN = object()
+        try:
+            while True:
+                elemento = await self.ejecutar(next, generador, FIN)
+                if elemento is FIN:
+                    return
+                yield elemento
+        finally:
+            generador.close()
+
+    async def subir_contenidos_s3(self, bucket_name, contenidos, content_type="text/plain",
+                                  storage_class=None, limite=32):
+        """
+        SUBIR MUCHOS CONTENIDOS A S3 A LA VEZ
+
+        Parámetros OBLIGATORIOS:
+            - bucket_name (str): Nombre del bucket
+            - contenidos (dict): {s3_key: contenido (str o bytes)}
+
+        Parámetros OPCIONALES:
+            - content_type (str): Tipo MIME común
+            - storage_class (str): Clase de almacenamiento (None = STANDARD)
+            - limite (int): Subidas simultáneas
+
+        Retorna: Diccionario {s3_key: True/False}
+        """
+        if storage_class:
+            subidas = (
+                self.subir_contenido_s3_con_storage_class(
+                    bucket_name, contenido, clave, storage_class, content_type
+                )
+                for clave, contenido in contenidos.items()
+            )
+        else:
+            subidas = (
+                self.subir_contenido_s3(bucket_name, contenido, clave, content_type)
+                for clave, contenido in contenidos.items()
+            )
+        resultados = await gather_limited(limite, *subidas)
+        return dict(zip(contenidos, resultados))
+
+
+def crear_corutina(nombre):
+    async def metodo(self, *args, **kwargs):
+        return await self.ejecutar(getattr(self.manager, nombre), *args, **kwargs)
+    metodo.__name__ = nombre
+    metodo.__doc__ = getattr(StorageManager, nombre).__doc__
+    return metodo
+
+
+def crear_generador_async(nombre):
+    def metodo(self, *args, **kwargs):
+        # Crear el generador no hace llamadas: la E/S empieza en el primer next()
+        return self.iterar(getattr(self.manager, nombre)(*args, **kwargs))
+    metodo.__name__ = nombre
+    metodo.__doc__ = getattr(StorageManager, nombre).__doc__
+    return metodo
+
+
+def registrar_metodos_async(clase):
+    """
+    Añade a la clase las versiones async de los métodos de StorageManager
+    """
+    for nombre in clase.METODOS_S3 + clase.METODOS_ATHENA:
+        setattr(clase, nombre, crear_corutina(nombre))
+    for nombre in clase.GENERADORES:
+        setattr(clase, nombre, crear_generador_async(nombre))
+
+
+registrar_metodos_async(AsyncStorageManager)
+
+# ==================== PLANIFICADOR DE APROVISIONAMIENTO ====================
+
+class ProvisioningScheduler:
+    """
+    Ejecuta pasos de aprovisionamiento como un grafo de dependencias.
+
+    Los pasos sin dependencias pendientes se lanzan a la vez en un pool de
+    hilos. El resultado de cada paso se guarda en aws_config.json (clave de
+    configuración), de modo que al volver a ejecutar se saltan los pasos
+    cuyo recurso sigue existiendo y se continúa donde se quedó.
+
+    Uso:
+        planificador = ProvisioningScheduler()
+        planificador.agregar_paso("efs", crear_efs, clave_config="efs_id", verificar=existe_efs)
+        planificador.agregar_paso("mount", crear_mount, dependencias=["efs"])
+        resultados = planificador.ejecutar()
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.pasos = {}
+
+    def agregar_paso(self, nombre, funcion, dependencias=(), clave_config=None,
+                     verificar=None):
+        """
+        Parámetros:
+            - nombre: Identificador del paso
+            - funcion: funcion(resultados) -> valor (None indica fallo);
+                recibe el diccionario con los resultados de los pasos anteriores
+            - dependencias: Nombres de los pasos que deben terminar antes
+            - clave_config: Clave de ConfigManager donde persistir el resultado
+            - verificar: verificar(valor_guardado) -> bool, indica si el recurso
+                guardado sigue siendo válido para saltar el paso
+        """
+        self.pasos[nombre] = {
+            "funcion": funcion,
+            "dependencias": list(dependencias),
+            "clave_config": clave_config,
+            "verificar": verificar,
+        }
+
+    def ejecutar(self):
+        """
+        Ejecuta todos los pasos respetando las dependencias
+
+        Retorna: Diccionario {paso: resultado} (None en los pasos fallidos u omitidos)
+        """
+        for nombre, paso in self.pasos.items():
+            for dependencia in paso["dependencias"]:
+                if dependencia not in self.pasos:
+                    raise ValueError(f"El paso '{nombre}' depende de '{dependencia}', que no existe")
+
+        resultados = {}
+        pendientes = dict(self.pasos)
+        inicio = time.time()
+
+        # Reanudar: reutilizar recursos guardados que siguen existiendo
+        for nombre, paso in list(pendientes.items()):
+            clave = paso["clave_config"]
+            guardado = ConfigManager.obtener(clave) if clave else None
+            if guardado and paso["verificar"] and paso["verificar"](guardado):
+                print(f"[PLAN] {nombre}: reutilizando {guardado}")
+                resultados[nombre] = guardado
+                del pendientes[nombre]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            en_curso = {}
+            while pendientes or en_curso:
+                # Omitir los pasos cuyas dependencias fallaron
+                for nombre, paso in list(pendientes.items()):
+                    if any(dep in resultados and resultados[dep] is None
+                           for dep in paso["dependencias"]):
+                        print(f"[PLAN] {nombre}: omitido (falló una dependencia)")
+                        resultados[nombre] = None
+                        del pendientes[nombre]
+
+                # Lanzar los pasos listos
+                for nombre, paso in list(pendientes.items()):
+                    if all(dep in resultados for dep in paso["dependencias"]):
+                        print(f"[PLAN] {nombre}: iniciando")
+                        en_curso[executor.submit(paso["funcion"], dict(resultados))] = nombre
+                        del pendientes[nombre]
+
+                if not en_curso:
+                    break
+
+                terminado = next(as_completed(en_curso))
+                nombre = en_curso.pop(terminado)
+                try:
+                    valor = terminado.result()
+                except Exception as e:
+                    print(f"[PLAN] {nombre}: error {str(e)}")
+                    valor = None
+                resultados[nombre] = valor
+
+                clave = self.pasos[nombre]["clave_config"]
+                if valor is not None and clave:
+                    ConfigManager.actualizar(clave, valor)
+                estado = "✓" if valor is not None else "✗"
+                print(f"[PLAN] {estado} {nombre} ({time.time() - inicio:.1f}s)")
+
+        return resultados
+
 # ==================== PROGRAMA Security_Group_SUBNET_KeyPair ====================
 
 def main_security_group_subnet_keypairs():
@@ -1551,11 +5501,12 @@ def main_security_group_subnet_keypairs():
         print("✗ No se pudo crear/verificar la key pair")
         return
 
-    # Guardar en archivo de configuración
-    ConfigManager.actualizar("sg_id", sg_id)
-    ConfigManager.actualizar("subnet_id", subnet_id)
-    ConfigManager.actualizar("key_pairs_name", key_name)
-    ConfigManager.actualizar("availability_zone", availability_zone)
+    # Guardar en archivo de configuración (una sola escritura)
+    with ConfigManager.lote():
+        ConfigManager.actualizar("sg_id", sg_id)
+        ConfigManager.actualizar("subnet_id", subnet_id)
+        ConfigManager.actualizar("key_pairs_name", key_name)
+        ConfigManager.actualizar("availability_zone", availability_zone)
     
     print("\n✓ Infraestructura guardada en aws_config.json")
 
@@ -1585,119 +5536,162 @@ def main_ec2_efs_ebs():
     print(f"  Subnet: {subnet_id}")
     print(f"  Key: {key_name}")
 
-    # # ========== PASO 1: CREAR Y GESTIONAR EC2 ==========
-    print("\n\n>>> PASO 1: CREAR INSTANCIA EC2 <<<")
-
-    # Generar script para montar el EBS automáticamente
-    user_data = manager.generar_user_data_montaje_ebs(
-        device="/dev/sdf", mount_point="/mnt/datos"
-    )
-
-    instance_id = manager.crear_ec2(
-        instance_name="mi-servidor-web",
-        ami_id="ami-0ecb62995f68bb549",
-        instance_type="t2.micro",
-        subnet_id=ConfigManager.obtener("subnet_id"),
-        key_name=key_name,
-        security_group_name=sg_id,
-        user_data=user_data,
-    )
+    # ========== PASO 1: APROVISIONAR EC2, EBS Y EFS EN PARALELO ==========
+    # instancia ──┐
+    #             ├── asociar EBS
+    # volumen ────┘
+    # efs ─────────── mount target
+    print("\n\n>>> PASO 1: APROVISIONAR EC2, EBS Y EFS <<<")
 
-    if not instance_id:
-        print("✗ Error: No se pudo crear la instancia EC2")
-        return
+    # Cada recurso se guarda en aws_config.json nada más crearlo y después se
+    # espera a que esté listo; al reanudar, verificar termina esa espera
 
-    if instance_id:
+    def esperar_instancia(instance_id):
         manager.ec2_client.get_waiter("instance_running").wait(
-            InstanceIds=[instance_id]
+            InstanceIds=[instance_id],
+            WaiterConfig={"Delay": 5, "MaxAttempts": 60},
         )
 
-    if instance_id:
-        # Esperar a que la instancia esté disponible
-        time.sleep(5)
-
-        print("\n>>> PASO 2: VERIFICAR ESTADO DE EC2 <<<")
-        manager.obtener_estado_ec2(instance_id)
-
-        print("\n>>> PASO 3: PARAR EC2 <<<")
-        manager.parar_ec2(instance_id)
-
-        time.sleep(3)
-
-        print("\n>>> PASO 4: EJECUTAR EC2 <<<")
-        manager.ejecutar_ec2(instance_id)
-
-        time.sleep(3)
-
-    ConfigManager.actualizar("instance_id", instance_id)
-
-    # ========== PASO 5: CREAR Y ASOCIAR EBS ==========
-    print("\n\n>>> PASO 5: CREAR VOLUMEN EBS <<<")
+    def esperar_volumen(volume_id):
+        manager.ec2_client.get_waiter("volume_available").wait(
+            VolumeIds=[volume_id],
+            WaiterConfig={"Delay": 3, "MaxAttempts": 60},
+        )
 
-    volume_id = manager.crear_ebs(
-        volume_name="mi-volumen-datos",
-        size=20,
-        volume_type="gp3",
-        availability_zone=availability_zone,
-    )
+    def crear_instancia(resultados):
+        # Generar script para montar el EBS automáticamente
+        user_data = manager.generar_user_data_montaje_ebs(
+            device="/dev/sdf", mount_point="/mnt/datos"
+        )
+        instance_id = manager.crear_ec2(
+            instance_name="mi-servidor-web",
+            ami_id="ami-0ecb62995f68bb549",
+            instance_type="t2.micro",
+            subnet_id=subnet_id,
+            key_name=key_name,
+            security_group_name=sg_id,
+            user_data=user_data,
+        )
+        if instance_id:
+            # Guardar antes de esperar: si la espera falla, la siguiente ejecución
+            # reutiliza la instancia en vez de crear otra
+            ConfigManager.actualizar("instance_id", instance_id)
+            esperar_instancia(instance_id)
+        return instance_id
+
+    def crear_volumen(resultados):
+        volume_id = manager.crear_ebs(
+            volume_name="mi-volumen-datos",
+            size=20,
+            volume_type="gp3",
+            availability_zone=availability_zone,
+        )
+        if volume_id:
+            ConfigManager.actualizar("volume_id", volume_id)
+            esperar_volumen(volume_id)
+        return volume_id
+
+    def asociar_volumen(resultados):
+        instance_id = resultados["instancia"]
+        volume_id = resultados["volumen"]
+        estado = manager.obtener_estados_ebs([volume_id]).get(volume_id, {})
+        if instance_id in estado.get("instancias", []):
+            print(f"[EBS] {volume_id} ya está asociado a {instance_id}")
+            return True
+        return manager.asociar_ebs_a_ec2(volume_id, instance_id, device="/dev/sdf") or None
+
+    def crear_sistema_archivos(resultados):
+        efs_id = manager.crear_efs(
+            fs_name="mi-efs-compartido",
+            performance_mode="generalPurpose",
+            throughput_mode="bursting",
+            encrypted=False,
+        )
+        if efs_id:
+            ConfigManager.actualizar("efs_id", efs_id)
+            if not manager.esperar_efs_disponible(efs_id):
+                return None
+        return efs_id
 
-    if volume_id:
-        time.sleep(3)
+    def crear_punto_montaje(resultados):
+        return manager.crear_mount_target(
+            fs_id=resultados["efs"],
+            subnet_id=subnet_id,
+            security_group_ids=[sg_id],
+        )
 
-        print("\n>>> PASO 6: ASOCIAR EBS A EC2 <<<")
-        manager.asociar_ebs_a_ec2(volume_id, instance_id, device="/dev/sdf")
+    # Un recurso que existe pero aún no está listo se reutiliza (nunca se
+    # crea otro): se espera aquí y, si la espera falla, lo dirá el paso que lo use
+    def instancia_valida(instance_id):
+        estado = manager.obtener_estados_ec2([instance_id]).get(instance_id)
+        if estado == "pending":
+            try:
+                esperar_instancia(instance_id)
+            except Exception as e:
+                print(f"⚠ {instance_id} sigue sin arrancar: {str(e)}")
+        return estado in ("pending", "running", "stopping", "stopped")
 
-        print("\n>>> PASO 7: AGREGAR ARCHIVO A EBS <<<")
+    def volumen_valido(volume_id):
+        estado = manager.obtener_estados_ebs([volume_id]).get(volume_id, {}).get("estado")
+        if estado == "creating":
+            try:
+                esperar_volumen(volume_id)
+            except Exception as e:
+                print(f"⚠ {volume_id} sigue sin estar disponible: {str(e)}")
+        return estado in ("creating", "available", "in-use")
 
-    ConfigManager.actualizar("volume_id", volume_id)
+    def efs_valido(efs_id):
+        try:
+            estado = manager.efs_client.describe_file_systems(FileSystemId=efs_id)[
+                "FileSystems"
+            ][0]["LifeCycleState"]
+        except Exception:
+            return False
+        if estado == "creating":
+            try:
+                manager.esperar_efs_disponible(efs_id)
+            except Exception as e:
+                print(f"⚠ {efs_id} sigue sin estar disponible: {str(e)}")
+        return estado in ("creating", "available")
 
-    # ========== PASO 8: CREAR EFS ==========
-    print("\n\n>>> PASO 8: CREAR EFS (SISTEMA DE ARCHIVOS COMPARTIDO) <<<")
-    efs_id = manager.crear_efs(
-        fs_name="mi-efs-compartido",
-        performance_mode="generalPurpose",
-        throughput_mode="bursting",
-        encrypted=False,
-    )
+    def mount_target_valido(mount_target_id):
+        try:
+            manager.efs_client.describe_mount_targets(MountTargetId=mount_target_id)
+            return True
+        except Exception:
+            return False
 
-    if not efs_id:
-        print("✗ Error: No se pudo crear EFS")
+    planificador = ProvisioningScheduler(max_workers=4)
+    planificador.agregar_paso("instancia", crear_instancia,
+                              clave_config="instance_id", verificar=instancia_valida)
+    planificador.agregar_paso("volumen", crear_volumen,
+                              clave_config="volume_id", verificar=volumen_valido)
+    planificador.agregar_paso("asociar", asociar_volumen,
+                              dependencias=["instancia", "volumen"])
+    planificador.agregar_paso("efs", crear_sistema_archivos,
+                              clave_config="efs_id", verificar=efs_valido)
+    planificador.agregar_paso("mount_target", crear_punto_montaje, dependencias=["efs"],
+                              clave_config="mount_target_id", verificar=mount_target_valido)
+    resultados = planificador.ejecutar()
+
+    instance_id = resultados.get("instancia")
+    if not instance_id:
+        print("✗ Error: No se pudo crear la instancia EC2")
         return
 
-    ConfigManager.actualizar("efs_id", efs_id)
-
-    while True:
-        estado = manager.efs_client.describe_file_systems(FileSystemId=efs_id)[
-            "FileSystems"
-        ][0]["LifeCycleState"]
-        if estado == "available":
-            break
-        print(f"EFS aún en estado {estado}, esperando...")
-        time.sleep(3)
-
-    if efs_id:
-        time.sleep(2)
-
-        # ========== PASO 9: CREAR MOUNT TARGET PARA EFS ==========
-        print("\n\n>>> PASO 9: CREAR MOUNT TARGET PARA EFS <<<")
+    print("\n>>> PASO 2: VERIFICAR ESTADO DE EC2 <<<")
+    manager.obtener_estado_ec2(instance_id)
 
-        if subnet_id:
-            mount_target_id = manager.crear_mount_target(
-                fs_id=efs_id,
-                subnet_id=subnet_id,
-                security_group_ids=[sg_id],
-            )
-        else:
-            print("No se pudo obtener el subnet_id, no se creará el Mount Target.")
-            mount_target_id = None
+    print("\n>>> PASO 3: PARAR EC2 <<<")
+    manager.parar_ec2(instance_id)
 
-        if mount_target_id:
-            ConfigManager.actualizar("mount_target_id", mount_target_id)
-            time.sleep(2)
+    print("\n>>> PASO 4: EJECUTAR EC2 <<<")
+    manager.ejecutar_ec2(instance_id)
 
-            # ========== PASO 10: LISTAR EFS DISPONIBLES ===
-            print("\n\n>>> PASO 10: LISTAR EFS DISPONIBLES <<<")
-            manager.listar_efs()
+    if resultados.get("mount_target"):
+        # ========== PASO 5: LISTAR EFS DISPONIBLES ===
+        print("\n\n>>> PASO 5: LISTAR EFS DISPONIBLES <<<")
+        manager.listar_efs()
 
     print("\n✓ EC2, EBS y EFS guardados en aws_config.json")
 
@@ -1857,6 +5851,16 @@ Junio,25600.00,12000.00,13600.00,0.531"""
         for linea in lineas:
             print(f"  {linea}")
         print(f"  ... ({len(contenido_ventas.split(chr(10)))} filas totales)")
+
+    # PASO 6b: Filtrar filas en S3 sin descargar el objeto completo
+    print("\n[S3] Ventas con total > 2000 (S3 Select)...")
+    for fila in manager.consultar_objeto_s3(
+        bucket_name=bucket_name,
+        s3_key="ventas/ventas_enero_2024.csv",
+        columnas=["fecha", "producto", "total"],
+        filtro=[("total", ">", 2000)],
+    ):
+        print(f"  {fila['fecha']} | {fila['producto']} | {fila['total']}")
     
     # PASO 7: Descargar objeto a archivo local
     print("\n\n>>> PASO 7: DESCARGAR OBJETO A ARCHIVO LOCAL <<<")
@@ -2774,21 +6778,22 @@ def main_versionado_s3():
     print("\n>>> PASO 5: LISTAR TODAS LAS VERSIONES <<<")
     versiones = manager.obtener_versiones_objeto(bucket_name, "datos/personas.csv")
     
-    # PASO 6: Comparar versiones
+    # PASO 6: Comparar versiones (todas las versiones en una sola tanda)
     print("\n>>> PASO 6: COMPARAR VERSIONES <<<")
     if len(versiones) >= 2:
         v1_id = versiones[-1]['VersionId']  # Primera versión
         v2_id = versiones[0]['VersionId']   # Última versión
+        contenidos = manager.obtener_contenidos_versiones_s3(
+            bucket_name, "datos/personas.csv", [v1_id, v2_id]
+        )
         
         print(f"\n[VERSIÓN 1] (más antigua)")
-        contenido_v1 = manager.obtener_version_especifica(bucket_name, "datos/personas.csv", v1_id)
-        if contenido_v1:
-            print(contenido_v1.decode('utf-8'))
+        if contenidos[v1_id]:
+            print(contenidos[v1_id].decode('utf-8'))
         
         print(f"\n[VERSIÓN 2] (más reciente)")
-        contenido_v2 = manager.obtener_version_especifica(bucket_name, "datos/personas.csv", v2_id)
-        if contenido_v2:
-            print(contenido_v2.decode('utf-8'))
+        if contenidos[v2_id]:
+            print(contenidos[v2_id].decode('utf-8'))
 
 # ==================== PROGRAMA ATHENA ====================   
 
@@ -2825,27 +6830,18 @@ def main_athena_csv():
     )
     time.sleep(2)
     
-    # PASO 3: Query 1 - Seleccionar todo
-    print("\n>>> PASO 3: QUERY 1 - SELECCIONAR TODO <<<")
-    manager.ejecutar_query_athena(
-        database_name="mi_db",
-        sql="SELECT * FROM personas",
-        bucket_name=bucket_name
-    )
-    
-    # PASO 4: Query 2 - Contar por ciudad
-    print("\n>>> PASO 4: QUERY 2 - CONTAR POR CIUDAD <<<")
-    manager.ejecutar_query_athena(
-        database_name="mi_db",
-        sql="SELECT ciudad, COUNT(*) as cantidad FROM personas GROUP BY ciudad",
-        bucket_name=bucket_name
-    )
-    
-    # PASO 5: Query 3 - Promedio de edad
-    print("\n>>> PASO 5: QUERY 3 - PROMEDIO DE EDAD <<<")
-    manager.ejecutar_query_athena(
+    # PASO 3: Queries en paralelo
+    # Query 1 - Seleccionar todo
+    # Query 2 - Contar por ciudad
+    # Query 3 - Promedio de edad
+    print("\n>>> PASO 3: QUERIES EN PARALELO (TODO, CONTAR POR CIUDAD, PROMEDIO DE EDAD) <<<")
+    manager.ejecutar_queries_athena(
         database_name="mi_db",
-        sql="SELECT ciudad, AVG(edad) as edad_promedio FROM personas GROUP BY ciudad",
+        sqls=[
+            "SELECT * FROM personas",
+            "SELECT ciudad, COUNT(*) as cantidad FROM personas GROUP BY ciudad",
+            "SELECT ciudad, AVG(edad) as edad_promedio FROM personas GROUP BY ciudad",
+        ],
         bucket_name=bucket_name
     )
 
@@ -2886,27 +6882,18 @@ def main_athena_json():
     )
     time.sleep(2)
     
-    # PASO 3: Query 1 - Todos los empleados
-    print("\n>>> PASO 3: QUERY 1 - TODOS LOS EMPLEADOS <<<")
-    manager.ejecutar_query_athena(
-        database_name="mi_db",
-        sql="SELECT * FROM empleados",
-        bucket_name=bucket_name
-    )
-    
-    # PASO 4: Query 2 - Salario promedio
-    print("\n>>> PASO 4: QUERY 2 - SALARIO PROMEDIO <<<")
-    manager.ejecutar_query_athena(
-        database_name="mi_db",
-        sql="SELECT AVG(salario) as salario_promedio FROM empleados",
-        bucket_name=bucket_name
-    )
-    
-    # PASO 5: Query 3 - Empleados con salario > 3500
-    print("\n>>> PASO 5: QUERY 3 - SALARIO MAYOR A 3500 <<<")
-    manager.ejecutar_query_athena(
+    # PASO 3: Queries en paralelo
+    # Query 1 - Todos los empleados
+    # Query 2 - Salario promedio
+    # Query 3 - Empleados con salario > 3500
+    print("\n>>> PASO 3: QUERIES EN PARALELO (TODOS, SALARIO PROMEDIO, SALARIO > 3500) <<<")
+    manager.ejecutar_queries_athena(
         database_name="mi_db",
-        sql="SELECT nombre, salario FROM empleados WHERE salario > 3500",
+        sqls=[
+            "SELECT * FROM empleados",
+            "SELECT AVG(salario) as salario_promedio FROM empleados",
+            "SELECT nombre, salario FROM empleados WHERE salario > 3500",
+        ],
         bucket_name=bucket_name
     )
 
@@ -2939,7 +6926,7 @@ def main_athena_tabla_particionada():
     
     # PASO 3: Crear tabla particionada
     print("\n>>> PASO 3: CREAR TABLA PARTICIONADA <<<")
-    manager.crear_tabla_particionada_athena(
+    query_id = manager.crear_tabla_particionada_athena(
         database_name="mi_db",
         table_name="ventas_por_anio",
         bucket_name=bucket_name,
@@ -2950,27 +6937,18 @@ def main_athena_tabla_particionada():
             ("year", "string")
         ]
     )
-    time.sleep(2)
+    if query_id:
+        esperar_query_athena(manager.athena_client, query_id)
     
-    # PASO 4: Agregar particiones
+    # PASO 4: Registrar las particiones que haya en S3 (en lote)
     print("\n>>> PASO 4: AGREGAR PARTICIONES <<<")
-    manager.agregar_particion_athena(
-        database_name="mi_db",
-        table_name="ventas_por_anio",
-        partition_value="2024",
-        bucket_name=bucket_name,
-        path="datos_particionados/year=2024"
-    )
-    time.sleep(1)
-    
-    manager.agregar_particion_athena(
+    manager.registrar_particiones_athena(
         database_name="mi_db",
         table_name="ventas_por_anio",
-        partition_value="2025",
         bucket_name=bucket_name,
-        path="datos_particionados/year=2025"
+        path="datos_particionados/",
+        columnas_particion=["year"]
     )
-    time.sleep(1)
     
     # PASO 5: Query con partición
     print("\n>>> PASO 5: QUERY USANDO PARTICIÓN <<<")
@@ -3094,5 +7072,10 @@ def main_selector():
 
 
 if __name__ == '__main__':
-    main_selector()
+    # Métricas opcionales, ej: AWS_METRICAS=stdout,jsonl=metricas.jsonl,prometheus=9108
+    MetricasAWS.activar_desde_entorno()
+    try:
+        main_selector()
+    finally:
+        MetricasAWS.desactivar()
 
@@ -0,0 +1,12 @@
+import os
+import sys
+
+# tarea.py y benchmark_s3.py se importan como módulos sueltos desde AWS_2/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Credenciales falsas: las pruebas nunca deben llegar a AWS real
+os.environ["AWS_ACCESS_KEY_ID"] = "testing"
+os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"
+os.environ["AWS_SECURITY_TOKEN"] = "testing"
+os.environ["AWS_SESSION_TOKEN"] = "testing"
+os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
@@ -0,0 +1,15 @@
+import asyncio
+
+import tarea
+from tarea import AsyncStorageManager
+
+
+def test_no_deja_variables_del_bucle_en_el_modulo():
+    assert not hasattr(tarea, "nombre")
+
+
+def test_metodos_async_generados():
+    assert asyncio.iscoroutinefunction(AsyncStorageManager.subir_contenido_s3)
+    assert AsyncStorageManager.subir_contenido_s3.__name__ == "subir_contenido_s3"
+    for nombre in AsyncStorageManager.GENERADORES:
+        assert not asyncio.iscoroutinefunction(getattr(AsyncStorageManager, nombre))
@@ -0,0 +1,67 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from tarea import AthenaExecutor, AWSClientRegistry
+
+
+def error_cliente(codigo, estado=400):
+    return ClientError(
+        {"Error": {"Code": codigo, "Message": codigo},
+         "ResponseMetadata": {"HTTPStatusCode": estado}},
+        "StartQueryExecution",
+    )
+
+
+class AthenaFalso:
+    """Cliente de Athena que falla con los errores indicados antes de aceptar la query"""
+
+    def __init__(self, errores=()):
+        self.errores = list(errores)
+        self.envios = []
+
+    def start_query_execution(self, **params):
+        self.envios.append(params)
+        if self.errores:
+            raise self.errores.pop(0)
+        return {"QueryExecutionId": "q-1"}
+
+    def get_query_execution(self, QueryExecutionId):
+        return {"QueryExecution": {"Status": {"State": "SUCCEEDED"}, "Statistics": {}}}
+
+
+def test_envia_una_vez_con_token_y_deja_los_reintentos_a_botocore():
+    athena = AthenaFalso([error_cliente("TooManyRequestsException")])
+    executor = AthenaExecutor(athena)
+    try:
+        with pytest.raises(ClientError):
+            executor.ejecutar("SELECT 1", "db", "s3://bucket/out/")
+    finally:
+        executor.cerrar()
+
+    # Sin bucle propio encima de los reintentos de botocore
+    assert len(athena.envios) == 1
+    assert athena.envios[0]["ClientRequestToken"]
+
+
+def test_no_reintenta_errores_de_la_query():
+    athena = AthenaFalso([error_cliente("InvalidRequestException")])
+    executor = AthenaExecutor(athena)
+    try:
+        with pytest.raises(ClientError):
+            executor.ejecutar("SELEC 1", "db", "s3://bucket/out/")
+    finally:
+        executor.cerrar()
+    assert len(athena.envios) == 1
+
+
+def test_queries_distintas_usan_tokens_distintos():
+    athena = AthenaFalso()
+    with AthenaExecutor(athena) as executor:
+        executor.ejecutar("SELECT 1", "db", "s3://bucket/out/")
+        executor.ejecutar("SELECT 1", "db", "s3://bucket/out/")
+    assert athena.envios[0]["ClientRequestToken"] != athena.envios[1]["ClientRequestToken"]
+
+
+def test_el_cliente_de_athena_reintenta_con_botocore():
+    cliente = AWSClientRegistry.cliente("athena", "us-east-1")
+    assert cliente.meta.config.retries["mode"] == "adaptive"
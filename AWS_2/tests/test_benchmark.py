@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+import benchmark_s3
+import tarea
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmark_s3.py")
+
+
+def test_usa_el_percentil_de_tarea():
+    assert benchmark_s3.percentil is tarea.percentil
+    assert tarea.percentil([1, 2, 3, 4], 50) == 2.5
+
+
+def test_se_puede_lanzar_desde_otro_directorio(tmp_path):
+    resultado = subprocess.run([sys.executable, SCRIPT, "--help"], cwd=tmp_path,
+                               capture_output=True, text=True, timeout=60)
+    assert resultado.returncode == 0, resultado.stderr
@@ -0,0 +1,150 @@
+import copy
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from tarea import AthenaResultCache, StorageManager
+
+
+class GlueFalso:
+    def __init__(self):
+        self.tabla = {
+            "Name": "ventas",
+            "UpdateTime": "2025-01-01T00:00:00",
+            "StorageDescriptor": {
+                "Location": "s3://datos/ventas/",
+                "Columns": [{"Name": "id", "Type": "int"}, {"Name": "importe", "Type": "double"}],
+            },
+            "PartitionKeys": [{"Name": "year", "Type": "string"}],
+        }
+        self.particiones = [
+            {"Values": ["2024"], "StorageDescriptor": {"Location": "s3://datos/ventas/year=2024/"}},
+        ]
+
+    def get_table(self, DatabaseName, Name):
+        return {"Table": copy.deepcopy(self.tabla)}
+
+    def get_paginator(self, nombre):
+        glue = self
+
+        class Paginador:
+            def paginate(self, **kwargs):
+                yield {"Partitions": copy.deepcopy(glue.particiones)}
+        return Paginador()
+
+
+@pytest.fixture
+def manager():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="datos")
+        s3.put_object(Bucket="datos", Key="ventas/year=2024/a.csv", Body=b"1,2.5\n")
+        manager = StorageManager()
+        manager.glue_client = GlueFalso()
+        yield manager
+
+
+SQL = "SELECT * FROM ventas"
+
+
+def test_huella_estable_sin_cambios(manager):
+    assert manager.huella_tablas_athena("db", SQL) == manager.huella_tablas_athena("db", SQL)
+
+
+def test_huella_cambia_con_el_esquema(manager):
+    antes = manager.huella_tablas_athena("db", SQL)
+    manager.glue_client.tabla["StorageDescriptor"]["Columns"].append({"Name": "pais", "Type": "string"})
+    despues = manager.huella_tablas_athena("db", SQL)
+    manager.glue_client.tabla["StorageDescriptor"]["Columns"][0]["Type"] = "bigint"
+    assert len({antes, despues, manager.huella_tablas_athena("db", SQL)}) == 3
+
+
+def test_huella_cambia_con_la_fecha_de_modificacion(manager):
+    antes = manager.huella_tablas_athena("db", SQL)
+    manager.glue_client.tabla["UpdateTime"] = "2025-02-01T00:00:00"
+    assert manager.huella_tablas_athena("db", SQL) != antes
+
+
+def test_huella_cambia_con_las_particiones_del_catalogo(manager):
+    antes = manager.huella_tablas_athena("db", SQL)
+    manager.glue_client.particiones.append(
+        {"Values": ["2025"], "StorageDescriptor": {"Location": "s3://datos/ventas/year=2025/"}}
+    )
+    con_nueva = manager.huella_tablas_athena("db", SQL)
+    manager.glue_client.particiones = []
+    assert len({antes, con_nueva, manager.huella_tablas_athena("db", SQL)}) == 3
+
+
+def test_por_defecto_no_lista_los_objetos(manager):
+    antes = manager.huella_tablas_athena("db", SQL)
+    boto3.client("s3").put_object(Bucket="datos", Key="ventas/year=2024/b.csv", Body=b"3,4\n")
+    assert manager.huella_tablas_athena("db", SQL) == antes
+    assert manager.huella_tablas_athena("db", SQL, listar_objetos=True) != \
+        manager.huella_tablas_athena("db", SQL, listar_objetos=False)
+
+
+def test_huella_incluye_objetos_de_particiones_fuera_de_la_tabla(manager):
+    manager.glue_client.particiones.append(
+        {"Values": ["2023"], "StorageDescriptor": {"Location": "s3://datos/historico/2023/"}}
+    )
+    antes = manager.huella_tablas_athena("db", SQL, listar_objetos=True)
+    boto3.client("s3").put_object(Bucket="datos", Key="historico/2023/b.csv", Body=b"3,4\n")
+    assert manager.huella_tablas_athena("db", SQL, listar_objetos=True) != antes
+
+
+def test_resultados_de_athena_dentro_de_la_tabla_no_cuentan(manager):
+    manager.glue_client.tabla["StorageDescriptor"]["Location"] = "s3://datos/"
+    excluir = "s3://datos/athena-results/"
+    antes = manager.huella_tablas_athena("db", SQL, listar_objetos=True, excluir_prefijo=excluir)
+    boto3.client("s3").put_object(Bucket="datos", Key="athena-results/q-1.csv", Body=b"x\n")
+    assert manager.huella_tablas_athena("db", SQL, listar_objetos=True, excluir_prefijo=excluir) == antes
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT now() FROM ventas",
+    "SELECT * FROM ventas WHERE fecha > current_date - interval '1' day",
+    "SELECT * FROM ventas ORDER BY RAND() LIMIT 10",
+])
+def test_funciones_no_deterministas(sql):
+    assert not AthenaResultCache.es_determinista(sql)
+
+
+def test_literales_y_columnas_no_cuentan():
+    assert AthenaResultCache.es_determinista("SELECT * FROM ventas WHERE nota = 'now()'")
+    assert AthenaResultCache.es_determinista("SELECT random_id FROM ventas")
+
+
+def test_query_no_determinista_sin_ttl_no_usa_cache(manager, monkeypatch):
+    llamadas = []
+    monkeypatch.setattr(manager, "huella_tablas_athena", lambda *a: llamadas.append(a))
+    # Sin Athena real la query falla después; lo importante es que no mira la caché
+    manager.ejecutar_query_athena("db", "SELECT now() FROM ventas", "datos", usar_cache=True)
+    assert llamadas == []
+    assert manager.cache_athena is None
+
+
+def test_entradas_caducan_con_ttl(tmp_path, monkeypatch):
+    cache = AthenaResultCache(directorio=str(tmp_path))
+    cache.guardar("clave", ["a"], [(1,)])
+    assert cache.obtener("clave", ttl=60)["filas"] == [(1,)]
+
+    import tarea
+    ahora = tarea.time.time()
+    monkeypatch.setattr(tarea.time, "time", lambda: ahora + 120)
+    assert cache.obtener("clave", ttl=60) is None
+
+
+def test_cache_en_json_sin_pickle(tmp_path):
+    import datetime
+    import decimal
+    import json
+    import zlib
+
+    cache = AthenaResultCache(directorio=str(tmp_path))
+    filas = [(decimal.Decimal("1.50"), datetime.date(2025, 1, 2), datetime.datetime(2025, 1, 2, 3, 4), "x", None)]
+    cache.guardar("clave", ["date", "b", "c", "d", "e"], filas)
+
+    with open(cache.ruta("clave"), "rb") as f:
+        json.loads(zlib.decompress(f.read()))
+    assert cache.obtener("clave")["filas"] == filas
@@ -0,0 +1,81 @@
+import pytest
+from botocore.exceptions import ClientError, ConnectionClosedError, ReadTimeoutError
+
+from tarea import AsyncStorageManager, RangoIncompletoError, StorageManager, reintentar_con_backoff
+
+
+def test_endpoint_en_texto_solo_afecta_a_s3():
+    manager = StorageManager(endpoint_url="http://localhost:9000")
+    assert manager.s3_client.meta.endpoint_url == "http://localhost:9000"
+    assert "localhost" not in manager.ec2_client.meta.endpoint_url
+    assert "localhost" not in manager.athena_client.meta.endpoint_url
+
+
+def test_endpoint_por_servicio():
+    manager = StorageManager(endpoint_url={"athena": "http://localhost:4566"})
+    assert manager.athena_client.meta.endpoint_url == "http://localhost:4566"
+    assert "localhost" not in manager.s3_client.meta.endpoint_url
+
+
+def test_async_manager_pasa_los_endpoints():
+    gestor = AsyncStorageManager(endpoint_url="http://localhost:9000", max_workers=1)
+    try:
+        assert gestor.manager.endpoints == {"s3": "http://localhost:9000"}
+    finally:
+        gestor.cerrar()
+
+
+def test_backoff_reintenta_lecturas_cortadas():
+    intentos = []
+
+    def leer():
+        intentos.append(1)
+        if len(intentos) < 3:
+            raise ReadTimeoutError(endpoint_url="http://s3")
+        return b"ok"
+
+    assert reintentar_con_backoff(leer, espera_base=0.001) == b"ok"
+    assert len(intentos) == 3
+
+
+def test_backoff_no_repite_errores_de_la_api():
+    intentos = []
+
+    def llamar():
+        intentos.append(1)
+        raise ClientError({"Error": {"Code": "SlowDown"}, "ResponseMetadata": {"HTTPStatusCode": 503}}, "PutObject")
+
+    with pytest.raises(ClientError):
+        reintentar_con_backoff(llamar, espera_base=0.001)
+    assert len(intentos) == 1
+
+
+@pytest.mark.parametrize("error", [
+    FileNotFoundError("no existe"), PermissionError("sin permiso"), OSError(28, "No space left on device"),
+])
+def test_backoff_no_repite_errores_del_disco_local(error):
+    intentos = []
+
+    def escribir():
+        intentos.append(1)
+        raise error
+
+    with pytest.raises(OSError):
+        reintentar_con_backoff(escribir, espera_base=0.001)
+    assert len(intentos) == 1
+
+
+@pytest.mark.parametrize("error", [
+    ConnectionClosedError(endpoint_url="http://s3"), RangoIncompletoError("rango 0 incompleto"),
+])
+def test_backoff_reintenta_cortes_de_lectura(error):
+    intentos = []
+
+    def leer():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise error
+        return b"ok"
+
+    assert reintentar_con_backoff(leer, espera_base=0.001) == b"ok"
+    assert len(intentos) == 2
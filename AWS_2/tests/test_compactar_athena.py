@@ -0,0 +1,88 @@
+import datetime
+import itertools
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from tarea import StorageManager, literal_athena
+
+
+class AthenaFalso:
+    """Registra las sentencias y devuelve como DISTINCT las filas indicadas (texto de Athena)"""
+
+    def __init__(self, filas_distinct):
+        self.filas_distinct = filas_distinct
+        self.sentencias = []
+        self.contador = itertools.count()
+
+    def get_table_metadata(self, CatalogName, DatabaseName, TableName):
+        return {"TableMetadata": {
+            "Parameters": {"location": "s3://datos/eventos/"},
+            "Columns": [
+                {"Name": "id", "Type": "int"},
+                {"Name": "activo", "Type": "boolean"},
+                {"Name": "momento", "Type": "timestamp"},
+            ],
+            "PartitionKeys": [{"Name": "dia", "Type": "date"}],
+        }}
+
+    def start_query_execution(self, **params):
+        self.sentencias.append(params["QueryString"])
+        return {"QueryExecutionId": f"q{next(self.contador)}"}
+
+    def get_query_execution(self, QueryExecutionId):
+        return {"QueryExecution": {"Status": {"State": "SUCCEEDED"}, "Statistics": {},
+                                   "StatementType": "DML", "ResultConfiguration": {}}}
+
+    def get_query_results(self, QueryExecutionId, MaxResults):
+        return {"ResultSet": {"ResultSetMetadata": {"ColumnInfo": [
+            {"Name": "activo", "Type": "boolean"}, {"Name": "dia", "Type": "date"},
+        ]}}}
+
+    def get_paginator(self, nombre):
+        filas = [["activo", "dia"]] + self.filas_distinct
+
+        class Paginador:
+            def paginate(self, **kwargs):
+                yield {"ResultSet": {"Rows": [
+                    {"Data": [{} if v is None else {"VarCharValue": v} for v in fila]} for fila in filas
+                ]}}
+        return Paginador()
+
+
+@pytest.fixture
+def manager():
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket="datos")
+        yield StorageManager()
+
+
+def test_literales_con_tipo():
+    assert literal_athena("true", "boolean") == "CAST('true' AS boolean)"
+    assert literal_athena("2024-01-05 10:00:00.000", "timestamp") == "CAST('2024-01-05 10:00:00.000' AS timestamp)"
+    assert literal_athena("1.50", "decimal(10,2)") == "CAST('1.50' AS decimal(10,2))"
+    assert literal_athena("7", "int") == "CAST('7' AS integer)"
+    assert literal_athena("O'Neil", "string") == "'O''Neil'"
+
+
+def test_compactar_no_pierde_particiones(manager):
+    dias = [(datetime.date(2024, 1, 1) + datetime.timedelta(days=n)).isoformat() for n in range(75)]
+    filas = [[activo, dia] for activo in ("true", "false") for dia in dias] + [[None, "2024-12-31"]]
+    manager.athena_client = AthenaFalso(filas)
+
+    resultado = manager.compactar_tabla_athena_parquet(
+        "db", "eventos", "eventos_parquet", "datos", "parquet/eventos/",
+        columnas_particion=["activo", "dia"],
+    )
+
+    assert resultado is not None
+    assert resultado["particiones"] == len(filas)
+    sentencias = manager.athena_client.sentencias[1:]  # La primera es el SELECT DISTINCT
+    texto = "\n".join(sentencias)
+    assert len(sentencias) == 2  # CTAS (100 particiones) + un INSERT INTO
+    assert "AS varchar" not in texto
+    assert "activo = CAST('true' AS boolean) AND dia = CAST('2024-01-05' AS date)" in texto
+    assert "activo IS NULL AND dia = CAST('2024-12-31' AS date)" in texto
+    for activo, dia in filas:
+        assert f"CAST('{dia}' AS date)" in texto
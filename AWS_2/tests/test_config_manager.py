@@ -0,0 +1,67 @@
+import json
+import threading
+
+import pytest
+
+from tarea import ConfigManager
+
+
+@pytest.fixture(autouse=True)
+def config_temporal(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ConfigManager, "cache", None)
+    monkeypatch.setattr(ConfigManager, "cache_firma", None)
+    monkeypatch.setattr(ConfigManager, "pendientes", {})
+    monkeypatch.setattr(ConfigManager, "locales", threading.local())
+
+
+def en_disco():
+    with open(ConfigManager.CONFIG_FILE) as f:
+        return json.load(f)
+
+
+def test_el_lote_de_un_hilo_no_afecta_a_otro():
+    dentro_del_lote = threading.Event()
+    otro_hilo_escribio = threading.Event()
+    vistos = {}
+
+    def hilo_con_lote():
+        with ConfigManager.lote():
+            ConfigManager.actualizar("vpc_id", "vpc-1")
+            dentro_del_lote.set()
+            otro_hilo_escribio.wait(5)
+            vistos["disco_en_lote"] = en_disco()
+            ConfigManager.actualizar("subnet_id", "subnet-1")
+
+    hilo = threading.Thread(target=hilo_con_lote)
+    hilo.start()
+    dentro_del_lote.wait(5)
+
+    # Fuera de un lote la escritura es inmediata, pero solo con la clave de este hilo
+    ConfigManager.actualizar("sg_id", "sg-1")
+    assert en_disco()["sg_id"] == "sg-1"
+    assert en_disco()["vpc_id"] is None
+    # El valor del otro hilo sigue visible en memoria aunque aún no esté en disco
+    assert ConfigManager.obtener("vpc_id") == "vpc-1"
+
+    otro_hilo_escribio.set()
+    hilo.join(5)
+
+    assert vistos["disco_en_lote"]["vpc_id"] is None
+    final = en_disco()
+    assert (final["vpc_id"], final["subnet_id"], final["sg_id"]) == ("vpc-1", "subnet-1", "sg-1")
+
+
+def test_lotes_anidados_escriben_una_vez(monkeypatch):
+    ConfigManager.cargar_config()
+    escrituras = []
+    original = ConfigManager.escribir
+    monkeypatch.setattr(ConfigManager, "escribir", staticmethod(lambda **kw: (escrituras.append(1), original(**kw))))
+
+    with ConfigManager.lote():
+        ConfigManager.actualizar("vpc_id", "vpc-2")
+        with ConfigManager.lote():
+            ConfigManager.actualizar("sg_id", "sg-2")
+        assert escrituras == []
+    assert len(escrituras) == 1
+    assert en_disco()["sg_id"] == "sg-2"
@@ -0,0 +1,68 @@
+import gzip
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+from tarea import StorageManager
+
+CSV = b"ciudad,total\nMadrid,3000\nSevilla,1000\nBilbao,2500\n"
+
+
+class S3SinSelect:
+    """Cliente de S3 que anota las peticiones de S3 Select y las rechaza (fuerza el filtro local)"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.selects = []
+
+    def select_object_content(self, **params):
+        self.selects.append(params)
+        raise ClientError({"Error": {"Code": "NotImplemented", "Message": "sin S3 Select"}}, "SelectObjectContent")
+
+    def __getattr__(self, nombre):
+        return getattr(self.cliente, nombre)
+
+
+@pytest.fixture
+def manager():
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket="datos")
+        manager = StorageManager()
+        manager.s3_client = S3SinSelect(cliente)
+        yield manager
+
+
+def consultar(manager, clave):
+    return list(manager.consultar_objeto_s3("datos", clave, filtro=[("total", ">", 2000)]))
+
+
+@pytest.mark.parametrize("clave", ["ventas.csv", "ventas.csv.gz"])
+def test_gzip_por_content_encoding_se_descomprime_una_vez(manager, clave):
+    manager.s3_client.put_object(Bucket="datos", Key=clave, Body=gzip.compress(CSV), ContentEncoding="gzip")
+
+    filas = consultar(manager, clave)
+
+    assert manager.s3_client.selects[0]["InputSerialization"]["CompressionType"] == "GZIP"
+    assert [f["ciudad"] for f in filas] == ["Madrid", "Bilbao"]
+
+
+def test_bzip2_por_content_encoding(manager):
+    import bz2
+    manager.s3_client.put_object(Bucket="datos", Key="ventas.csv", Body=bz2.compress(CSV), ContentEncoding="bzip2")
+
+    filas = consultar(manager, "ventas.csv")
+
+    assert manager.s3_client.selects[0]["InputSerialization"]["CompressionType"] == "BZIP2"
+    assert [f["ciudad"] for f in filas] == ["Madrid", "Bilbao"]
+
+
+def test_sin_content_encoding_usa_la_extension(manager):
+    manager.s3_client.put_object(Bucket="datos", Key="ventas.csv.gz", Body=gzip.compress(CSV))
+    manager.s3_client.put_object(Bucket="datos", Key="ventas.csv", Body=CSV)
+
+    assert len(consultar(manager, "ventas.csv.gz")) == 2
+    assert len(consultar(manager, "ventas.csv")) == 2
+    assert [s["InputSerialization"]["CompressionType"] for s in manager.s3_client.selects] == ["GZIP", "NONE"]
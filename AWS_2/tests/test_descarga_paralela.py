@@ -0,0 +1,59 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+import tarea
+from tarea import StorageManager
+
+
+class S3Cifrado:
+    """Cliente de S3 que añade las cabeceras de un objeto cifrado a head_object"""
+
+    def __init__(self, cliente, cabeceras):
+        self.cliente = cliente
+        self.cabeceras = cabeceras
+
+    def head_object(self, **params):
+        return dict(self.cliente.head_object(**params), **self.cabeceras)
+
+    def __getattr__(self, nombre):
+        return getattr(self.cliente, nombre)
+
+
+@pytest.fixture
+def manager():
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket="datos")
+        cliente.put_object(Bucket="datos", Key="datos.bin", Body=b"abc" * 1000)
+        manager = StorageManager()
+        manager.s3_client = cliente
+        yield manager
+
+
+def etag_distinto(*args, **kwargs):
+    return "0" * 32
+
+
+@pytest.mark.parametrize("cabeceras", [{"ServerSideEncryption": "aws:kms"}, {"SSECustomerAlgorithm": "AES256"}])
+def test_objetos_cifrados_no_comprueban_el_etag(manager, tmp_path, monkeypatch, cabeceras):
+    monkeypatch.setattr(tarea, "calcular_etag_local", etag_distinto)
+    manager.s3_client = S3Cifrado(manager.s3_client, cabeceras)
+    destino = tmp_path / "datos.bin"
+
+    assert manager.descargar_objeto_s3_paralelo("datos", "datos.bin", str(destino)) == str(destino)
+    assert destino.read_bytes() == b"abc" * 1000
+
+
+def test_etag_distinto_conserva_los_datos(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(tarea, "calcular_etag_local", etag_distinto)
+    destino = tmp_path / "datos.bin"
+
+    assert manager.descargar_objeto_s3_paralelo("datos", "datos.bin", str(destino)) is None
+    assert (tmp_path / "datos.bin.part").read_bytes() == b"abc" * 1000
+
+    # Sin verificar se aprovecha lo ya descargado
+    assert manager.descargar_objeto_s3_paralelo("datos", "datos.bin", str(destino),
+                                                verificar_etag=False) == str(destino)
+    assert destino.read_bytes() == b"abc" * 1000
+    assert not (tmp_path / "datos.bin.part").exists()
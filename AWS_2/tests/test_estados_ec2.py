@@ -0,0 +1,30 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from tarea import StorageManager
+
+
+@pytest.fixture
+def ec2():
+    with mock_aws():
+        yield boto3.client("ec2", region_name="us-east-1")
+
+
+def test_una_instancia_borrada_no_oculta_las_demas(ec2):
+    ami = ec2.describe_images()["Images"][0]["ImageId"]
+    ids = [i["InstanceId"] for i in ec2.run_instances(ImageId=ami, MinCount=2, MaxCount=2)["Instances"]]
+
+    estados = StorageManager().obtener_estados_ec2(ids + ["i-0123456789abcdef0"])
+
+    assert set(estados) == set(ids)
+    assert all(estado in ("pending", "running") for estado in estados.values())
+
+
+def test_un_volumen_borrado_no_oculta_los_demas(ec2):
+    volumen = ec2.create_volume(Size=1, AvailabilityZone="us-east-1a")["VolumeId"]
+
+    estados = StorageManager().obtener_estados_ebs(["vol-0123456789abcdef0", volumen])
+
+    assert list(estados) == [volumen]
+    assert estados[volumen]["instancias"] == []
@@ -0,0 +1,48 @@
+import socket
+import urllib.request
+
+import boto3
+from moto import mock_aws
+
+from tarea import MetricasAWS, SinkMetricas, SinkPrometheus
+
+
+def test_percentiles_con_las_latencias_medidas():
+    # 0.101 s y 0.2 s caen en los buckets de 0.25 s: el percentil no es el límite del bucket
+    muestras = [0.101] * 50 + [0.2] * 50
+    assert MetricasAWS.percentil(muestras, 50) == 150.5
+    assert MetricasAWS.percentil(muestras, 95) == 200.0
+    assert MetricasAWS.percentil([], 50) is None
+
+
+def test_resumen_con_llamadas_reales():
+    with mock_aws():
+        MetricasAWS.reiniciar()
+        MetricasAWS.activar(SinkMetricas())
+        try:
+            from tarea import AWSClientRegistry
+            cliente = AWSClientRegistry.cliente("s3", "us-east-1")
+            for _ in range(3):
+                cliente.list_buckets()
+            serie = next(s for s in MetricasAWS.resumen() if s["operacion"] == "ListBuckets")
+        finally:
+            MetricasAWS.desactivar()
+            MetricasAWS.reiniciar()
+
+    assert serie["llamadas"] == 3
+    assert "muestras" not in serie
+    assert 0 < serie["p50_ms"] <= serie["p95_ms"]
+
+
+def test_prometheus_escucha_solo_en_local_por_defecto():
+    with socket.socket() as libre:
+        libre.bind(("127.0.0.1", 0))
+        puerto_libre = libre.getsockname()[1]
+    sink = SinkPrometheus(puerto=puerto_libre)
+    try:
+        direccion, puerto = sink.servidor.server_address
+        assert direccion == "127.0.0.1"
+        with urllib.request.urlopen(f"http://127.0.0.1:{puerto}/metrics") as respuesta:
+            assert b"aws_llamada_segundos" in respuesta.read()
+    finally:
+        sink.cerrar()
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import paramiko
+import pytest
+
+import tarea
+from tarea import PoliticaClaveConsola, PoolSSH, claves_host_consola
+
+CLAVE = paramiko.RSAKey.generate(1024)
+OTRA = paramiko.RSAKey.generate(1024)
+
+
+def consola(*claves):
+    lineas = "\n".join(f"{c.get_name()} {c.get_base64()} root@ip-10-0-0-1" for c in claves)
+    return f"cloud-init...\n-----BEGIN SSH HOST KEY KEYS-----\n{lineas}\n-----END SSH HOST KEY KEYS-----\n"
+
+
+class EC2Falso:
+    def __init__(self, salida):
+        self.salida = salida
+
+    def get_console_output(self, InstanceId, Latest):
+        return {"Output": self.salida}
+
+    def describe_instances(self, InstanceIds):
+        return {"Reservations": [{"Instances": [{"PublicIpAddress": "10.0.0.1", "KeyName": None}]}]}
+
+
+def test_claves_de_la_consola():
+    assert claves_host_consola(consola(CLAVE)) == {(CLAVE.get_name(), CLAVE.get_base64())}
+    assert claves_host_consola("sin claves") == set()
+
+
+def test_acepta_solo_la_clave_publicada_en_la_consola():
+    cliente = paramiko.SSHClient()
+    politica = PoliticaClaveConsola(EC2Falso(consola(CLAVE)), "i-1")
+
+    politica.missing_host_key(cliente, "10.0.0.1", CLAVE)
+    assert cliente.get_host_keys().lookup("10.0.0.1")
+    with pytest.raises(paramiko.SSHException):
+        politica.missing_host_key(cliente, "10.0.0.2", OTRA)
+
+
+def test_sin_claves_en_la_consola_rechaza_el_host():
+    with pytest.raises(paramiko.SSHException):
+        PoliticaClaveConsola(EC2Falso(""), "i-1").missing_host_key(paramiko.SSHClient(), "10.0.0.1", CLAVE)
+
+
+def test_verifica_el_host_por_defecto():
+    pool = PoolSSH(EC2Falso(""))
+    assert pool.verificar_host
+    assert tarea.StorageManager().configurar_ssh().verificar_host
+
+
+def test_conexiones_a_instancias_distintas_en_paralelo(monkeypatch):
+    class Transporte:
+        def is_active(self):
+            return True
+
+        def set_keepalive(self, segundos):
+            pass
+
+    conexiones = []
+
+    def conectar(self, *args, **kwargs):
+        conexiones.append(args[0])
+        time.sleep(0.5)
+        self._transport = Transporte()
+
+    monkeypatch.setattr(paramiko.SSHClient, "connect", conectar)
+    monkeypatch.setattr(paramiko.SSHClient, "get_transport", lambda self: getattr(self, "_transport", None))
+    pool = PoolSSH(EC2Falso(""))
+
+    inicio = time.time()
+    hilos = [threading.Thread(target=pool.conexion, args=(f"i-{n}",)) for n in range(4)]
+    hilos.append(threading.Thread(target=pool.conexion, args=("i-0",)))
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert time.time() - inicio < 1.5
+    # La misma instancia pedida dos veces a la vez se conecta una sola vez
+    assert len(conexiones) == 4
+    assert len(pool.conexiones) == 4
@@ -0,0 +1,94 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from tarea import StorageManager, filas_csv_athena
+
+COLUMNAS = [("nombre", "varchar"), ("edad", "integer"), ("nota", "varchar")]
+
+# Mismas filas en el formato de get_query_results y en el CSV de Athena
+FILAS_API = [
+    ["ana", "30", ""],        # Cadena vacía
+    ["luis", None, None],     # NULL
+    ['di "hola"', "7", "a,b\nc"],
+]
+CSV = (
+    '"nombre","edad","nota"\n'
+    '"ana","30",""\n'
+    '"luis",,\n'
+    '"di ""hola""","7","a,b\nc"\n'
+)
+
+
+class AthenaFalso:
+    def __init__(self, output_location, filas, tam_pagina=2):
+        self.output_location = output_location
+        self.filas = filas
+        self.tam_pagina = tam_pagina
+        self.llamadas_metadata = 0
+        self.paginas_leidas = 0
+
+    def get_query_execution(self, QueryExecutionId):
+        return {"QueryExecution": {
+            "StatementType": "DML",
+            "ResultConfiguration": {"OutputLocation": self.output_location},
+        }}
+
+    def get_query_results(self, QueryExecutionId, MaxResults):
+        self.llamadas_metadata += 1
+        return {"ResultSet": {"ResultSetMetadata": {"ColumnInfo": [
+            {"Name": nombre, "Type": tipo} for nombre, tipo in COLUMNAS
+        ]}}}
+
+    def get_paginator(self, nombre):
+        falso = self
+
+        class Paginador:
+            def paginate(self, **kwargs):
+                cabecera = [[nombre for nombre, _ in COLUMNAS]]
+                filas = cabecera + falso.filas
+                for i in range(0, len(filas), falso.tam_pagina):
+                    falso.paginas_leidas += 1
+                    yield {"ResultSet": {"Rows": [
+                        {"Data": [{} if v is None else {"VarCharValue": v} for v in fila]}
+                        for fila in filas[i:i + falso.tam_pagina]
+                    ]}}
+        return Paginador()
+
+
+@pytest.fixture
+def manager():
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="resultados")
+        s3.put_object(Bucket="resultados", Key="athena-results/q1.csv", Body=CSV.encode("utf-8"))
+        manager = StorageManager()
+        manager.athena_client = AthenaFalso("s3://resultados/athena-results/q1.csv", FILAS_API)
+        yield manager
+
+
+def test_csv_distingue_null_de_cadena_vacia():
+    lineas = [linea + "\n" for linea in CSV.split("\n") if linea]
+    filas = list(filas_csv_athena(lineas))
+    assert filas[1] == ["ana", "30", ""]
+    assert filas[2] == ["luis", None, None]
+    assert list(filas_csv_athena(['"a",\n'])) == [["a", None]]
+
+
+def test_csv_y_api_devuelven_lo_mismo(manager):
+    desde_api = list(manager.iterar_resultados_athena("q1", desde_csv=False))
+    desde_csv = list(manager.iterar_resultados_athena("q1", desde_csv=True))
+    assert desde_api == desde_csv
+    assert desde_api[0] == ("ana", 30, "")
+    assert desde_api[1] == ("luis", None, None)
+    assert desde_api[2] == ('di "hola"', 7, "a,b\nc")
+
+
+def test_mostrar_resultados_no_carga_todo(manager):
+    athena = AthenaFalso("s3://resultados/athena-results/q1.csv", [["x", str(i), "n"] for i in range(100)])
+    manager.athena_client = athena
+    resultado = manager.mostrar_resultados_athena("q1", max_filas_mostrar=3)
+
+    assert athena.llamadas_metadata == 1
+    assert athena.paginas_leidas == 3  # Cabecera + 4 filas en páginas de 2, no las 51 páginas
+    assert len(list(resultado["filas"])) == 100
@@ -0,0 +1,27 @@
+import boto3
+import pytest
+from moto import mock_aws
+
+from tarea import StorageManager
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket="datos")
+        yield cliente
+
+
+def test_manifiesto_truncado_cancela_la_subida_y_empieza_de_cero(s3, tmp_path):
+    archivo = tmp_path / "grande.bin"
+    archivo.write_bytes(b"x" * (6 * 1024 * 1024))
+    anterior = s3.create_multipart_upload(Bucket="datos", Key="grande.bin")["UploadId"]
+    manifiesto = tmp_path / "grande.bin.upload.json"
+    manifiesto.write_text('{"bucket": "datos", "key": "grande.bin", "upload_id": "%s", "par' % anterior)
+
+    assert StorageManager().subir_archivo_s3_multipart("datos", str(archivo), "grande.bin", max_workers=2)
+
+    assert s3.head_object(Bucket="datos", Key="grande.bin")["ContentLength"] == 6 * 1024 * 1024
+    assert s3.list_multipart_uploads(Bucket="datos").get("Uploads", []) == []
+    assert not manifiesto.exists()
@@ -0,0 +1,55 @@
+import os
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from tarea import StorageManager
+
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        cliente = boto3.client("s3", region_name="us-east-1")
+        cliente.create_bucket(Bucket="datos")
+        yield cliente
+
+
+def archivos(directorio):
+    return [nombre for _, _, nombres in os.walk(directorio) for nombre in nombres]
+
+
+def test_sin_cache_dir_no_escribe_en_disco(s3, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    s3.put_bucket_versioning(Bucket="datos", VersioningConfiguration={"Status": "Enabled"})
+    version = s3.put_object(Bucket="datos", Key="a.txt", Body=b"v1")["VersionId"]
+
+    contenidos = StorageManager().obtener_contenidos_versiones_s3("datos", "a.txt", [version])
+
+    assert contenidos == {version: b"v1"}
+    assert archivos(tmp_path) == []
+
+
+def test_cache_explicita_de_versiones(s3, tmp_path):
+    s3.put_bucket_versioning(Bucket="datos", VersioningConfiguration={"Status": "Enabled"})
+    version = s3.put_object(Bucket="datos", Key="a.txt", Body=b"v1")["VersionId"]
+    manager = StorageManager()
+
+    manager.obtener_contenidos_versiones_s3("datos", "a.txt", [version], cache_dir=str(tmp_path))
+    s3.delete_object(Bucket="datos", Key="a.txt", VersionId=version)
+
+    assert len(archivos(tmp_path)) == 1
+    assert manager.obtener_version_especifica("datos", "a.txt", version, cache_dir=str(tmp_path)) == b"v1"
+
+
+def test_version_null_no_se_guarda(s3, tmp_path):
+    # Sin versionado el objeto tiene VersionId "null" y se puede sobrescribir
+    s3.put_object(Bucket="datos", Key="a.txt", Body=b"v1")
+    manager = StorageManager()
+
+    primero = manager.obtener_contenidos_versiones_s3("datos", "a.txt", ["null"], cache_dir=str(tmp_path))
+    s3.put_object(Bucket="datos", Key="a.txt", Body=b"v2")
+    segundo = manager.obtener_contenidos_versiones_s3("datos", "a.txt", ["null"], cache_dir=str(tmp_path))
+
+    assert (primero["null"], segundo["null"]) == (b"v1", b"v2")
+    assert archivos(tmp_path) == []